@@ -0,0 +1,378 @@
+# api_server.py (Async HTTP API for extraction, alongside the Streamlit UI)
+#
+# Usage: python api_server.py [--port 8080] [--fake-backend]
+#
+#   POST /extract  {"call_details", "recruiter_text", "applicant_skills"} or {"text"} -> {"result": {...}}
+#                  (optional "fields": [...] extracts only those tracker fields)
+#   POST /ics      {"details": {...}}                                               -> text/calendar
+#   GET  /healthz                                                                   -> load and quota figures
+#   GET  /metrics                                                                   -> Prometheus text (metrics.py)
+#
+# Model calls go straight to the Gemini REST endpoint over one pooled aiohttp
+# session, so hundreds of requests can be in flight on a single event loop without
+# a thread each. The response cache and the RPM/TPM limiter are the same ones the
+# web app uses.
+
+# --- 1. Import necessary libraries ---
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientError
+from extraction import (
+    MODEL_ID, MAX_QUOTA_RETRIES, QUOTA_RETRY_SECONDS, IN_FLIGHT_TTL_SECONDS, combine_inputs, create_ics_file,
+    response_cache_key, cached_response, cache_response, claim_response, release_response, response_pending,
+    parse_json_object, extraction_prompt, record_tokens, EXTRACTIONS, MODEL_REQUESTS, MODEL_LATENCY, RESPONSE_CACHE
+)
+import metrics
+from fields import normalize_record, select_fields
+from offline_extractor import extract_offline, refinement_fields
+from rate_limiter import limiter, estimate_tokens, RateLimitTimeout, TokenBucket
+
+# --- 2. Configuration ---
+API_PORT = int(os.environ.get("JOB_AGENT_API_PORT", "8080"))
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+MAX_IN_FLIGHT = int(os.environ.get("JOB_AGENT_MAX_IN_FLIGHT", "256"))   # Concurrent upstream calls
+MAX_QUEUED = int(os.environ.get("JOB_AGENT_MAX_QUEUED", "1024"))        # Requests allowed to wait for a slot
+REQUEST_TIMEOUT = float(os.environ.get("JOB_AGENT_REQUEST_TIMEOUT", "90"))
+UPSTREAM_TIMEOUT = float(os.environ.get("JOB_AGENT_UPSTREAM_TIMEOUT", "60"))
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class UpstreamError(Exception):
+    """The model endpoint failed or returned something unusable."""
+
+
+class AtCapacity(Exception):
+    """Too many requests are already waiting for an upstream slot."""
+
+
+API_REJECTED = metrics.counter("api_rejected_total", "API requests turned away with 503 because the queue was full.")
+
+# --- 3. Upstream Model Client ---
+class GeminiClient:
+    """Async client for generateContent sharing one connection pool for every request."""
+
+    def __init__(self, api_key: str, base_url: str = GEMINI_API_BASE, model_id: str = MODEL_ID):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/v1beta/models/{model_id}:generateContent"
+        self.model_id = model_id
+        self.session = None
+        # The limiter blocks while waiting for quota, so waits happen off the event loop
+        self.quota_waiters = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="quota")
+
+    async def start(self) -> None:
+        self.session = ClientSession(
+            connector=TCPConnector(limit=MAX_IN_FLIGHT, keepalive_timeout=60),
+            timeout=ClientTimeout(total=UPSTREAM_TIMEOUT),
+            headers={"x-goog-api-key": self.api_key},
+        )
+
+    async def close(self) -> None:
+        await self.session.close()
+        self.quota_waiters.shutdown(wait=False, cancel_futures=True)
+
+    async def wait_for_quota(self, estimated: int, client_id: str) -> None:
+        """limiter.acquire off the event loop; a request abandoned meanwhile gives its quota back."""
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        # Never wait for quota longer than the request itself may take
+        waiter = loop.run_in_executor(
+            self.quota_waiters, functools.partial(limiter.acquire, estimated, client_id, REQUEST_TIMEOUT, cancelled)
+        )
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # Timed out or disconnected: stop the blocked wait, and refund it if it was granted anyway
+            cancelled.set()
+
+            def refund_if_granted(future):
+                if not future.cancelled() and future.exception() is None:
+                    loop.run_in_executor(self.quota_waiters, limiter.refund, estimated)
+            waiter.add_done_callback(refund_if_granted)
+            raise
+
+    async def generate_text(self, prompt: str, client_id: str) -> str:
+        """Sends one prompt through the shared rate limiter, retrying on 429 like extraction.call_model."""
+        estimated = estimate_tokens(prompt)
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        for attempt in range(MAX_QUOTA_RETRIES + 1):
+            await self.wait_for_quota(estimated, client_id)
+            started = time.perf_counter()
+            try:
+                async with self.session.post(self.url, json=payload) as response:
+                    if response.status == 429 and attempt < MAX_QUOTA_RETRIES:
+                        limiter.penalize(QUOTA_RETRY_SECONDS)
+                        continue
+                    if response.status != 200:
+                        raise UpstreamError(f"Model endpoint returned HTTP {response.status}: {(await response.text())[:300]}")
+                    body = await response.json()
+            except (ClientError, asyncio.TimeoutError) as e:
+                raise UpstreamError(f"Model endpoint unreachable: {e!r}") from e
+            finally:
+                MODEL_LATENCY.observe(time.perf_counter() - started, (self.model_id,))
+            usage = body.get("usageMetadata", {})
+            actual = usage.get("totalTokenCount", 0)
+            if actual:
+                limiter.record_usage(estimated, actual)
+            record_tokens(self.model_id, usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0), estimated)
+            try:
+                return "".join(part.get("text", "") for part in body["candidates"][0]["content"]["parts"])
+            except (KeyError, IndexError, TypeError) as e:
+                raise UpstreamError(f"Unexpected model response: {json.dumps(body)[:300]}") from e
+        raise UpstreamError("Model quota still exhausted after retries.")
+
+# --- 4. Backpressure ---
+class Gate:
+    """Caps concurrent upstream calls and rejects work once too many requests are waiting."""
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queued: int = MAX_QUEUED):
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.completed = 0
+
+    async def run(self, coroutine):
+        """Awaits the coroutine once a slot is free; raises AtCapacity instead of queueing without bound."""
+        if self.queued >= self.max_queued:
+            coroutine.close()
+            self.rejected += 1
+            API_REJECTED.inc()
+            raise AtCapacity()
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        except BaseException:
+            coroutine.close()
+            raise
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            return await coroutine
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.slots.release()
+
+# --- 5. Handlers ---
+def json_error(status: int, message: str) -> web.Response:
+    # 503s are transient (capacity or quota), so tell clients when to come back
+    headers = {"Retry-After": "5"} if status == 503 else None
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+async def read_json(request: web.Request) -> dict:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON."}), content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be a JSON object."}), content_type="application/json")
+    return body
+
+
+async def off_loop(func, *args):
+    """Runs a state backend call in the default executor; sqlite:// may block on its busy timeout."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+async def await_response(cache_key: str):
+    """extraction.await_response, sleeping on the event loop instead of blocking it."""
+    deadline = time.monotonic() + IN_FLIGHT_TTL_SECONDS
+    delay = 0.05
+    while time.monotonic() < deadline:
+        cached = await off_loop(cached_response, cache_key)
+        if cached is not None or not await off_loop(response_pending, cache_key):
+            return cached if cached is not None else await off_loop(cached_response, cache_key)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+    return None
+
+
+async def extract(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    if not any(str(body.get(key) or "").strip() for key in ("text", "call_details", "recruiter_text", "applicant_skills")):
+        return json_error(400, "Provide 'text' or at least one of call_details, recruiter_text, applicant_skills.")
+    text = str(body.get("text") or "") or combine_inputs(
+        body.get("applicant_skills", ""), body.get("call_details", ""), body.get("recruiter_text", "")
+    )
+
+    keys = body.get("fields")
+    if keys is not None and (not isinstance(keys, list) or not select_fields(keys)):
+        return json_error(400, "'fields' must be a list of tracker field names.")
+
+    prompt = extraction_prompt(keys).format(text_input=text)
+    cache_key = response_cache_key(prompt)
+    cached = await off_loop(cached_response, cache_key)
+    lookup = "hit" if cached is not None else "miss"
+    # The same prompt already on its way to the model (another request or replica): share its answer
+    claimed = cached is None and await off_loop(claim_response, cache_key)
+    if cached is None and not claimed:
+        cached = await await_response(cache_key)
+        lookup = "shared" if cached is not None else "miss"
+    RESPONSE_CACHE.inc(1, (lookup,))
+    if cached is not None:
+        EXTRACTIONS.inc(1, ("model", "ok"))
+        return web.json_response({"result": normalize_record(cached), "source": "cache"})
+
+    app = request.app
+    client_id = request.headers.get("X-Client-Id") or request.remote or "anonymous"
+    try:
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            response_text = await app["gate"].run(app["client"].generate_text(prompt, client_id))
+        result = parse_json_object(response_text)
+    except AtCapacity:
+        failure = (503, "Server is at capacity, retry shortly.")
+    except TimeoutError:
+        failure = (504, f"Extraction did not finish within {REQUEST_TIMEOUT:.0f}s.")
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "error"))
+    except RateLimitTimeout as e:
+        failure = (503, f"The AI service is busy, please try again shortly. ({e})")
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "rate_limited"))
+    except UpstreamError as e:
+        failure = (502, str(e))
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "error"))
+    except json.JSONDecodeError:
+        failure = (502, f"The AI returned an invalid JSON format. Raw output: {response_text[:500]}")
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "invalid_json"))
+    else:
+        await off_loop(cache_response, cache_key, result)
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "ok"))
+        EXTRACTIONS.inc(1, ("model", "ok"))
+        return web.json_response({"result": normalize_record(result), "source": "model"})
+    finally:
+        if claimed:
+            # Shielded so a client disconnecting here still frees the claim for everyone sharing it
+            await asyncio.shield(off_loop(release_response, cache_key))
+    EXTRACTIONS.inc(1, ("model", "error"))
+
+    if body.get("allow_offline"):
+        details = {key: value for key, value in extract_offline(text).items() if key in select_fields(keys)}
+        EXTRACTIONS.inc(1, ("offline", "ok"))
+        return web.json_response({
+            "result": details, "source": "offline", "refine_fields": refinement_fields(details), "warning": failure[1]
+        })
+    return json_error(*failure)
+
+
+async def ics(request: web.Request) -> web.Response:
+    body = await read_json(request)
+    content = create_ics_file(body.get("details") or {})
+    if not content:
+        return json_error(422, "details.interview_scheduled_date could not be resolved to a date.")
+    return web.Response(
+        text=content, content_type="text/calendar",
+        headers={"Content-Disposition": 'attachment; filename="interview.ics"'}
+    )
+
+
+async def healthz(request: web.Request) -> web.Response:
+    gate = request.app["gate"]
+    return web.json_response({
+        "status": "ok",
+        "in_flight": gate.in_flight,
+        "queued": gate.queued,
+        "completed": gate.completed,
+        "rejected": gate.rejected,
+        "uptime_seconds": round(time.monotonic() - request.app["started"], 1),
+        "quota": limiter.stats(),
+    })
+
+
+async def metrics_text(request: web.Request) -> web.Response:
+    # The exposition is a few hundred lines at most, cheap enough to build on the event loop
+    return web.Response(body=metrics.exposition().encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+# --- 6. Application Factory ---
+def create_app(api_key: str, base_url: str = GEMINI_API_BASE) -> web.Application:
+    app = web.Application(client_max_size=MAX_BODY_BYTES)
+    app["client"] = GeminiClient(api_key, base_url)
+    app["started"] = time.monotonic()
+
+    async def on_startup(app):
+        app["gate"] = Gate()
+        await app["client"].start()
+        metrics.gauge("api_in_flight", "API requests currently waiting on the model.", lambda: app["gate"].in_flight)
+        metrics.gauge("api_queued", "API requests waiting for an upstream slot.", lambda: app["gate"].queued)
+
+    async def on_cleanup(app):
+        await app["client"].close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/extract", extract)
+    app.router.add_post("/ics", ics)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics_text)
+    return app
+
+# --- 7. Fake Model Backend (for end-to-end tests and load runs) ---
+def create_fake_backend(median_latency: float = 2.5, sigma: float = 0.35) -> web.Application:
+    """Serves generateContent with a canned 22-key answer after a log-normal delay."""
+    from loadtest import FAKE_RESULT
+
+    async def generate_content(request: web.Request) -> web.Response:
+        body = await request.json()
+        prompt = body["contents"][0]["parts"][0]["text"]
+        await asyncio.sleep(random.lognormvariate(0, sigma) * median_latency)
+        return web.json_response({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": json.dumps(FAKE_RESULT)}]}}],
+            "usageMetadata": {"totalTokenCount": estimate_tokens(prompt)},
+        })
+
+    app = web.Application(client_max_size=MAX_BODY_BYTES)
+    app.router.add_post("/v1beta/models/{model}:generateContent", generate_content)
+    return app
+
+# --- 8. Standalone Execution Block ---
+async def serve(port: int, fake_backend: bool, fake_latency: float) -> None:
+    base_url, api_key = GEMINI_API_BASE, os.environ.get("GOOGLE_API_KEY", "")
+    runners = []
+    if fake_backend:
+        backend = web.AppRunner(create_fake_backend(fake_latency))
+        await backend.setup()
+        await web.TCPSite(backend, "127.0.0.1", port + 1).start()
+        runners.append(backend)
+        base_url, api_key = f"http://127.0.0.1:{port + 1}", api_key or "fake-backend"
+        # The fake backend has no quota, so the Gemini RPM/TPM limits would only distort load runs
+        limiter.requests = TokenBucket(10 ** 9)
+        limiter.tokens = TokenBucket(10 ** 12)
+        print(f"Fake model backend on {base_url}")
+    elif not api_key:
+        print("GOOGLE_API_KEY is not set; use --fake-backend to run without the real API.")
+        sys.exit(1)
+
+    runner = web.AppRunner(create_app(api_key, base_url))
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    runners.append(runner)
+    print(f"Extraction API listening on http://0.0.0.0:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in reversed(runners):
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Async HTTP API for recruiter-message extraction.")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--fake-backend", action="store_true", help="Serve a local fake model on port+1 and use it.")
+    parser.add_argument("--fake-latency", type=float, default=2.5, help="Median fake model latency in seconds.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.fake_backend, args.fake_latency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,145 @@
+# candidate_ranking.py (Score one extracted JD against many stored applicant profiles)
+
+# --- 1. Import necessary libraries ---
+import re
+import json
+import datetime
+import tracker
+from extraction import generate_json, is_missing
+
+# --- 2. Schema ---
+tracker.register_schema("""
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    skills_text TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+""")
+
+# Common spellings mapped to one canonical skill name, so "k8s" in a resume matches "Kubernetes" in a JD
+SKILL_ALIASES = {
+    "k8s": "kubernetes",
+    "golang": "go",
+    "js": "javascript",
+    "ts": "typescript",
+    "postgres": "postgresql",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "amazon web services": "aws",
+    "google cloud": "gcp",
+    "ms sql": "sql server",
+    "mssql": "sql server",
+    "ml": "machine learning",
+    "tf": "terraform",
+}
+
+# --- 3. Profile Storage ---
+def save_profile(name: str, skills_text: str, path: str = None) -> None:
+    """Adds a candidate profile, or replaces the one with the same name."""
+    with tracker.open_db(path) as connection:
+        connection.execute(
+            "INSERT INTO profiles (name, skills_text, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET skills_text = excluded.skills_text, updated_at = excluded.updated_at",
+            (name.strip(), skills_text, datetime.datetime.now().isoformat(timespec="seconds"))
+        )
+
+
+def delete_profile(profile_id: int, path: str = None) -> None:
+    with tracker.open_db(path) as connection:
+        connection.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+
+
+def list_profiles(path: str = None) -> list:
+    with tracker.open_db(path) as connection:
+        rows = connection.execute("SELECT id, name, skills_text, updated_at FROM profiles ORDER BY name").fetchall()
+    return [dict(row) for row in rows]
+
+# --- 4. Skill Normalization ---
+def normalize_skill(skill: str) -> str:
+    skill = re.sub(r"\s+", " ", skill.strip().lower())
+    return SKILL_ALIASES.get(skill, skill)
+
+
+def parse_keywords(extracted_keywords: str) -> list:
+    """Splits the comma-separated extracted_keywords field into unique normalized skills."""
+    if is_missing(extracted_keywords):
+        return []
+    skills = []
+    for part in re.split(r"[,;\n]", str(extracted_keywords)):
+        skill = normalize_skill(part)
+        if skill and skill not in skills:
+            skills.append(skill)
+    return skills
+
+
+def _skill_pattern(skill: str) -> re.Pattern:
+    """Matches a skill or any of its aliases as a whole word (so 'go' does not match 'good')."""
+    spellings = [skill] + [alias for alias, canonical in SKILL_ALIASES.items() if canonical == skill]
+    alternatives = "|".join(re.escape(spelling) for spelling in sorted(spellings, key=len, reverse=True))
+    return re.compile(rf"(?<![\w+#.])(?:{alternatives})(?![\w+#])", re.IGNORECASE)
+
+# --- 5. Ranking ---
+def rank_profiles_locally(jd_details: dict, profiles: list) -> list:
+    """Scores every profile against the JD's keywords in a single pass, without the model."""
+    skills = parse_keywords(jd_details.get("extracted_keywords", ""))
+    # Patterns are compiled once per JD and reused for every candidate
+    patterns = [(skill, _skill_pattern(skill)) for skill in skills]
+    rows = []
+    for profile in profiles:
+        text = profile["skills_text"]
+        matched = [skill for skill, pattern in patterns if pattern.search(text)]
+        missing = [skill for skill, _ in patterns if skill not in matched]
+        score = round(100 * len(matched) / len(patterns)) if patterns else 0
+        rows.append({
+            "candidate": profile["name"],
+            "match_score": f"{score}%",
+            "matched_skills": ", ".join(matched),
+            "skill_gap_analysis": f"Missing: {', '.join(missing)}." if missing else "No gaps against the extracted keywords.",
+            "_score": score,
+        })
+    rows.sort(key=lambda row: row["_score"], reverse=True)
+    return rows
+
+
+BATCH_SCORING_PROMPT = """
+You are scoring several job candidates against ONE job. Return a single valid JSON object (no markdown, no code fences) of the form {{"candidates": [{{"id": <id>, "match_score": "<0-100>%", "skill_gap_analysis": "<one sentence>"}}, ...]}} with one entry per candidate id below.
+
+**Job:** {role} @ {company}
+**Required Skills:** {keywords}
+
+**Candidates (JSON, id -> skills):**
+{candidates_json}
+
+**JSON Output:**
+"""
+
+
+def rank_profiles_with_model(jd_details: dict, profiles: list) -> list:
+    """Scores all profiles with ONE model call; local scores fill in anything the model omits.
+
+    Returns the sorted rows, or an {"error": ...} dict if the call failed.
+    """
+    local_rows = {row["candidate"]: row for row in rank_profiles_locally(jd_details, profiles)}
+    candidates = {str(index): profile["skills_text"][:2000] for index, profile in enumerate(profiles)}
+    response = generate_json(BATCH_SCORING_PROMPT.format(
+        role=jd_details.get("role_position", "Role"),
+        company=jd_details.get("client_company", "Company"),
+        keywords=jd_details.get("extracted_keywords", ""),
+        candidates_json=json.dumps(candidates, ensure_ascii=False, separators=(",", ":"))
+    ))
+    if "error" in response:
+        return response
+    for entry in response.get("candidates", []):
+        try:
+            profile = profiles[int(entry["id"])]
+            score = min(100, int(re.search(r"\d+", str(entry["match_score"])).group()))
+        except (KeyError, ValueError, IndexError, TypeError, AttributeError):
+            continue
+        row = local_rows[profile["name"]]
+        row["match_score"] = f"{score}%"
+        row["skill_gap_analysis"] = entry.get("skill_gap_analysis", row["skill_gap_analysis"])
+        row["_score"] = score
+    return sorted(local_rows.values(), key=lambda row: row["_score"], reverse=True)
@@ -0,0 +1,208 @@
+# conversations.py (Group recruiter messages into one thread per opportunity, with delta extraction)
+
+# --- 1. Import necessary libraries ---
+import re
+import json
+import datetime
+import tracker
+import scheduler
+from extraction import TRACKER_HEADERS, combine_inputs, process_recruiter_text, extract_delta, merge_results, is_missing
+from csv_import import normalize_company, normalize_role
+
+# --- 2. Schema ---
+# One thread per tracked opportunity; every message that touched it is kept with the fields it changed
+tracker.register_schema("""
+CREATE TABLE IF NOT EXISTS threads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id INTEGER NOT NULL UNIQUE,
+    subject_key TEXT NOT NULL DEFAULT '',
+    contact_email TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_subject ON threads (subject_key);
+CREATE INDEX IF NOT EXISTS idx_threads_contact ON threads (contact_email);
+CREATE TABLE IF NOT EXISTS thread_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thread_id INTEGER NOT NULL,
+    received_at TEXT NOT NULL,
+    subject TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    changed_fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_thread_messages_thread ON thread_messages (thread_id);
+""")
+
+REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+
+# --- 3. Thread Matching ---
+def subject_key(subject: str) -> str:
+    """Normalizes a subject line so "RE: Fwd: Python Role" and "python role" land in one thread."""
+    subject = REPLY_PREFIX.sub("", str(subject or ""))
+    return re.sub(r"\s+", " ", subject).strip().lower()
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _conflicts(details: dict, record: dict) -> bool:
+    """Whether the extracted role or company names a different one than the thread's record."""
+    for key, normalize in (("role_position", normalize_role), ("client_company", normalize_company)):
+        if is_missing(details.get(key)) or is_missing(record.get(key)):
+            continue
+        new, known = normalize(details[key]), normalize(record[key])
+        # "Python Developer" and "Senior Python Developer" are the same opening
+        if new and known and new not in known and known not in new:
+            return True
+    return False
+
+
+def find_thread(subject: str = "", contact_email: str = "", path: str = None, details: dict = None):
+    """Returns the thread a new message belongs to, or None for a new opportunity.
+
+    A known subject (after stripping Re:/Fwd:) decides. Otherwise the recruiter's latest
+    thread is used when the message has no subject or is a reply or forward. A fresh subject
+    from the same recruiter may be another role: it joins the recruiter's latest thread whose
+    record names no conflicting role or company in the extracted details, and starts a new
+    thread when details are not given.
+    """
+    key = subject_key(subject)
+    contact_email = str(contact_email or "").strip().lower()
+    with tracker.open_db(path) as connection:
+        if key:
+            row = connection.execute(
+                "SELECT * FROM threads WHERE subject_key = ? ORDER BY updated_at DESC LIMIT 1", (key,)
+            ).fetchone()
+            if row is not None:
+                return dict(row)
+        rows = connection.execute(
+            "SELECT * FROM threads WHERE contact_email = ? ORDER BY updated_at DESC, id DESC LIMIT 20", (contact_email,)
+        ).fetchall() if contact_email else []
+    if not rows:
+        return None
+    if not key or REPLY_PREFIX.match(str(subject)):
+        return dict(rows[0])
+    if details is None:
+        return None
+    records = tracker.get_records([row["record_id"] for row in rows], path)
+    for row in rows:
+        if row["record_id"] in records and not _conflicts(details, records[row["record_id"]]):
+            return dict(row)
+    return None
+
+
+def list_threads(limit: int = 50, path: str = None) -> list:
+    """Most recently active threads, with their role, company and message count."""
+    with tracker.open_db(path) as connection:
+        rows = connection.execute(
+            "SELECT threads.id, threads.record_id, threads.updated_at, records.role_position, records.client_company, "
+            "records.status, (SELECT COUNT(*) FROM thread_messages WHERE thread_id = threads.id) AS messages "
+            "FROM threads JOIN records ON records.id = threads.record_id "
+            "ORDER BY threads.updated_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def thread_messages(thread_id: int, path: str = None) -> list:
+    with tracker.open_db(path) as connection:
+        rows = connection.execute(
+            "SELECT received_at, subject, text, changed_fields FROM thread_messages WHERE thread_id = ? ORDER BY id",
+            (thread_id,)
+        ).fetchall()
+    return [dict(row, changed_fields=json.loads(row["changed_fields"])) for row in rows]
+
+# --- 4. Thread Updates ---
+def start_thread(record_id: int, details: dict, text: str, subject: str = "", contact_email: str = "",
+                 path: str = None) -> int:
+    """Opens a thread for a freshly extracted record; its first message is the one it was extracted from."""
+    if not contact_email and not is_missing(details.get("email_id")):
+        contact_email = str(details["email_id"])
+    contact_email = contact_email.strip().lower()
+    with tracker.open_db(path) as connection:
+        connection.execute(
+            "INSERT INTO threads (record_id, subject_key, contact_email, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (record_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (record_id, subject_key(subject), contact_email, _now())
+        )
+        thread_id = connection.execute(
+            "SELECT id FROM threads WHERE record_id = ?", (record_id,)
+        ).fetchone()["id"]
+        connection.execute(
+            "INSERT INTO thread_messages (thread_id, received_at, subject, text, changed_fields) VALUES (?, ?, ?, ?, ?)",
+            (thread_id, _now(), subject, text, json.dumps({key: details.get(key, "") for key in TRACKER_HEADERS}))
+        )
+    return thread_id
+
+
+def add_message(thread_id: int, text: str, subject: str = "", path: str = None, received_at=None,
+                extracted: dict = None) -> dict:
+    """Applies one new message to its thread's record in place.
+
+    Only the compact current record and the new message go to the model, so the cost of
+    a message does not grow with the length of the thread. When the message was already
+    fully extracted (`extracted`), its fields are diffed against the record instead of
+    asking the model again. Returns {"record_id", "details", "changed"} or an {"error": ...} dict.
+    """
+    with tracker.open_db(path) as connection:
+        thread = connection.execute("SELECT record_id FROM threads WHERE id = ?", (thread_id,)).fetchone()
+    if thread is None:
+        return {"error": f"Conversation {thread_id} does not exist."}
+    record_id = thread["record_id"]
+    record = tracker.get_record(record_id, path)
+    details = {key: record.get(key, "") for key in TRACKER_HEADERS}
+
+    if extracted is not None:
+        changed = {
+            key: value for key, value in extracted.items()
+            if key in TRACKER_HEADERS and not is_missing(value) and str(value) != str(details.get(key, ""))
+        }
+    else:
+        changed = extract_delta(details, text, received_at)
+    if "error" in changed:
+        return changed
+    details = merge_results(details, changed)
+    tracker.update_record(record_id, changed, path)
+    scheduler.schedule_from_record(record_id, details, path)
+    with tracker.open_db(path) as connection:
+        connection.execute(
+            "INSERT INTO thread_messages (thread_id, received_at, subject, text, changed_fields) VALUES (?, ?, ?, ?, ?)",
+            (thread_id, _now(), subject, text, json.dumps(changed))
+        )
+        connection.execute("UPDATE threads SET updated_at = ? WHERE id = ?", (_now(), thread_id))
+    return {"record_id": record_id, "details": details, "changed": changed}
+
+
+def ingest_message(text: str, subject: str = "", contact_email: str = "", applicant_skills: str = "",
+                   path: str = None, received_at=None) -> dict:
+    """Routes a message to its existing thread (delta update) or starts a new one (full extraction).
+
+    Every message costs one model call: a known recruiter's fresh subject is extracted in full
+    once, and that extraction both matches the thread and updates its record.
+
+    Returns {"record_id", "thread_id", "details", "changed", "new_thread"} or an {"error": ...} dict.
+    """
+    thread = find_thread(subject, contact_email, path)
+    details = None
+    if thread is None and contact_email and subject_key(subject) and find_thread("", contact_email, path):
+        # A fresh subject from a recruiter with an open thread: the full extraction (needed for a
+        # new thread anyway) tells whether it pitches another role or continues the known one
+        details = process_recruiter_text(combine_inputs(applicant_skills, "", text), received_at=received_at)
+        if "error" in details:
+            return details
+        thread = find_thread(subject, contact_email, path, details)
+    if thread is not None:
+        # A message already fully extracted above is diffed against the record, not sent again
+        result = add_message(thread["id"], text, subject, path, received_at, extracted=details)
+        if "error" in result:
+            return result
+        return dict(result, thread_id=thread["id"], new_thread=False)
+
+    if details is None:
+        details = process_recruiter_text(combine_inputs(applicant_skills, "", text), received_at=received_at)
+    if "error" in details:
+        return details
+    record_id = tracker.add_record(details, path)
+    scheduler.schedule_from_record(record_id, details, path)
+    thread_id = start_thread(record_id, details, text, subject, contact_email, path)
+    return {"record_id": record_id, "thread_id": thread_id, "details": details, "changed": {}, "new_thread": True}
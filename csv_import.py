@@ -0,0 +1,332 @@
+# csv_import.py (Bulk import and keyed merge of legacy job_details.csv exports)
+#
+# Usage: python csv_import.py job_details.csv "job_details (1).csv" exports.zip ... [--dry-run] [--conflicts conflicts.csv]
+#
+# Older versions of the app downloaded one-row job_details.csv files with 18 columns (before
+# the match score fields) or 22 columns; users also keep hand-merged spreadsheets of them.
+# Rows from any number of CSVs and ZIPs of CSVs are mapped to the tracker fields, merged on a
+# hash of normalized (company, role, recruiter contact), joined to the tracker on the same key
+# and written in one transaction each for inserts and updates. Nothing here calls the model.
+
+# --- 1. Import necessary libraries ---
+import os
+import io
+import re
+import sys
+import csv
+import zlib
+import zipfile
+import hashlib
+import datetime
+from functools import lru_cache
+from fields import FIELD_KEYS, DATE_FIELDS, is_missing, normalize_value
+import dates
+import tracker
+import scheduler
+
+# --- 2. Header Layouts ---
+# The first 18 fields are the original layout; the 22-column layout added the match score fields
+LEGACY_LAYOUTS = {18: FIELD_KEYS[:18], 22: FIELD_KEYS}
+# Headers people typed into hand-merged sheets, after squash_header()
+HEADER_ALIASES = {
+    "date": "date_contacted", "contacted on": "date_contacted", "applied on": "date_contacted",
+    "hr": "hr_name", "recruiter": "hr_name", "recruiter name": "hr_name", "contact name": "hr_name",
+    "phone": "phone_number", "mobile": "phone_number", "contact number": "phone_number",
+    "email": "email_id", "email address": "email_id", "mail": "email_id",
+    "role": "role_position", "position": "role_position", "job title": "role_position", "title": "role_position",
+    "agency": "recruiter_company", "consultancy": "recruiter_company",
+    "company": "client_company", "client": "client_company", "employer": "client_company",
+    "ctc": "ctc_offered_expected", "salary": "ctc_offered_expected", "ctc offered": "ctc_offered_expected",
+    "interview date": "interview_scheduled_date", "follow up date": "next_follow_up_date",
+    "follow up": "next_follow_up_date", "notes": "review_notes", "comments": "review_notes",
+    "keywords": "extracted_keywords", "skills": "extracted_keywords", "match": "match_score",
+    "skill gap": "skill_gap_analysis",
+}
+# A row counts as a header when at least this many of its cells name a field
+MIN_HEADER_MATCHES = 3
+
+
+def squash_header(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(name).lower()).strip()
+
+
+@lru_cache(maxsize=65536)
+def _header_key(cell: str):
+    # Every cell of every row is probed, and legacy cells repeat a lot (statuses, companies, dates)
+    return HEADER_KEYS.get(squash_header(cell)) if len(cell) <= 40 else None
+
+
+# Legacy files hold "Not specified", "N/A" and blanks in every other cell
+_missing = lru_cache(maxsize=65536)(is_missing)
+
+
+HEADER_KEYS = {squash_header(key): key for key in FIELD_KEYS}
+HEADER_KEYS.update(HEADER_ALIASES)
+
+
+def map_header(row: list):
+    """Field key (or None) per column when row is a header row, else None."""
+    keys = [_header_key(cell) for cell in row]
+    return keys if sum(key is not None for key in keys) >= MIN_HEADER_MATCHES else None
+
+# --- 3. Reading CSVs and ZIPs ---
+def iter_csv_rows(data: bytes, name: str, modified: datetime.date = None):
+    """Yields (source, details, modified date) for every data row of a CSV or a ZIP of CSVs.
+
+    Rows of headerless files are mapped by position when they have 18 or 22 cells; other
+    rows without a recognisable header are skipped (their details are None). modified is
+    the file's date, used to resolve relative dates such as "next Monday". A corrupt or
+    mislabelled ZIP, or an unreadable member of one, is skipped the same way, as one row.
+    """
+    if name.lower().endswith(".zip") or data[:4] == b"PK\x03\x04":
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile:
+            yield name, None, modified
+            return
+        with archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".csv"):
+                    member_date = datetime.date(*info.date_time[:3])
+                    try:
+                        member = archive.read(info)
+                    except (zipfile.BadZipFile, zlib.error, NotImplementedError):
+                        # CRC mismatch, truncated data, or an unsupported compression method
+                        yield f"{name}/{info.filename}", None, member_date
+                        continue
+                    yield from iter_csv_rows(member, f"{name}/{info.filename}", member_date)
+        return
+
+    text = data.decode("utf-8-sig", errors="replace")
+    keys = None
+    for line_number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        header = map_header(row)
+        if header is not None:
+            keys = header
+            continue
+        row_keys = keys or LEGACY_LAYOUTS.get(len(row))
+        if row_keys is None:
+            yield f"{name}:{line_number}", None, modified
+            continue
+        details = {key: cell.strip() for key, cell in zip(row_keys, row) if key is not None and cell.strip()}
+        yield f"{name}:{line_number}", details, modified
+
+
+def normalize_rows(rows: list) -> list:
+    """Normalizes every field column at once (each distinct value is normalized once)."""
+    references = [modified for _, modified in rows]
+    records = [details for details, _ in rows]
+    contacted = dates.normalize_column([details.get("date_contacted", "") for details in records], references)
+    # As in the app, the other dates count from the contact date when there is one
+    references = [value if dates.CANONICAL.fullmatch(str(value)) else reference
+                  for value, reference in zip(contacted, references)]
+    for key in FIELD_KEYS:
+        if key in DATE_FIELDS:
+            column = contacted if key == "date_contacted" else dates.normalize_column(
+                [details.get(key, "") for details in records], references
+            )
+        else:
+            memo = {}
+            column = [details.get(key, "") for details in records]
+            column = [memo[value] if value in memo else memo.setdefault(value, normalize_value(key, value))
+                      for value in column]
+        for details, value in zip(records, column):
+            if value and not _missing(value):
+                details[key] = value
+            else:
+                details.pop(key, None)
+    return records
+
+# --- 4. Merge Keys ---
+COMPANY_SUFFIXES = re.compile(r"\b(?:pvt|private|ltd|limited|inc|llc|llp|corp|corporation|co|company|plc|gmbh)\b")
+ROLE_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "dev": "developer", "engg": "engineer", "mgr": "manager"}
+
+
+@lru_cache(maxsize=65536)
+def _squash(value) -> str:
+    return re.sub(r"[^a-z0-9@+]+", " ", str(value or "").lower()).strip()
+
+
+@lru_cache(maxsize=65536)
+def normalize_company(value) -> str:
+    return " ".join(COMPANY_SUFFIXES.sub(" ", _squash(value)).split())
+
+
+@lru_cache(maxsize=65536)
+def normalize_role(value) -> str:
+    return " ".join(ROLE_ABBREVIATIONS.get(word, word) for word in _squash(value).split())
+
+
+def normalize_contact(known: dict) -> str:
+    """The recruiter's email, else the last 10 phone digits, else their name (known: non-missing fields)."""
+    if known.get("email_id"):
+        return str(known["email_id"]).strip().lower()
+    digits = re.sub(r"\D", "", str(known.get("phone_number") or ""))
+    if len(digits) >= 7:
+        return digits[-10:]
+    return _squash(known.get("hr_name"))
+
+
+def known_fields(record: dict) -> dict:
+    """The tracker fields of a record that hold a value."""
+    return {key: value for key, value in record.items() if key in FIELD_KEYS and value and not _missing(value)}
+
+
+def merge_key(known: dict) -> str:
+    """Hash of normalized (company, role, recruiter contact) of known_fields(); rows with neither
+    company nor role only merge with exact duplicates."""
+    company = normalize_company(known.get("client_company") or known.get("recruiter_company"))
+    role = normalize_role(known.get("role_position"))
+    if company or role:
+        identity = f"{company}|{role}|{normalize_contact(known)}"
+    else:
+        identity = "row|" + "|".join(_squash(known.get(key)) for key in FIELD_KEYS)
+    return hashlib.blake2b(identity.encode("utf-8"), digest_size=12).hexdigest()
+
+
+# How two values of a field are compared: "Acme Pvt Ltd" and "ACME Private Limited" do not conflict
+COMPARE_AS = {
+    "client_company": normalize_company, "recruiter_company": normalize_company, "role_position": normalize_role,
+    # Same last ten digits as normalize_contact, so "+91 98765 43210" and "9876543210" agree
+    "phone_number": lambda v: re.sub(r"\D", "", v)[-10:],
+}
+
+
+def _same(key: str, first, second) -> bool:
+    comparable = COMPARE_AS.get(key, _squash)
+    return first == second or comparable(str(first)) == comparable(str(second))
+
+
+def _contact_date(details: dict) -> str:
+    # Stored dates sort as text; anything unresolved sorts first
+    value = str(details.get("date_contacted") or "")
+    return value if dates.CANONICAL.fullmatch(value) else ""
+
+
+def merge_into(base: dict, incoming: dict, source: str, conflicts: list, label: str, wins_ties: bool = True) -> dict:
+    """Fields of incoming that base lacks, plus conflicting ones when incoming was contacted later
+    (or on the same date, when wins_ties). Each conflicting field is appended to conflicts with the value kept.
+    """
+    incoming_date, base_date = _contact_date(incoming), _contact_date(base)
+    incoming_wins = incoming_date > base_date or (wins_ties and incoming_date == base_date)
+    changes = {}
+    for key, value in incoming.items():
+        if key not in FIELD_KEYS:
+            continue
+        current = base.get(key)
+        if current is None:
+            changes[key] = value
+        elif not _same(key, current, value):
+            kept, dropped = (value, current) if incoming_wins else (current, value)
+            conflicts.append({"record": label, "field": key, "kept": kept, "dropped": dropped, "source": source})
+            if incoming_wins:
+                changes[key] = value
+    return changes
+
+# --- 5. The Import ---
+def import_files(files, path: str = None, dry_run: bool = False) -> dict:
+    """Imports (name, bytes[, modified date]) CSVs/ZIPs into the tracker; returns counts and the conflicts.
+
+    Rows are merged among themselves first (later files win ties), then joined to existing
+    tracker records on the same key: new keys are added, known ones only gain missing fields
+    or values from a later contact date (the tracker wins ties).
+    """
+    rows, sources, skipped, file_count = [], [], 0, 0
+    for name, data, *modified in files:
+        file_count += 1
+        for source, details, row_modified in iter_csv_rows(data, name, modified[0] if modified else None):
+            if details is None or not details:
+                skipped += 1
+                continue
+            rows.append((details, row_modified))
+            sources.append(source)
+    records = normalize_rows(rows)
+
+    # Merge the imported rows with each other
+    conflicts, merged, merged_sources = [], {}, {}
+    for details, source in zip(records, sources):
+        key = merge_key(details)
+        if key not in merged:
+            merged[key], merged_sources[key] = details, source
+            continue
+        merged[key].update(merge_into(merged[key], details, source, conflicts, merged_sources[key]))
+
+    # Join with the tracker on the same key
+    existing = {}
+    for record in tracker.iter_records(path):
+        existing.setdefault(merge_key(known_fields(record)), record)
+    new_records, updates = [], {}
+    for key, details in merged.items():
+        record = existing.get(key)
+        if record is None:
+            new_records.append(details)
+            continue
+        changes = merge_into(known_fields(record), details, merged_sources[key], conflicts, f"tracker #{record['id']}",
+                             wins_ties=False)
+        if changes:
+            updates[record["id"]] = changes
+
+    if not dry_run:
+        record_ids = tracker.add_records(new_records, path) if new_records else []
+        if updates:
+            tracker.update_records(updates, path)
+        # Only records whose reminder dates are new or changed need the due-date index touched
+        to_schedule = {record_id: details for record_id, details in zip(record_ids, new_records)
+                       if any(key in details for key in scheduler.REMINDER_FIELDS)}
+        for record in existing.values():
+            changes = updates.get(record["id"], {})
+            if any(key in changes for key in scheduler.REMINDER_FIELDS):
+                to_schedule[record["id"]] = dict(record, **changes)
+        if to_schedule:
+            scheduler.schedule_records(to_schedule, path)
+
+    return {
+        "files": file_count,
+        "rows": len(records),
+        "skipped_rows": skipped,
+        "duplicates_merged": len(records) - len(merged),
+        "added": len(new_records),
+        "updated": len(updates),
+        "unchanged": len(merged) - len(new_records) - len(updates),
+        "conflicts": conflicts,
+    }
+
+
+def write_conflicts_csv(conflicts: list) -> str:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=["record", "field", "kept", "dropped", "source"])
+    writer.writeheader()
+    writer.writerows(conflicts)
+    return output.getvalue()
+
+# --- 6. Standalone Execution Block ---
+if __name__ == "__main__":
+    import time
+
+    arguments = sys.argv[1:]
+    dry_run = "--dry-run" in arguments
+    conflicts_path = None
+    if "--conflicts" in arguments:
+        position = arguments.index("--conflicts")
+        conflicts_path = arguments[position + 1]
+        del arguments[position:position + 2]
+    paths = [argument for argument in arguments if argument != "--dry-run"]
+    if not paths:
+        print("Usage: python csv_import.py <file.csv|file.zip> ... [--dry-run] [--conflicts conflicts.csv]")
+        sys.exit(1)
+
+    started = time.perf_counter()
+
+    def read(file_path: str):
+        with open(file_path, "rb") as legacy_file:
+            return file_path, legacy_file.read(), datetime.date.fromtimestamp(os.path.getmtime(file_path))
+    report = import_files((read(file_path) for file_path in paths), dry_run=dry_run)
+    for label in ("files", "rows", "skipped_rows", "duplicates_merged", "added", "updated", "unchanged"):
+        print(f"{label:<20}{report[label]:>10}")
+    print(f"{'conflicts':<20}{len(report['conflicts']):>10}")
+    if conflicts_path:
+        with open(conflicts_path, "w", newline="", encoding="utf-8") as conflicts_file:
+            conflicts_file.write(write_conflicts_csv(report["conflicts"]))
+    print(f"{'dry run, nothing written' if dry_run else 'done'} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,399 @@
+# dates.py (Local resolution of free-form dates, times and time zones)
+#
+# Usage: python dates.py "next Tuesday 3pm IST" ["2025-11-03"]    resolve one expression
+#        python dates.py --tracker [job_tracker.db]                  normalize every tracker date
+#
+# Recruiters write "next Tuesday 3pm", "1st Dec", "Wednesday 10.30" or "tomorrow 11:30 IST". Those are resolved
+# here against the message timestamp / date_contacted instead of asking the model to
+# re-format them, and stored as "YYYY-MM-DD", "YYYY-MM-DD HH:MM" or "YYYY-MM-DD HH:MM +HH:MM".
+
+# --- 1. Import necessary libraries ---
+import re
+import sys
+import datetime
+from collections import namedtuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# --- 2. Vocabulary ---
+Resolved = namedtuple("Resolved", ["date", "time", "tzinfo"])
+
+EMPTY_VALUES = {"", "not specified", "n/a", "na", "none", "unknown", "null", "tbd", "tba", "-"}
+# Interviews without a stated time go in the calendar at this hour
+DEFAULT_TIME = datetime.time(10, 0)
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "couple of": 2, "few": 3,
+}
+# Fixed UTC offsets (hours) for the abbreviations recruiters use; CST is read as US Central
+TIMEZONE_ABBREVIATIONS = {
+    "utc": 0, "gmt": 0, "ist": 5.5, "bst": 1, "cet": 1, "cest": 2, "eet": 2, "eest": 3,
+    "est": -5, "edt": -4, "cst": -6, "cdt": -5, "mst": -7, "mdt": -6, "pst": -8, "pdt": -7,
+    "sgt": 8, "hkt": 8, "jst": 9, "kst": 9, "aest": 10, "aedt": 11, "gst": 4, "pkt": 5, "npt": 5.75,
+}
+
+# Whole words only: "month" is not Monday and "market" is not March (the first three letters are the key)
+MONTH_NAME = (
+    r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?"
+    r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?"
+)
+WEEKDAY_NAME = r"(mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b\.?"
+# "2-3 days" counts as the later bound
+NUMBER = r"(\d+(?:\s*(?:-|to)\s*\d+)?|an?|one|two|three|four|five|six|seven|eight|nine|ten|couple of|few)"
+
+# Stored values, and the ISO forms models usually return, skip the grammar entirely
+CANONICAL = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*(?:(Z)|([+-])(\d{2}):?(\d{2}))?)?"
+)
+IANA_ZONE = re.compile(r"\b([A-Z][a-z]+(?:/[A-Z][A-Za-z_]+)+)\b")
+UTC_OFFSET = re.compile(r"\b(?:utc|gmt)\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?\b")
+# A bare offset only counts after whitespace or a time, so the "-2025" of "10-11-2025" is never one
+NUMERIC_OFFSET = re.compile(r"(?:(?<=\s)|(?<=:\d\d))([+-])(\d{2}):?(\d{2})\b")
+ZONE_ABBREVIATION = re.compile(r"\b(" + "|".join(sorted(TIMEZONE_ABBREVIATIONS, key=len, reverse=True)) + r")\b")
+TIME_12H = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?\s?m\b\.?")
+TIME_24H = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)(?::[0-5]\d)?(?:\s*hrs?\b\.?)?")
+TIME_HRS = re.compile(r"\b([01]\d|2[0-3])\.?([0-5]\d)\s*hrs?\b\.?")
+# "10.30" with no am/pm; never part of a dotted date such as "10.11.2025" or "2025.12.03"
+TIME_DOTTED = re.compile(r"(?<![\d./-])([01]?\d|2[0-3])\.([0-5]\d)(?![\d]|[./-]\d)")
+TIME_WORDS = {"noon": datetime.time(12, 0), "midday": datetime.time(12, 0), "midnight": datetime.time(0, 0)}
+TIME_WORD = re.compile(r"\b(noon|midday|midnight)\b")
+
+YEAR_FIRST = re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})([-/.])(\d{1,2})(?:\2(\d{4}|\d{2}))?\b")
+DAY_MONTH = re.compile(r"\b(\d{1,2})(?:\s+of)?\s+" + MONTH_NAME + r"(?:\s+(\d{4}))?")
+MONTH_DAY = re.compile(r"\b" + MONTH_NAME + r"\s+(\d{1,2})\b(?:\s+(\d{4}))?")
+RELATIVE_DAY = re.compile(r"\b(day after tomorrow|day before yesterday|tomorrow|tmrw|tmr|today|tonight|yesterday)\b")
+OFFSET_AHEAD = re.compile(r"\b(?:in|after|within)\s+(?:the\s+next\s+)?" + NUMBER + r"\s+(day|week|month)s?\b")
+OFFSET_LATER = re.compile(r"\b" + NUMBER + r"\s+(day|week|month)s?\s+(?:from\s+(?:now|today)|later|after|hence)\b")
+OFFSET_AGO = re.compile(r"\b" + NUMBER + r"\s+(day|week|month)s?\s+ago\b")
+WEEKDAY = re.compile(r"\b(?:(next|this|coming|upcoming|on)\s+)?" + WEEKDAY_NAME)
+PERIOD = re.compile(r"\b(next|this|coming)\s+(week|month)\b|\bend\s+of\s+(?:the\s+)?(week|month)\b|\beo([wm])\b")
+
+# --- 3. Helpers ---
+def _as_reference(reference) -> datetime.date:
+    if reference is None:
+        return datetime.date.today()
+    if isinstance(reference, datetime.datetime):
+        return reference.date()
+    if isinstance(reference, datetime.date):
+        return reference
+    resolved = parse(reference)
+    return resolved.date if resolved else datetime.date.today()
+
+
+def _fixed_zone(hours: float) -> datetime.timezone:
+    return datetime.timezone(datetime.timedelta(minutes=round(hours * 60)))
+
+
+def _number(word: str) -> int:
+    digits = re.findall(r"\d+", word)
+    return int(digits[-1]) if digits else NUMBER_WORDS[word]
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    for candidate_day in range(day.day, 27, -1):
+        try:
+            return datetime.date(year, month, candidate_day)
+        except ValueError:
+            continue
+    return datetime.date(year, month, min(day.day, 28))
+
+
+def _shift(reference: datetime.date, amount: int, unit: str) -> datetime.date:
+    if unit == "month":
+        return _add_months(reference, amount)
+    return reference + datetime.timedelta(days=amount * (7 if unit == "week" else 1))
+
+
+def _closest_year(month: int, day: int, reference: datetime.date):
+    """A date written without a year is the occurrence closest to the reference date."""
+    candidates = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidates.append(datetime.date(year, month, day))
+        except ValueError:
+            continue
+    return min(candidates, key=lambda candidate: abs((candidate - reference).days)) if candidates else None
+
+
+def _make_date(year, month: int, day: int, reference: datetime.date):
+    if year is None:
+        return _closest_year(month, day, reference)
+    year = int(year)
+    if year < 100:
+        year += 2000
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _take(pattern, text: str):
+    """Searches text and blanks the match out, so later rules never see the same characters."""
+    match = pattern.search(text)
+    if match is None:
+        return None, text
+    return match, text[:match.start()] + " " + text[match.end():]
+
+# --- 4. Resolution ---
+def _parse_zone(original: str, text: str):
+    match = IANA_ZONE.search(original)
+    if match:
+        try:
+            zone = ZoneInfo(match.group(1))
+            return zone, text.replace(match.group(1).lower(), " ")
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    match, text = _take(UTC_OFFSET, text)
+    if match:
+        sign = -1 if match.group(1) == "-" else 1
+        return _fixed_zone(sign * (int(match.group(2)) + int(match.group(3) or 0) / 60)), text
+    match, text = _take(NUMERIC_OFFSET, text)
+    if match:
+        sign = -1 if match.group(1) == "-" else 1
+        return _fixed_zone(sign * (int(match.group(2)) + int(match.group(3)) / 60)), text
+    match, text = _take(ZONE_ABBREVIATION, text)
+    if match:
+        return _fixed_zone(TIMEZONE_ABBREVIATIONS[match.group(1)]), text
+    return None, text
+
+
+def _parse_time(text: str):
+    match, text = _take(TIME_12H, text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if 1 <= hour <= 12 and minute < 60:
+            hour = hour % 12 + (12 if match.group(3) == "p" else 0)
+            return datetime.time(hour, minute), text
+    for pattern in (TIME_24H, TIME_HRS, TIME_DOTTED):
+        match, text = _take(pattern, text)
+        if match:
+            return datetime.time(int(match.group(1)), int(match.group(2))), text
+    match, text = _take(TIME_WORD, text)
+    if match:
+        return TIME_WORDS[match.group(1)], text
+    return None, text
+
+
+def _parse_day(text: str, reference: datetime.date):
+    """The calendar date in text (explicit dates first, then relative phrases), or None."""
+    match = YEAR_FIRST.search(text)
+    if match:
+        return _make_date(match.group(1), int(match.group(2)), int(match.group(3)), reference)
+    match = DAY_MONTH.search(text)
+    if match:
+        return _make_date(match.group(3), MONTHS[match.group(2)[:3]], int(match.group(1)), reference)
+    match = MONTH_DAY.search(text)
+    if match:
+        return _make_date(match.group(3), MONTHS[match.group(1)[:3]], int(match.group(2)), reference)
+    match = NUMERIC_DATE.search(text)
+    # Without a year only "3/12" is a date; "2-3" and "10.30" are ranges and times
+    if match and (match.group(4) or match.group(2) == "/"):
+        first, second = int(match.group(1)), int(match.group(3))
+        # Day first (as in the recruiters' own locale) unless only month first is possible
+        day, month = (second, first) if second > 12 and first <= 12 else (first, second)
+        if 1 <= month <= 12:
+            return _make_date(match.group(4), month, day, reference)
+        return None
+
+    match = RELATIVE_DAY.search(text)
+    if match:
+        word = match.group(1)
+        offsets = {"day after tomorrow": 2, "tomorrow": 1, "tmrw": 1, "tmr": 1, "yesterday": -1, "day before yesterday": -2}
+        return reference + datetime.timedelta(days=offsets.get(word, 0))
+    match = OFFSET_AHEAD.search(text) or OFFSET_LATER.search(text)
+    if match:
+        return _shift(reference, _number(match.group(1)), match.group(2))
+    match = OFFSET_AGO.search(text)
+    if match:
+        return _shift(reference, -_number(match.group(1)), match.group(2))
+    match = WEEKDAY.search(text)
+    if match:
+        days_ahead = (WEEKDAYS[match.group(2)[:3]] - reference.weekday()) % 7
+        if match.group(1) == "next" and days_ahead == 0:
+            days_ahead = 7
+        return reference + datetime.timedelta(days=days_ahead)
+    match = PERIOD.search(text)
+    if match:
+        if match.group(2) == "week":
+            # "next week": its Monday; "this week": today
+            return reference + datetime.timedelta(days=7 - reference.weekday()) if match.group(1) == "next" else reference
+        if match.group(2) == "month":
+            first_of_month = reference.replace(day=1)
+            return _add_months(first_of_month, 1) if match.group(1) != "this" else reference
+        if (match.group(3) or match.group(4)) in ("week", "w"):
+            return reference + datetime.timedelta(days=(4 - reference.weekday()) % 7)
+        return _add_months(reference.replace(day=1), 1) - datetime.timedelta(days=1)
+    return None
+
+
+def parse(value, reference=None):
+    """Resolves a free-form date/time expression to Resolved(date, time, tzinfo), or None.
+
+    reference is the date (or datetime, or date string) relative expressions count from:
+    the message timestamp or date_contacted, today when omitted. time and tzinfo are None
+    when the text does not state them.
+    """
+    original = str(value if value is not None else "").strip()
+    if original.lower() in EMPTY_VALUES:
+        return None
+    match = CANONICAL.fullmatch(original)
+    if match:
+        return _from_canonical(match)
+
+    reference_date = _as_reference(reference)
+    text = re.sub(r"(\d+)(st|nd|rd|th)\b", r"\1", original.lower())
+    text = re.sub(r"[,()]", " ", text)
+    tzinfo, text = _parse_zone(original, text)
+    time, text = _parse_time(text)
+    day = _parse_day(text, reference_date)
+    if day is None:
+        if time is None:
+            return None
+        # "3pm IST" on its own means that time on the reference day
+        day = reference_date
+    return Resolved(day, time, tzinfo)
+
+
+def _from_canonical(match) -> Resolved:
+    year, month, day, hour, minute, zulu, sign, offset_hours, offset_minutes = match.groups()
+    try:
+        date = datetime.date(int(year), int(month), int(day))
+        time = datetime.time(int(hour), int(minute)) if hour is not None else None
+    except ValueError:
+        return None
+    tzinfo = None
+    if zulu:
+        tzinfo = datetime.timezone.utc
+    elif sign:
+        tzinfo = _fixed_zone((-1 if sign == "-" else 1) * (int(offset_hours) + int(offset_minutes) / 60))
+    return Resolved(date, time, tzinfo)
+
+
+def resolve_date(value, reference=None):
+    """The calendar date of an expression, or None."""
+    resolved = parse(value, reference)
+    return resolved.date if resolved else None
+
+
+def resolve_datetime(value, reference=None, default_time: datetime.time = DEFAULT_TIME):
+    """A datetime for calendar entries: aware when a zone was stated, default_time when no time was."""
+    resolved = parse(value, reference)
+    if resolved is None:
+        return None
+    moment = datetime.datetime.combine(resolved.date, resolved.time or default_time)
+    return moment.replace(tzinfo=resolved.tzinfo) if resolved.tzinfo else moment
+
+
+def format_resolved(resolved: Resolved) -> str:
+    """The tracker's stored form: 'YYYY-MM-DD', plus ' HH:MM' and ' +HH:MM' when known."""
+    text = resolved.date.isoformat()
+    if resolved.time is None:
+        return text
+    text += resolved.time.strftime(" %H:%M")
+    if resolved.tzinfo is not None:
+        offset = datetime.datetime.combine(resolved.date, resolved.time, resolved.tzinfo).strftime("%z")
+        text += f" {offset[:3]}:{offset[3:]}"
+    return text
+
+
+def normalize_value(value, reference=None):
+    """The stored form of an expression; text that is not a date is returned unchanged."""
+    resolved = parse(value, reference)
+    return format_resolved(resolved) if resolved else value
+
+# --- 5. Dates in Running Text ---
+# The day grammar above, for finding expressions in prose rather than resolving a single field value
+DAY_EXPRESSIONS = (YEAR_FIRST, DAY_MONTH, MONTH_DAY, NUMERIC_DATE, RELATIVE_DAY,
+                   OFFSET_AHEAD, OFFSET_LATER, OFFSET_AGO, WEEKDAY, PERIOD)
+
+
+def find_expressions(text: str) -> list:
+    """(start, end) spans of the date expressions in free text, in order.
+
+    Each span's text resolves with parse() / resolve_date(). A weekday next to a date
+    ("Monday, 10 Nov 2025") forms one span. Three-letter weekdays are skipped, since
+    "sat" or "wed" in prose is rarely a day.
+    """
+    # Lower-cased with ordinals and commas blanked out in place, so offsets still index text
+    searchable = re.sub(r"(?<=\d)(st|nd|rd|th)\b", "  ", str(text).lower())
+    searchable = re.sub(r"[,()]", " ", searchable)
+    spans = []
+    for pattern in DAY_EXPRESSIONS:
+        for match in pattern.finditer(searchable):
+            if pattern is NUMERIC_DATE and not (match.group(4) or match.group(2) == "/"):
+                continue
+            if pattern is WEEKDAY and len(match.group(2).rstrip(".")) == 3:
+                continue
+            spans.append((match.start(), match.end(), pattern is WEEKDAY))
+    merged = []
+    for start, end, weekday in sorted(spans):
+        if merged and (start < merged[-1][1] or (
+                weekday != merged[-1][2] and not searchable[merged[-1][1]:start].strip())):
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]), False)
+        else:
+            merged.append((start, end, weekday))
+    return [(start, end) for start, end, _ in merged]
+
+# --- 6. Whole Records and Columns ---
+def normalize_record_dates(details: dict, keys, received_at=None, anchor: str = "date_contacted") -> dict:
+    """Resolves a record's date fields (keys): the anchor first, then the others counting from it.
+
+    The anchor (when the recruiter made contact) is resolved against the message timestamp;
+    "interview next Tuesday" then counts from that contact date, or from the timestamp (or
+    today) when the record has none.
+    """
+    normalized = dict(details)
+    reference = received_at
+    if anchor in details:
+        contacted = parse(details[anchor], received_at)
+        if contacted is not None:
+            normalized[anchor] = format_resolved(contacted)
+            reference = contacted.date
+    for key in keys:
+        if key in details and key != anchor:
+            normalized[key] = normalize_value(details[key], reference)
+    return normalized
+
+
+def normalize_column(values, references=None) -> list:
+    """normalize_value over a whole column at once.
+
+    Stored values pass the CANONICAL fast path without parsing, and every distinct
+    (text, reference date) pair is resolved only once, so a tracker column costs
+    roughly one regex match per row.
+    """
+    references = references if references is not None else [None] * len(values)
+    memo = {}
+    normalized = []
+    for value, reference in zip(values, references):
+        text = str(value if value is not None else "").strip()
+        if CANONICAL.fullmatch(text) or text.lower() in EMPTY_VALUES:
+            normalized.append(value)
+            continue
+        reference_date = _as_reference(reference)
+        key = (text, reference_date)
+        if key not in memo:
+            memo[key] = normalize_value(text, reference_date)
+        normalized.append(memo[key])
+    return normalized
+
+# --- 7. Standalone Execution Block ---
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--tracker":
+        import scheduler
+        changed = scheduler.normalize_tracker_dates(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Normalized dates in {changed} record(s).")
+    elif len(sys.argv) in (2, 3):
+        resolved = parse(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
+        print(format_resolved(resolved) if resolved else "Could not resolve a date.")
+    else:
+        print('Usage: python dates.py "<expression>" [reference date]  |  python dates.py --tracker [db path]')
+        sys.exit(1)
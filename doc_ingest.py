@@ -0,0 +1,169 @@
+# doc_ingest.py (Resume / JD document ingestion for PDF and DOCX uploads)
+
+# --- 1. Import necessary libraries ---
+import os
+import io
+import json
+import hashlib
+import zipfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# Optional parsers: the app still works with pasted text when they are missing.
+# READ_ERRORS are what a corrupt or mislabelled upload raises inside them.
+READ_ERRORS = (zipfile.BadZipFile, KeyError)  # A DOCX is a ZIP; a ZIP without the expected parts raises KeyError
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+    READ_ERRORS += (PyPdfError,)
+except ImportError:
+    PdfReader = None
+try:
+    import docx
+    from docx.opc.exceptions import OpcError
+    READ_ERRORS += (OpcError,)
+except ImportError:
+    docx = None
+
+# --- 2. Configuration ---
+CACHE_DIR = os.environ.get("JOB_AGENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "job_agent_cache"))
+DOC_CACHE_DIR = os.path.join(CACHE_DIR, "doc_text")
+PAGES_PER_TASK = 4  # Pages handed to a worker at once; small enough that the first pages return quickly
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+SUPPORTED_TYPES = ["pdf", "docx"]
+
+_pool = None
+_memory_cache = {}
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Returns the process-wide extraction pool, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _pool
+
+# --- 3. Hash-Keyed Text Cache ---
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _cache_path(digest: str) -> str:
+    return os.path.join(DOC_CACHE_DIR, f"{digest}.json")
+
+
+def load_cached_pages(digest: str):
+    """Returns the cached page texts for a document hash, or None if never parsed."""
+    if digest in _memory_cache:
+        return _memory_cache[digest]
+    try:
+        with open(_cache_path(digest), encoding="utf-8") as cache_file:
+            pages = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    _memory_cache[digest] = pages
+    return pages
+
+
+def store_cached_pages(digest: str, pages: list) -> None:
+    _memory_cache[digest] = pages
+    os.makedirs(DOC_CACHE_DIR, exist_ok=True)
+    # Write to a temp file and rename so concurrent sessions never read a half-written entry
+    fd, tmp_path = tempfile.mkstemp(dir=DOC_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+        json.dump(pages, cache_file)
+    os.replace(tmp_path, _cache_path(digest))
+
+# --- 4. Worker Functions (run inside the process pool) ---
+# Parser errors are turned into ValueError in the worker itself, since not every parser
+# exception survives the trip back through the pool and callers only need to handle one type
+def _pdf_page_count(path: str) -> int:
+    try:
+        return len(PdfReader(path).pages)
+    except READ_ERRORS as e:
+        raise ValueError(f"not a readable PDF ({type(e).__name__}: {e})") from None
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> list:
+    try:
+        reader = PdfReader(path)
+        return [(reader.pages[index].extract_text() or "").strip() for index in range(start, stop)]
+    except READ_ERRORS as e:
+        raise ValueError(f"page {start + 1}-{stop} is not readable ({type(e).__name__}: {e})") from None
+
+
+def _extract_docx_text(data: bytes) -> list:
+    try:
+        document = docx.Document(io.BytesIO(data))
+    except READ_ERRORS as e:
+        raise ValueError(f"not a readable DOCX ({type(e).__name__}: {e})") from None
+    paragraphs = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            paragraphs.append(" | ".join(cell.text.strip() for cell in row.cells))
+    # DOCX has no real pages, so the whole body is returned as a single "page"
+    return ["\n".join(paragraphs)]
+
+# --- 5. Page-by-Page Extraction ---
+def _worker_result(future, filename: str):
+    try:
+        return future.result()
+    except ValueError as e:
+        raise ValueError(f"Could not read {filename}: {e}") from None
+
+
+def iter_document_pages(data: bytes, filename: str):
+    """Yields the text of each page in order, as soon as that page is ready.
+
+    Pages are parsed in the process pool in small batches; cached documents are
+    replayed without touching the pool. A corrupt or unsupported document raises
+    ValueError("Could not read <filename>: ...").
+    """
+    digest = content_hash(data)
+    cached = load_cached_pages(digest)
+    if cached is not None:
+        yield from cached
+        return
+
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    pages = []
+    if extension == "pdf":
+        if PdfReader is None:
+            raise RuntimeError("PDF support requires the 'pypdf' package.")
+        # Workers read from a temp file instead of receiving the whole document per task
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        futures = []
+        try:
+            with os.fdopen(fd, "wb") as pdf_file:
+                pdf_file.write(data)
+            pool = get_pool()
+            page_count = _worker_result(pool.submit(_pdf_page_count, path), filename)
+            futures = [
+                pool.submit(_extract_pdf_pages, path, start, min(start + PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PAGES_PER_TASK)
+            ]
+            for future in futures:
+                for page_text in _worker_result(future, filename):
+                    pages.append(page_text)
+                    yield page_text
+        finally:
+            # Stop queued batches if the caller abandoned the generator early
+            for future in futures:
+                future.cancel()
+            os.remove(path)
+    elif extension == "docx":
+        if docx is None:
+            raise RuntimeError("DOCX support requires the 'python-docx' package.")
+        pages = _worker_result(get_pool().submit(_extract_docx_text, data), filename)
+        yield from pages
+    else:
+        raise ValueError(f"Could not read {filename}: unsupported document type .{extension}")
+
+    # Only complete documents are cached, so an abandoned generator never stores a partial text
+    store_cached_pages(digest, pages)
+
+
+def extract_document_text(data: bytes, filename: str) -> str:
+    """Returns the full text of a PDF/DOCX document, using the hash cache when possible."""
+    return "\n\n".join(page for page in iter_document_pages(data, filename) if page)
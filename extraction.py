@@ -0,0 +1,555 @@
+# extraction.py (Core extraction logic shared by the web app and the ingestion pipelines)
+
+# --- 1. Import necessary libraries ---
+import os
+import io
+import csv
+import json
+import time
+import hashlib
+import datetime
+from functools import lru_cache
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from rate_limiter import limiter, estimate_tokens, RateLimitTimeout
+from shared_state import get_backend, state_key, REPLICA_ID
+import metrics
+import dates
+from fields import (
+    FIELD_KEYS, is_missing, field_status, normalize_record, prompt_key_lines, select_fields
+)
+
+# The model to use. 'gemini-2.5-flash' is the stable, current model.
+MODEL_ID = 'gemini-2.5-flash'
+
+# --- 2. The AI Prompt (FINAL MODIFIED) ---
+# The key list is generated from the field registry (fields.py); {key_lines} is filled per field selection
+EXTRACTION_PROMPT_TEMPLATE = """
+You are an expert data extraction assistant for job seekers. Your task is to analyze the provided texts: 1) Job Details (JD, email, call notes) and 2) Applicant Skills (Resume/Summary).
+
+**CRITICAL INSTRUCTION:** You MUST return the output as a single, valid JSON object. Do not add any explanatory text, markdown formatting, or code fences like ```
+
+**JSON Keys to use:**
+{key_lines}
+
+**Input Text (Job Details & Applicant Skills):**
+***
+{{text_input}}
+***
+
+**JSON Output:**
+"""
+
+
+@lru_cache(maxsize=64)
+def _extraction_prompt(keys: tuple) -> str:
+    return EXTRACTION_PROMPT_TEMPLATE.format(key_lines=prompt_key_lines(keys))
+
+
+def extraction_prompt(keys=None) -> str:
+    """The extraction prompt asking for the selected fields only (all of them by default)."""
+    return _extraction_prompt(tuple(select_fields(keys)))
+
+
+EXTRACTION_PROMPT = extraction_prompt()
+
+# Full column list of the job tracker CSV, in prompt order
+TRACKER_HEADERS = FIELD_KEYS
+
+# Parsed responses kept in the state backend (shared_state.py), keyed by a hash of the full prompt,
+# so an identical resubmission (same inputs, any session, any replica) never pays for a second model call
+RESPONSE_TTL_SECONDS = float(os.environ.get("JOB_AGENT_RESPONSE_TTL", str(7 * 24 * 3600)))
+# While one caller waits for the model, others asking the same prompt wait for its answer instead;
+# a claim left by a replica that died mid-call expires after this long
+IN_FLIGHT_TTL_SECONDS = 120
+
+# Quota errors that still slip through the limiter are retried after a pause, not surfaced
+MAX_QUOTA_RETRIES = 3
+QUOTA_RETRY_SECONDS = 20
+
+# Fleet-level numbers (metrics.py); the API server records into the same ones
+EXTRACTIONS = metrics.counter(
+    "extractions_total", "Finished extractions by source (model, offline) and outcome (ok, error).", ("source", "outcome")
+)
+MODEL_REQUESTS = metrics.counter(
+    "model_requests_total", "Model requests by outcome (ok, invalid_json, rate_limited, error).", ("model", "outcome")
+)
+MODEL_LATENCY = metrics.histogram(
+    "model_latency_seconds", "Duration of each model call, quota waits excluded.",
+    (0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60), ("model",)
+)
+MODEL_TOKENS = metrics.counter(
+    "model_tokens_total", "Tokens burned per model: prompt and output as billed, estimated when not reported.",
+    ("model", "type")
+)
+RESPONSE_CACHE = metrics.counter(
+    "response_cache_lookups_total", "Response cache lookups: hit, shared (another caller's in-flight answer) or miss.",
+    ("result",)
+)
+
+# --- 3. Input Assembly ---
+def combine_inputs(applicant_skills: str, call_details: str, recruiter_text: str) -> str:
+    """Combines the three form sections into the text block sent to the model."""
+    return (
+        f"--- APPLICANT SKILLS ---\n{applicant_skills}\n\n"
+        f"--- JOB DETAILS ---\n"
+        f"Call Summary: {call_details}\n\nDetailed Info:\n{recruiter_text}"
+    )
+
+# --- 4. The Core Logic Function ---
+def clean_model_output(text: str) -> str:
+    """Removes the surrounding code fences that the AI sometimes adds despite instructions."""
+    clean_response = text.strip()
+    if clean_response.startswith('```json'):
+        clean_response = clean_response[7:].strip()
+    elif clean_response.startswith('```'):
+        clean_response = clean_response[3:].strip()
+    if clean_response.endswith('```'):
+        clean_response = clean_response[:-3].strip()
+    return clean_response
+
+
+def response_cache_key(prompt_with_input: str, model_id: str = MODEL_ID) -> str:
+    return hashlib.sha256(f"{model_id}\n{prompt_with_input}".encode("utf-8")).hexdigest()
+
+
+def cached_response(cache_key: str):
+    """Returns a copy of a cached parsed response, or None."""
+    raw = get_backend().get(state_key("response", cache_key))
+    return json.loads(raw) if raw is not None else None
+
+
+def cache_response(cache_key: str, parsed_json: dict) -> None:
+    # Errors are never cached, so a retry after a failure always reaches the model
+    get_backend().set(state_key("response", cache_key), json.dumps(parsed_json).encode("utf-8"), RESPONSE_TTL_SECONDS)
+
+
+def claim_response(cache_key: str) -> bool:
+    """Marks this prompt as being sent to the model; False if another caller already has."""
+    return get_backend().add(state_key("inflight", cache_key), REPLICA_ID.encode(), IN_FLIGHT_TTL_SECONDS)
+
+
+def release_response(cache_key: str) -> None:
+    get_backend().delete(state_key("inflight", cache_key))
+
+
+def response_pending(cache_key: str) -> bool:
+    return get_backend().get(state_key("inflight", cache_key)) is not None
+
+
+def await_response(cache_key: str, timeout: float = IN_FLIGHT_TTL_SECONDS):
+    """Waits for the caller holding the claim to cache its answer; None if it gave up without one."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        cached = cached_response(cache_key)
+        if cached is not None:
+            return cached
+        if not response_pending(cache_key):
+            # Checked again: the answer may have landed between the two lookups
+            return cached_response(cache_key)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+    return None
+
+
+def parse_json_object(text: str) -> dict:
+    """Parses model output that must be a single JSON object (raises JSONDecodeError otherwise)."""
+    clean_response = clean_model_output(text)
+    parsed_json = json.loads(clean_response)
+    if not isinstance(parsed_json, dict):
+        raise json.JSONDecodeError("Expected a JSON object", clean_response, 0)
+    return parsed_json
+
+
+def generate_json(prompt_with_input: str) -> dict:
+    """Sends a prompt to the model and parses the JSON object it returns (cached per prompt)."""
+    cache_key = response_cache_key(prompt_with_input)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        RESPONSE_CACHE.inc(1, ("hit",))
+        return cached
+    # The same prompt already on its way to the model (another session or replica): share its answer
+    while not claim_response(cache_key):
+        cached = await_response(cache_key)
+        if cached is not None:
+            RESPONSE_CACHE.inc(1, ("shared",))
+            return cached
+    RESPONSE_CACHE.inc(1, ("miss",))
+
+    model = genai.GenerativeModel(MODEL_ID)
+    response_text = ""
+    try:
+        response = call_model(model, prompt_with_input)
+        response_text = response.text
+        parsed_json = parse_json_object(response_text)
+        cache_response(cache_key, parsed_json)
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "ok"))
+        return parsed_json
+    except json.JSONDecodeError:
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "invalid_json"))
+        return {"error": f"The AI returned an invalid JSON format. Raw output: {clean_model_output(response_text)}"}
+    except RateLimitTimeout as e:
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "rate_limited"))
+        return {"error": f"The AI service is busy, please try again shortly. ({e})"}
+    except Exception as e:
+        MODEL_REQUESTS.inc(1, (MODEL_ID, "error"))
+        return {"error": f"An error occurred: {e}"}
+    finally:
+        release_response(cache_key)
+
+
+def call_model(model, prompt_with_input: str):
+    """Sends one request through the shared rate limiter, retrying on quota errors."""
+    estimated = estimate_tokens(prompt_with_input)
+    for attempt in range(MAX_QUOTA_RETRIES + 1):
+        limiter.acquire(estimated)
+        started = time.perf_counter()
+        try:
+            response = model.generate_content(prompt_with_input)
+        except google_exceptions.ResourceExhausted:
+            if attempt == MAX_QUOTA_RETRIES:
+                raise
+            # Hold back every session, not just this one, so the retries don't cause a 429 storm
+            limiter.penalize(QUOTA_RETRY_SECONDS)
+            continue
+        finally:
+            MODEL_LATENCY.observe(time.perf_counter() - started, (MODEL_ID,))
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", 0) if usage else 0
+        if actual:
+            limiter.record_usage(estimated, actual)
+        record_tokens(MODEL_ID, getattr(usage, "prompt_token_count", 0) if usage else 0,
+                      getattr(usage, "candidates_token_count", 0) if usage else 0, estimated)
+        return response
+
+
+def record_tokens(model_id: str, prompt_tokens: int, output_tokens: int, estimated: int) -> None:
+    if prompt_tokens or output_tokens:
+        MODEL_TOKENS.inc(prompt_tokens, (model_id, "prompt"))
+        MODEL_TOKENS.inc(output_tokens, (model_id, "output"))
+    else:
+        MODEL_TOKENS.inc(estimated, (model_id, "estimated"))
+
+
+def process_recruiter_text(text_to_process: str, keys=None, received_at=None) -> dict:
+    """Extracts the selected fields (all by default); fewer fields mean a shorter prompt and answer.
+
+    Relative dates in the result are resolved against received_at (the message timestamp; today by default).
+    """
+    parsed_json = generate_json(extraction_prompt(keys).format(text_input=text_to_process))
+    if "error" in parsed_json:
+        EXTRACTIONS.inc(1, ("model", "error"))
+        return parsed_json
+    EXTRACTIONS.inc(1, ("model", "ok"))
+    return normalize_record(parsed_json, received_at)
+
+# --- 5. iCalendar File Generation Function (Unchanged) ---
+def parse_interview_start(details: dict):
+    """Returns the interview start as a datetime, or None when the date is unusable.
+
+    Free-form values ("next Tuesday 3pm IST", "1st Dec") are resolved against date_contacted;
+    the result is time-zone aware when a zone was given, and at 10:00 when no time was.
+    """
+    reference = dates.resolve_date(details.get("date_contacted"))
+    return dates.resolve_datetime(details.get("interview_scheduled_date", "Not specified"), reference)
+
+
+def create_ics_file(details: dict) -> str:
+    role = details.get("role_position", "Job Interview")
+    client = details.get("client_company", "Client Company")
+    recruiter = details.get("hr_name", "Recruiter")
+    mode = details.get("interview_mode", "Mode Not Specified")
+    start_date = parse_interview_start(details)
+    if start_date is None:
+        return ""
+    end_date = start_date + datetime.timedelta(hours=1)
+    dt_format = "%Y%m%dT%H%M%S"
+    if start_date.tzinfo is not None:
+        # A stated zone becomes UTC, so calendars show the interview at the right local time
+        start_date, end_date = (moment.astimezone(datetime.timezone.utc) for moment in (start_date, end_date))
+        dt_format += "Z"
+    dt_start = start_date.strftime(dt_format)
+    dt_end = end_date.strftime(dt_format)
+    dt_stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    summary = f"Interview: {role} @ {client}"
+    description = (
+        f"Role: {role}\n"
+        f"Company: {client}\n"
+        f"Recruiter: {recruiter}\n"
+        f"Round 1 Details: {details.get('round_1_details', 'N/A')}\n"
+        f"Mode: {mode}\n"
+        f"HR Contact: {details.get('email_id', 'N/A')} / {details.get('phone_number', 'N/A')}"
+    )
+
+    ics_content = f"""BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//AI Job Agent//EN
+BEGIN:VEVENT
+UID:{dt_stamp}-{hash(summary)}
+DTSTAMP:{dt_stamp}
+DTSTART:{dt_start}
+DTEND:{dt_end}
+SUMMARY:{summary}
+DESCRIPTION:{description}
+END:VEVENT
+END:VCALENDAR"""
+    return ics_content.replace('\n', '\r\n')
+
+# --- 6. CSV Tracker Generation ---
+def build_tracker_csv(rows: list, keys=None) -> str:
+    """Writes extracted records as a job tracker CSV (all registry columns, or the selected ones)."""
+    headers = select_fields(keys)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=headers, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        # Ensure all missing keys in the dictionary are filled with "" to prevent DictWriter errors
+        writer.writerow({key: row.get(key, "") for key in headers})
+    return output.getvalue()
+
+
+def result_id(details: dict) -> str:
+    """Stable identifier for an extracted record, used to memoize its download payloads."""
+    return hashlib.sha256(json.dumps(details, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+# --- 7. Field Validity Tracking ---
+# Types, patterns and missing markers live in the field registry (fields.py)
+def assess_fields(details: dict, keys=None) -> dict:
+    """Returns {key: status} for every selected tracker field of an extraction result."""
+    return {key: field_status(key, details.get(key)) for key in select_fields(keys)}
+
+
+def find_gaps(details: dict, keys=None) -> list:
+    """Keys whose value is missing or failed validation, in tracker order."""
+    return [key for key, status in assess_fields(details, keys).items() if status != "ok"]
+
+# --- 8. Targeted Re-extraction ---
+GAP_FILL_PROMPT = """
+Extract ONLY the following fields from the input text. Return a single valid JSON object containing exactly these keys and nothing else (no markdown, no code fences). Copy dates and times as written (e.g. "next Tuesday 3pm IST"); they are resolved locally. If a value is truly not present, use "Not specified".
+
+**Keys:**
+{key_lines}
+
+**Input Text:**
+***
+{text_input}
+***
+
+**JSON Output:**
+"""
+
+FOLLOW_UP_PROMPT = """
+Here is the current job tracker record as JSON, followed by a new note about the same opportunity. Return a single valid JSON object containing ONLY the keys whose value the note adds or changes (no markdown, no code fences). Copy dates and times as written. Return {{}} if nothing changes.
+
+**Allowed keys:** {allowed_keys}
+
+**Current Record:**
+{record_json}
+
+**New Note:**
+***
+{note}
+***
+
+**JSON Output:**
+"""
+
+
+def merge_results(details: dict, updates: dict, keys=None) -> dict:
+    """Overlays model updates on an existing record, ignoring empty or unrequested values."""
+    allowed = set(keys) if keys is not None else set(TRACKER_HEADERS)
+    merged = dict(details)
+    for key, value in updates.items():
+        if key in allowed and not is_missing(value):
+            merged[key] = value
+    return merged
+
+
+def compact_record(details: dict) -> str:
+    """JSON of the known fields only, so unchanged context costs as few tokens as possible."""
+    known = {key: details[key] for key in TRACKER_HEADERS if key in details and not is_missing(details[key])}
+    return json.dumps(known, ensure_ascii=False, separators=(",", ":"))
+
+
+def fill_gaps(text_to_process: str, details: dict, keys=None) -> dict:
+    """Asks the model for only the missing/invalid keys and merges them into the record."""
+    # By default only the fields this record was extracted with, so a field subset stays a subset
+    keys = list(keys) if keys is not None else find_gaps(details, details.keys())
+    if not keys:
+        return dict(details)
+    updates = generate_json(GAP_FILL_PROMPT.format(key_lines=prompt_key_lines(keys), text_input=text_to_process))
+    if "error" in updates:
+        return updates
+    # Relative dates in the original text count from when the recruiter made contact
+    return merge_results(details, normalize_record(updates, details.get("date_contacted")), keys)
+
+
+def extract_delta(details: dict, note: str, received_at=None) -> dict:
+    """Returns only the fields a new note/message changes, given the compact current record.
+
+    The prompt holds the record and the new text only, never earlier messages, so its
+    size stays flat however long the conversation gets. Relative dates in the note count
+    from received_at (default today).
+    """
+    updates = generate_json(FOLLOW_UP_PROMPT.format(
+        allowed_keys=", ".join(TRACKER_HEADERS),
+        record_json=compact_record(details),
+        note=note
+    ))
+    if "error" in updates:
+        return updates
+    updates = normalize_record(updates, received_at)
+    return {
+        key: value for key, value in updates.items()
+        if key in TRACKER_HEADERS and not is_missing(value) and str(value) != str(details.get(key, ""))
+    }
+
+
+def merge_follow_up_note(details: dict, note: str) -> dict:
+    """Applies a follow-up note to a record, asking the model only for changed fields."""
+    updates = extract_delta(details, note)
+    if "error" in updates:
+        return updates
+    return merge_results(details, updates)
+
+# --- 9. Packed Extraction (several short messages per model call) ---
+# Short messages (a LinkedIn ping, a two-line call note) are mostly prompt overhead when sent
+# alone, so they share one request: the key list and applicant skills once, then each message
+# between numbered delimiters, answered with a JSON array of records tagged with the same ids.
+PACKED_EXTRACTION_PROMPT = """
+You are an expert data extraction assistant for job seekers. Below are several SEPARATE recruiter messages, each between "<<<MESSAGE n>>>" and "<<<END n>>>", followed by the applicant's skills. Extract one record per message; never mix details between messages.
+
+**CRITICAL INSTRUCTION:** Return a single valid JSON array with exactly one object per message, in any order. Each object must contain "message_id" (the number n of its message) and all of the keys below. Do not add any explanatory text, markdown formatting, or code fences.
+
+**JSON Keys to use:**
+{key_lines}
+
+**Applicant Skills (shared by all messages):**
+***
+{applicant_skills}
+***
+
+**Messages:**
+{messages}
+
+**JSON Output:**
+"""
+
+# Messages longer than this are extracted alone; packing only pays off for short ones
+PACK_MAX_MESSAGE_CHARS = 1500
+PACK_MAX_MESSAGES = 8
+PACK_MAX_CHARS = 8000
+
+
+def pack_messages(texts: list) -> list:
+    """Groups indexes of short texts into packs by count and size; long texts get a pack of their own."""
+    packs, current, current_chars = [], [], 0
+    for index, text in enumerate(texts):
+        if len(text) > PACK_MAX_MESSAGE_CHARS:
+            packs.append([index])
+            continue
+        if current and (len(current) >= PACK_MAX_MESSAGES or current_chars + len(text) > PACK_MAX_CHARS):
+            packs.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += len(text)
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_prompt(texts: list, applicant_skills: str = "") -> str:
+    key_lines = prompt_key_lines()
+    messages = "\n\n".join(f"<<<MESSAGE {n}>>>\n{text}\n<<<END {n}>>>" for n, text in enumerate(texts, start=1))
+    return PACKED_EXTRACTION_PROMPT.format(key_lines=key_lines, applicant_skills=applicant_skills, messages=messages)
+
+
+def parse_packed_records(text: str, count: int) -> dict:
+    """Splits a packed response into {message number: record}.
+
+    Entries that are not objects, carry an unknown or repeated message_id, or hold none
+    of the tracker keys are dropped, so only their messages need a second call.
+    """
+    parsed = json.loads(clean_model_output(text))
+    if not isinstance(parsed, list):
+        raise json.JSONDecodeError("Expected a JSON array", text, 0)
+    records, seen = {}, set()
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            number = int(entry.pop("message_id", None))
+        except (TypeError, ValueError):
+            continue
+        if number in seen or not 1 <= number <= count:
+            records.pop(number, None)
+            seen.add(number)
+            continue
+        seen.add(number)
+        if any(key in entry for key in TRACKER_HEADERS):
+            records[number] = entry
+    return records
+
+
+def extract_packed(texts: list, applicant_skills: str = "", received_at=None) -> list:
+    """Extracts many recruiter messages with as few model calls as possible.
+
+    Each text is one message's "Detailed Info" (as given to combine_inputs). Returns one
+    result per text, in order, each exactly what process_recruiter_text would return for
+    combine_inputs(applicant_skills, "", text). Results are cached under that single-message
+    prompt too, so packed and one-at-a-time extraction share cache entries. received_at
+    optionally gives each message's timestamp, for its relative dates.
+    """
+    single_prompts = [EXTRACTION_PROMPT.format(text_input=combine_inputs(applicant_skills, "", text)) for text in texts]
+    cache_keys = [response_cache_key(prompt) for prompt in single_prompts]
+    results = [cached_response(key) for key in cache_keys]
+    pending = [index for index, result in enumerate(results) if result is None]
+    if len(pending) < len(texts):
+        RESPONSE_CACHE.inc(len(texts) - len(pending), ("hit",))
+
+    retry = []
+    for pack in pack_messages([texts[index] for index in pending]):
+        indexes = [pending[position] for position in pack]
+        if len(indexes) == 1:
+            retry.extend(indexes)
+            continue
+        model = genai.GenerativeModel(MODEL_ID)
+        try:
+            response = call_model(model, build_packed_prompt([texts[index] for index in indexes], applicant_skills))
+            records = parse_packed_records(response.text, len(indexes))
+            MODEL_REQUESTS.inc(1, (MODEL_ID, "ok"))
+        except json.JSONDecodeError:
+            MODEL_REQUESTS.inc(1, (MODEL_ID, "invalid_json"))
+            records = {}
+        except RateLimitTimeout as e:
+            MODEL_REQUESTS.inc(1, (MODEL_ID, "rate_limited"))
+            RESPONSE_CACHE.inc(len(indexes), ("miss",))
+            # Splitting the pack would only queue more calls behind the same quota
+            for index in indexes:
+                results[index] = {"error": f"The AI service is busy, please try again shortly. ({e})"}
+            continue
+        except Exception:
+            MODEL_REQUESTS.inc(1, (MODEL_ID, "error"))
+            records = {}
+        # Records sent on to generate_json are counted there, so each message is one lookup
+        RESPONSE_CACHE.inc(sum(number in records for number in range(1, len(indexes) + 1)), ("miss",))
+        for number, index in enumerate(indexes, start=1):
+            if number in records:
+                cache_response(cache_keys[index], records[number])
+                results[index] = records[number]
+            else:
+                retry.append(index)
+
+    # Long messages and any record the pack left out or garbled go through the single-message path
+    for index in sorted(retry):
+        results[index] = generate_json(single_prompts[index])
+    received_at = received_at if received_at is not None else [None] * len(texts)
+    failed = sum("error" in result for result in results)
+    EXTRACTIONS.inc(len(results) - failed, ("model", "ok"))
+    EXTRACTIONS.inc(failed, ("model", "error"))
+    return [
+        result if "error" in result else normalize_record(result, timestamp)
+        for result, timestamp in zip(results, received_at)
+    ]
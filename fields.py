@@ -0,0 +1,251 @@
+# fields.py (The single registry of job tracker fields)
+#
+# Every place that needs the field list derives it from FIELDS: the extraction prompt's key
+# lines, the tracker/CSV/XLSX columns, the value normalizers and the validator. Adding a
+# field here is the only change needed for the model to extract it and the tracker to keep it.
+
+# --- 1. Import necessary libraries ---
+import re
+import datetime
+from collections import namedtuple
+from functools import lru_cache
+import dates
+
+# --- 2. Value Types ---
+Field = namedtuple("Field", ["key", "description", "type", "normalizer"], defaults=[None])
+
+MISSING_VALUES = {"", "not specified", "n/a", "na", "none", "unknown", "null"}
+
+# What a valid (non-missing) value of each type looks like; types without a pattern accept any text
+TYPE_PATTERNS = {
+    # dates.py's stored form: the date, optionally with a time and a UTC offset
+    "date": r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])(?: (?:[01]\d|2[0-3]):[0-5]\d(?: [+-]\d{2}:\d{2})?)?",
+    "email": r"[^@\s]+@[^@\s]+\.[^@\s]+",
+    "phone": r"\+?[\d\s().-]{7,}",
+    "percent": r"\d{1,3}(?:\.\d+)?\s*%",
+}
+
+
+def is_missing(value) -> bool:
+    return str(value if value is not None else "").strip().lower() in MISSING_VALUES
+
+
+def normalize_text(value) -> str:
+    return re.sub(r"\s+", " ", str(value if value is not None else "")).strip()
+
+
+def normalize_date(value) -> str:
+    """Resolves a free-form date against today (see dates.py); text that is not a date is kept."""
+    return dates.normalize_value(normalize_text(value))
+
+
+def normalize_email(value) -> str:
+    return normalize_text(value).lower()
+
+
+def normalize_percent(value) -> str:
+    """'85', '85 %' and '0.85' all become '85%'."""
+    text = normalize_text(value)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*%?", text)
+    if not match:
+        return text
+    number = float(match.group(1))
+    if number <= 1 and "%" not in text and "." in text:
+        number *= 100
+    return f"{number:g}%"
+
+
+def normalize_list(value) -> str:
+    """Model lists and "a,b ,c" strings both become "a, b, c"."""
+    items = value if isinstance(value, list) else str(value if value is not None else "").split(",")
+    return ", ".join(item for item in (normalize_text(item) for item in items) if item)
+
+
+TYPE_NORMALIZERS = {
+    "text": normalize_text,
+    "date": normalize_date,
+    "email": normalize_email,
+    "phone": normalize_text,
+    "percent": normalize_percent,
+    "list": normalize_list,
+}
+
+# --- 3. The Registry (prompt order) ---
+FIELDS = [
+    Field("date_contacted", "Date HR contacted you or you applied.", "date"),
+    Field("hr_name", "Name of the HR/recruiter.", "text"),
+    Field("phone_number", "HR’s phone number.", "phone"),
+    Field("email_id", "HR’s email address.", "email"),
+    Field("role_position", "Job title for the opportunity.", "text"),
+    Field("recruiter_company", "The staffing/recruitment agency name (if applicable).", "text"),
+    Field("client_company", "The company the job is actually for.", "text"),
+    Field("location", "Job location (e.g., city, remote, hybrid).", "text"),
+    Field("job_type", "Permanent, Contract, Internship, or Freelance.", "text"),
+    Field("mode_of_contact", "How you were contacted (e.g., Call, Email, LinkedIn, Naukri).", "text"),
+    Field("interview_mode", "Online, Offline, or Hybrid.", "text"),
+    Field("interview_scheduled_date", "Date of the interview (if scheduled).", "date"),
+    Field("round_1_details", "Details for the first interview round (e.g., \"Technical - Scheduled\").", "text"),
+    Field("round_2_details", "Details for the second interview round.", "text"),
+    Field("ctc_offered_expected", "Salary discussed or expected range.", "text"),
+    Field("status", "Current status (e.g., \"Awaiting JD\", \"Interview Scheduled\", \"Selected\", \"Rejected\").", "text"),
+    Field("next_follow_up_date", "When you plan to follow up.", "date"),
+    Field("review_notes", "Your personal comments or notes.", "text"),
+    Field(
+        "extracted_keywords",
+        "A comma-separated list of the 5-10 most critical hard skills and technologies required for the role "
+        "(e.g., Python, AWS, Kubernetes, React, SQL).",
+        "list"
+    ),
+    Field(
+        "match_score",
+        "A percentage score (e.g., \"85%\") representing the fit between the job's required skills and the "
+        "applicant's skills provided in the input.",
+        "percent"
+    ),
+    Field(
+        "skill_gap_analysis",
+        "A brief, one-sentence summary of the main skill gaps (e.g., \"Missing experience in Terraform and "
+        "advanced SQL queries.\").",
+        "text"
+    ),
+    Field(
+        "prep_hint",
+        "A one-sentence, proactive hint based on the extracted status (e.g., if 'Awaiting JD', output: 'Draft a "
+        "polite follow-up email asking for the JD by tomorrow.'; if 'Interview Scheduled', output: 'Focus on "
+        "behavioral questions and a deep dive into the extracted keywords.').",
+        "text"
+    ),
+]
+
+FIELD_KEYS = [field.key for field in FIELDS]
+FIELDS_BY_KEY = {field.key: field for field in FIELDS}
+FIELD_DESCRIPTIONS = {field.key: field.description for field in FIELDS}
+DATE_FIELDS = {field.key for field in FIELDS if field.type == "date"}
+
+# --- 4. Generated Artifacts ---
+def select_fields(keys=None) -> list:
+    """The requested keys in registry order (all fields when keys is None); unknown keys are dropped."""
+    if keys is None:
+        return list(FIELD_KEYS)
+    wanted = set(keys)
+    return [key for key in FIELD_KEYS if key in wanted]
+
+
+def prompt_key_lines(keys=None) -> str:
+    """The '- "key": description' lines the prompts list, for the selected fields only."""
+    return "\n".join(f'- "{key}": {FIELD_DESCRIPTIONS[key]}' for key in select_fields(keys))
+
+
+def normalize_value(key: str, value):
+    field = FIELDS_BY_KEY.get(key)
+    if field is None or is_missing(value):
+        return value
+    return (field.normalizer or TYPE_NORMALIZERS[field.type])(value)
+
+
+def normalize_record(details: dict, received_at=None) -> dict:
+    """Applies each field's normalizer; keys outside the registry (e.g. "error") pass through.
+
+    Dates are resolved together, against the message timestamp (received_at, default today)
+    and date_contacted, so "next Tuesday" means the Tuesday after the message was sent.
+    """
+    normalized = {key: value if key in DATE_FIELDS else normalize_value(key, value) for key, value in details.items()}
+    return dates.normalize_record_dates(normalized, DATE_FIELDS, received_at)
+
+
+def field_status(key: str, value) -> str:
+    """Classifies one value as 'ok', 'missing' or 'invalid'."""
+    if is_missing(value):
+        return "missing"
+    field = FIELDS_BY_KEY.get(key)
+    if field is None or field.type not in TYPE_PATTERNS:
+        return "ok"
+    text = str(value).strip()
+    if _type_matcher(field.type)(text) is None or (field.type == "date" and not _is_calendar_date(text)):
+        return "invalid"
+    return "ok"
+
+
+@lru_cache(maxsize=None)
+def _type_matcher(field_type: str):
+    return re.compile(TYPE_PATTERNS[field_type]).fullmatch
+
+
+def _is_calendar_date(text: str) -> bool:
+    # The date pattern already bounds months and days; only Feb 29-31, Apr 31 etc. need the calendar
+    text = text.strip()
+    if text[8:10] <= "28":
+        return True
+    try:
+        datetime.date(int(text[:4]), int(text[5:7]), int(text[8:10]))
+    except ValueError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=64)
+def compile_checks(keys: tuple = None) -> tuple:
+    """(key, is_valid) for each typed field among keys; untyped text fields need no check at all.
+
+    Each check is one precompiled regex that accepts the value OR any missing marker, so a
+    cell is classified by a single C-level fullmatch. Only the rare dates past the 28th are
+    then confirmed against the calendar.
+    """
+    missing = "|".join(re.escape(value) for value in sorted(MISSING_VALUES) if value)
+    checks = []
+    for key in select_fields(keys):
+        field_type = FIELDS_BY_KEY[key].type
+        if field_type not in TYPE_PATTERNS:
+            continue
+        fullmatch = re.compile(rf"\s*(?:(?i:{missing})|{TYPE_PATTERNS[field_type]})?\s*").fullmatch
+        if field_type == "date":
+            def is_valid(value: str, fullmatch=fullmatch) -> bool:
+                return fullmatch(value) is not None and (is_missing(value) or _is_calendar_date(value))
+        else:
+            def is_valid(value: str, fullmatch=fullmatch) -> bool:
+                return fullmatch(value) is not None
+        checks.append((key, is_valid))
+    return tuple(checks)
+
+
+def compile_validator(keys: tuple = None):
+    """A validator for one record: record -> list of keys holding an invalid value."""
+    checks = compile_checks(keys)
+
+    def validate(record: dict) -> list:
+        return [key for key, is_valid in checks if record.get(key) and not is_valid(str(record[key]))]
+    return validate
+
+
+def validate_records(records, keys=None) -> dict:
+    """{record id (or position): [invalid keys]} for every record with at least one invalid value.
+
+    Works column by column: tracker columns repeat heavily (dates, scores, recruiter emails),
+    so each distinct value is checked once and rows are only revisited when a column has a
+    bad value.
+    """
+    records = records if isinstance(records, list) else list(records)
+    problems = {}
+    for key, is_valid in compile_checks(None if keys is None else tuple(select_fields(keys))):
+        values = [str(record.get(key) or "") for record in records]
+        bad_values = {value for value in set(values) if value and not is_valid(value)}
+        if not bad_values:
+            continue
+        for position, value in enumerate(values):
+            if value in bad_values:
+                record = records[position]
+                problems.setdefault(record.get("id", position), []).append(key)
+    return problems
+
+# --- 5. Standalone Execution Block (validate the whole tracker) ---
+if __name__ == "__main__":
+    import sys
+    import time
+    import tracker
+
+    started = time.perf_counter()
+    records = list(tracker.iter_records(sys.argv[1] if len(sys.argv) > 1 else None))
+    problems = validate_records(records)
+    for record_id, keys in problems.items():
+        print(f"record {record_id}: invalid {', '.join(keys)}")
+    print(f"{len(problems)} of {len(records)} record(s) have invalid values ({time.perf_counter() - started:.2f}s)")
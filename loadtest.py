@@ -0,0 +1,218 @@
+# loadtest.py (Concurrent-session load test for webapp1.py against a stubbed model)
+#
+# Usage: python loadtest.py --levels 1,4,16,32 --sessions 32 --latency 2.5
+#
+# Each simulated session loads the app, fills the form, submits it and clicks through
+# one more rerun, using Streamlit's AppTest in its own thread. The Gemini model is
+# replaced by a stub that sleeps for a realistic, log-normally distributed latency.
+
+# --- 1. Import necessary libraries ---
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webapp1.py")
+
+# --- 2. Stubbed Model ---
+FAKE_RESULT = {
+    "date_contacted": "2025-11-03", "hr_name": "Jane Doe", "phone_number": "+91 98765 43210",
+    "email_id": "jane@acme-talent.com", "role_position": "Senior Python Developer",
+    "recruiter_company": "Acme Talent", "client_company": "Globex", "location": "Bangalore (Hybrid)",
+    "job_type": "Permanent", "mode_of_contact": "Email", "interview_mode": "Online",
+    "interview_scheduled_date": "2025-11-10", "round_1_details": "Technical - Scheduled",
+    "round_2_details": "Not specified", "ctc_offered_expected": "30-35 LPA", "status": "Interview Scheduled",
+    "next_follow_up_date": "2025-11-07", "review_notes": "Not specified",
+    "extracted_keywords": "Python, Django, AWS, Kubernetes, PostgreSQL", "match_score": "80%",
+    "skill_gap_analysis": "Missing Kubernetes experience.", "prep_hint": "Revise Django ORM and AWS basics.",
+}
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel with a realistic response time."""
+    median_latency = 2.5
+    sigma = 0.35
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(random.lognormvariate(0, self.sigma) * self.median_latency)
+
+        class Response:
+            text = json.dumps(FAKE_RESULT)
+            usage_metadata = None
+        return Response()
+
+# --- 3. Shared Test Runtime ---
+_pin_lock = threading.Lock()
+
+
+def pin_test_runtime():
+    """Lets many AppTest sessions run at once inside one process.
+
+    Every AppTest run installs process-wide state and undoes it at the end: a mock
+    Runtime singleton, a patched config.get_option (for global.appTest) and a fresh
+    ScriptCache. Runs overlapping in threads undo each other's state mid-run (widget
+    ids go missing from session state, the script is compiled concurrently). Here the
+    first Runtime, the option and one ScriptCache are kept for the whole load test,
+    like the single Runtime and script cache of a real server.
+    """
+    import contextlib
+    import streamlit.testing.v1.app_test as app_test
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    class PinnedRuntimeMeta(type):
+        def __setattr__(cls, name, value):
+            if name == "_instance":
+                with _pin_lock:
+                    if value is not None and Runtime._instance is None:
+                        Runtime._instance = value
+                return
+            super().__setattr__(name, value)
+
+    class PinnedRuntime(Runtime, metaclass=PinnedRuntimeMeta):
+        pass
+
+    app_test.Runtime = PinnedRuntime
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+    script_cache = ScriptCache()  # Compiles under its own lock, once per script
+    app_test.ScriptCache = lambda: script_cache
+
+# --- 4. One Simulated Session ---
+def run_session(session_number: int, timeout: float) -> dict:
+    """Runs one session; any failure is returned as a result with ok False, never raised."""
+    from streamlit.testing.v1 import AppTest
+
+    started = time.perf_counter()
+    try:
+        app = AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+        app.text_input(key="call_details").input(f"Call {session_number}: Python role, 30 LPA")
+        # Unique text per session so the response cache never short-circuits the model
+        app.text_area(key="recruiter_text").input(f"Session {session_number} JD: Senior Python developer, Django, AWS.")
+        app.text_area(key="applicant_skills").input("Python, Django, AWS, SQL")
+        submitted = time.perf_counter()
+        submit_button = next(button for button in app.button if button.label.startswith("✨"))
+        submit_button.click().run()
+        submit_latency = time.perf_counter() - submitted
+        # A follow-up interaction (e.g. a download click) must not call the model again
+        app.run()
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}",
+                "end_to_end": time.perf_counter() - started, "submit_latency": None}
+    error = app.exception[0].message if app.exception else None
+    if error is None and "extraction_result" not in app.session_state:
+        error = "no extraction_result after the submit"
+    return {
+        "ok": error is None,
+        "error": error,
+        "end_to_end": time.perf_counter() - started,
+        "submit_latency": submit_latency,
+    }
+
+# --- 5. Measurement Helpers ---
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class ThreadSampler(threading.Thread):
+    """Samples the process thread count in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = threading.active_count()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+
+def run_level(concurrency: int, sessions: int, timeout: float) -> dict:
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    sampler = ThreadSampler()
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda number: run_session(number, timeout), range(sessions)))
+    elapsed = time.perf_counter() - started
+    sampler.stopped.set()
+    _, peak = tracemalloc.get_traced_memory()
+
+    succeeded = [result for result in results if result["ok"]]
+    end_to_end = [result["end_to_end"] for result in succeeded]
+    submit = [result["submit_latency"] for result in succeeded]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "errors": sessions - len(succeeded),
+        "p50_s": percentile(end_to_end, 0.50),
+        "p99_s": percentile(end_to_end, 0.99),
+        "submit_p50_s": percentile(submit, 0.50),
+        "submit_p99_s": percentile(submit, 0.99),
+        "throughput_per_s": len(succeeded) / elapsed if elapsed else 0.0,
+        # Peak Python heap above the pre-level baseline, spread over the sessions alive at once
+        "mem_per_session_kb": (peak - baseline) / 1024 / max(1, min(concurrency, sessions)),
+        "peak_threads": sampler.peak,
+        "error_messages": sorted({result["error"] for result in results if result["error"]}),
+    }
+
+# --- 6. Standalone Execution Block ---
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated sessions against webapp1.py.")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrency levels to ramp through.")
+    parser.add_argument("--sessions", type=int, default=16, help="Sessions to run at each level.")
+    parser.add_argument("--latency", type=float, default=2.5, help="Median stub model latency in seconds.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-script-run timeout in seconds.")
+    parser.add_argument("--respect-quota", action="store_true", help="Keep the real RPM/TPM limiter instead of lifting it.")
+    args = parser.parse_args()
+
+    # Isolate all state the app writes, and never talk to the real API
+    workdir = tempfile.mkdtemp(prefix="job_agent_loadtest_")
+    os.environ["JOB_AGENT_TRACKER_DB"] = os.path.join(workdir, "tracker.db")
+    os.environ["JOB_AGENT_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.setdefault("GOOGLE_API_KEY", "loadtest-stub")
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+
+    import google.generativeai as genai
+    import rate_limiter
+    StubModel.median_latency = args.latency
+    genai.GenerativeModel = StubModel
+    if not args.respect_quota:
+        rate_limiter.limiter.requests = rate_limiter.TokenBucket(10 ** 9)
+        rate_limiter.limiter.tokens = rate_limiter.TokenBucket(10 ** 12)
+
+    pin_test_runtime()
+    tracemalloc.start()
+    # Warm-up run so imports and the first script compile are not charged to level 1
+    run_session(-1, args.timeout)
+
+    columns = ["concurrency", "sessions", "errors", "p50_s", "p99_s", "submit_p50_s", "submit_p99_s",
+               "throughput_per_s", "mem_per_session_kb", "peak_threads"]
+    print(" | ".join(f"{column:>16}" for column in columns))
+    for concurrency in (int(level) for level in args.levels.split(",")):
+        row = run_level(concurrency, args.sessions, args.timeout)
+        print(" | ".join(
+            f"{row[column]:>16.2f}" if isinstance(row[column], float) else f"{row[column]:>16}" for column in columns
+        ))
+        for message in row["error_messages"]:
+            print(f"    error: {message}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# mail_ingest.py (Streaming .eml / .mbox ingestion feeding the extractor)
+
+# --- 1. Import necessary libraries ---
+import os
+import re
+import sys
+import csv
+from email import policy
+from email.parser import BytesParser
+from email.utils import parseaddr
+from html.parser import HTMLParser
+from extraction import TRACKER_HEADERS, PACK_MAX_MESSAGES, combine_inputs, process_recruiter_text, extract_packed
+import conversations
+
+# --- 2. HTML to Text Conversion ---
+# Tags that start a new line when rendered, so the model still sees paragraph breaks
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol"}
+SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.chunks.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Converts an HTML email body to plain text, dropping scripts and styles."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = "".join(parser.chunks)
+    text = re.sub(r"[ \t\xa0]+", " ", text)
+    return re.sub(r"\n\s*\n+", "\n\n", text).strip()
+
+# --- 3. Quoted History Removal ---
+# Lines that mark the start of a forwarded/replied-to message in common mail clients
+QUOTE_MARKERS = [
+    re.compile(r"^On .{0,200}wrote:\s*$"),
+    re.compile(r"^-{2,}\s*Original Message\s*-{2,}", re.IGNORECASE),
+    re.compile(r"^-{2,}\s*Forwarded message\s*-{2,}", re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$"),
+]
+
+
+def strip_quoted_history(text: str) -> str:
+    """Keeps only the newest message in a reply chain."""
+    kept = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if kept and any(marker.match(stripped) for marker in QUOTE_MARKERS):
+            break
+        if stripped.startswith(">"):
+            continue
+        kept.append(line.rstrip())
+    return "\n".join(kept).strip()
+
+# --- 4. Message Parsing ---
+def parse_message(raw_message: bytes) -> dict:
+    """Decodes one RFC 822 message into its headers and a clean plain-text body."""
+    message = BytesParser(policy=policy.default).parsebytes(raw_message)
+    plain_parts, html_parts = [], []
+    for part in message.walk():
+        if part.is_multipart() or part.is_attachment():
+            continue
+        content_type = part.get_content_type()
+        if content_type not in ("text/plain", "text/html"):
+            continue
+        try:
+            content = part.get_content()
+        except (LookupError, ValueError):
+            # Unknown charset or broken transfer encoding: fall back to a lossy decode
+            content = part.get_payload(decode=True).decode("utf-8", errors="replace")
+        if content_type == "text/plain":
+            plain_parts.append(content)
+        else:
+            html_parts.append(content)
+
+    # Prefer the plain-text alternative; only render HTML when nothing else is present
+    if plain_parts:
+        body = "\n\n".join(plain_parts)
+    else:
+        body = "\n\n".join(html_to_text(html) for html in html_parts)
+
+    sender_name, sender_email = parseaddr(str(message.get("From", "")))
+    return {
+        "subject": str(message.get("Subject", "")),
+        "sender_name": sender_name,
+        "sender_email": sender_email,
+        "date": str(message.get("Date", "")),
+        "body": strip_quoted_history(body),
+    }
+
+
+def message_to_text(message: dict) -> str:
+    """Formats a parsed message as the 'Detailed Info' section of the prompt."""
+    return (
+        f"Email Subject: {message['subject']}\n"
+        f"From: {message['sender_name']} <{message['sender_email']}>\n"
+        f"Sent: {message['date']}\n\n"
+        f"{message['body']}"
+    )
+
+# --- 5. Streaming Readers ---
+def iter_mbox_messages(binary_file):
+    """Yields the raw bytes of each message in an mbox file, one message at a time.
+
+    Only the current message is held in memory, so the mailbox size is bounded
+    by disk rather than RAM.
+    """
+    lines = []
+    previous_blank = True
+    for line in binary_file:
+        if line.startswith(b"From ") and previous_blank:
+            if lines:
+                yield b"".join(lines)
+            lines = []
+        else:
+            # mboxrd escaping: ">From " at the start of a body line stands for "From "
+            if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                line = line[1:]
+            lines.append(line)
+        previous_blank = not line.strip()
+    if lines:
+        yield b"".join(lines)
+
+
+def iter_messages(binary_file, filename: str):
+    """Yields parsed messages from an uploaded or opened .eml / .mbox file."""
+    if filename.lower().endswith(".eml"):
+        yield parse_message(binary_file.read())
+        return
+    for raw_message in iter_mbox_messages(binary_file):
+        message = parse_message(raw_message)
+        if message["body"] or message["subject"]:
+            yield message
+
+
+def iter_extractions(messages, applicant_skills: str = "", pack: bool = False):
+    """Feeds each message into the extractor as it arrives, yielding (message, result).
+
+    With pack=True, short messages are buffered a few at a time and extracted together
+    in one model call (see extraction.extract_packed); results still come out in order.
+    """
+    if not pack:
+        for message in messages:
+            combined_text = combine_inputs(applicant_skills, "", message_to_text(message))
+            yield message, process_recruiter_text(combined_text, received_at=message["date"])
+        return
+
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) == PACK_MAX_MESSAGES:
+            yield from zip(batch, extract_packed(
+                [message_to_text(m) for m in batch], applicant_skills, [m["date"] for m in batch]
+            ))
+            batch = []
+    if batch:
+        yield from zip(batch, extract_packed(
+            [message_to_text(m) for m in batch], applicant_skills, [m["date"] for m in batch]
+        ))
+
+
+def iter_threaded_extractions(messages, applicant_skills: str = ""):
+    """Like iter_extractions, but replies update their opportunity's record instead of adding a row.
+
+    Yields (message, result) where result is conversations.ingest_message's output.
+    """
+    for message in messages:
+        yield message, conversations.ingest_message(
+            message_to_text(message), message["subject"], message["sender_email"], applicant_skills,
+            received_at=message["date"]
+        )
+
+# --- 6. Standalone Execution Block (For mailboxes too large to upload) ---
+if __name__ == "__main__":
+    pack = "--pack" in sys.argv[1:]
+    arguments = [argument for argument in sys.argv[1:] if argument != "--pack"]
+    if len(arguments) != 2:
+        print("Usage: python mail_ingest.py [--pack] <export.mbox|message.eml> <output.csv>")
+        sys.exit(1)
+
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+
+    load_dotenv()
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+
+    source_path, output_path = arguments
+    with open(source_path, "rb") as source, open(output_path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.DictWriter(output, fieldnames=TRACKER_HEADERS, extrasaction='ignore')
+        writer.writeheader()
+        for count, (message, result) in enumerate(iter_extractions(iter_messages(source, source_path), pack=pack), start=1):
+            if "error" in result:
+                print(f"[{count}] {message['subject']!r}: {result['error']}")
+                continue
+            writer.writerow({key: result.get(key, "") for key in TRACKER_HEADERS})
+            # Flush per row so progress survives an interrupted run on a huge mailbox
+            output.flush()
+            print(f"[{count}] {message['subject']!r}: extracted")
@@ -0,0 +1,146 @@
+# memory_budget.py (Opt-in memory profiling and per-session memory budgets)
+
+# --- 1. Import necessary libraries ---
+import os
+import sys
+import uuid
+import pickle
+import weakref
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from doc_ingest import CACHE_DIR
+
+# --- 2. Configuration ---
+# Profiling (tracemalloc) is opt-in because tracing every allocation slows Python down noticeably
+PROFILING = os.environ.get("JOB_AGENT_MEMPROFILE", "") == "1"
+SESSION_BUDGET_BYTES = int(float(os.environ.get("JOB_AGENT_SESSION_BUDGET_MB", "25")) * 1024 * 1024)
+SPILL_MIN_BYTES = 64 * 1024  # Values smaller than this are not worth a disk round-trip
+SPILL_DIR = os.path.join(CACHE_DIR, "spill")
+
+if PROFILING and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_stage_stats = {}
+_stage_lock = threading.Lock()
+
+# --- 3. Stage Attribution ---
+@contextmanager
+def stage(name: str):
+    """Attributes the memory allocated inside the block to a named pipeline stage.
+
+    A no-op unless JOB_AGENT_MEMPROFILE=1. With concurrent sessions the figures are
+    process-wide, so they show which stages are heavy rather than exact per-call costs.
+    """
+    if not PROFILING:
+        yield
+        return
+    before, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        after, peak = tracemalloc.get_traced_memory()
+        with _stage_lock:
+            stats = _stage_stats.setdefault(name, {"calls": 0, "retained_bytes": 0, "max_peak_bytes": 0})
+            stats["calls"] += 1
+            stats["retained_bytes"] += max(0, after - before)
+            stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak - before)
+
+
+def stage_report() -> list:
+    """Per-stage totals, largest retained memory first."""
+    with _stage_lock:
+        rows = [dict(stage=name, **stats) for name, stats in _stage_stats.items()]
+    return sorted(rows, key=lambda row: row["retained_bytes"], reverse=True)
+
+# --- 4. Object Footprints ---
+def deep_size(value, seen: set = None) -> int:
+    """Approximate bytes held by an object graph (DataFrames measured with pandas' own deep count)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(deep=True).sum())
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+
+def session_footprint(state) -> dict:
+    """Returns {session key: bytes} for everything a session keeps alive."""
+    return {str(key): deep_size(state[key]) for key in list(state.keys())}
+
+# --- 5. Spilling to Disk ---
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Spilled:
+    """Placeholder left in session state for a value that was moved to disk."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        # The file lives exactly as long as the placeholder that points to it
+        weakref.finalize(self, _remove_quietly, path)
+
+    def __repr__(self):
+        return f"<spilled {self.size // 1024} KB>"
+
+
+def spill_value(value) -> Spilled:
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    path = os.path.join(SPILL_DIR, f"{uuid.uuid4().hex}.pkl")
+    with open(path, "wb") as spill_file:
+        pickle.dump(value, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return Spilled(path, deep_size(value))
+
+
+def load_value(value):
+    """Returns the original value, reading it back from disk if it was spilled."""
+    if not isinstance(value, Spilled):
+        return value
+    with open(value.path, "rb") as spill_file:
+        return pickle.load(spill_file)
+
+# --- 6. Budget Enforcement ---
+def enforce_budget(state, evictable: list, spillable: list, budget: int = SESSION_BUDGET_BYTES) -> list:
+    """Brings a session under its memory budget; returns a description of what was done.
+
+    `evictable` keys hold data that can be rebuilt on demand (e.g. memoized download
+    payloads) and are dropped first. `spillable` entries are (key, field) pairs whose
+    value is moved to disk, largest first, until the session fits.
+    """
+    actions = []
+    total = sum(session_footprint(state).values())
+    if total <= budget:
+        return actions
+
+    for key in evictable:
+        if key in state and total > budget:
+            freed = deep_size(state[key])
+            del state[key]
+            total -= freed
+            actions.append(f"evicted {key} ({freed // 1024} KB)")
+
+    candidates = []
+    for key, field in spillable:
+        container = state.get(key)
+        if isinstance(container, dict) and field in container and not isinstance(container[field], Spilled):
+            size = deep_size(container[field])
+            if size >= SPILL_MIN_BYTES:
+                candidates.append((size, key, field))
+    for size, key, field in sorted(candidates, reverse=True):
+        if total <= budget:
+            break
+        state[key][field] = spill_value(state[key][field])
+        total -= size
+        actions.append(f"spilled {key}.{field} ({size // 1024} KB)")
+    return actions
@@ -0,0 +1,279 @@
+# metrics.py (Process-wide metrics registry with Prometheus text exposition)
+#
+# Usage: JOB_AGENT_METRICS_PORT=9108 streamlit run webapp1.py    serves http://host:9108/metrics
+#        JOB_AGENT_METRICS_FILE=/var/lib/node_exporter/job_agent.prom ...
+#                                                                rewrites the file every JOB_AGENT_METRICS_INTERVAL s
+#        python metrics.py                                       measures the per-event overhead
+#
+# The API server also serves the same text on GET /metrics. Counters and histograms are recorded
+# into per-thread shards, so the hot path never takes a lock. A scrape sums the shards, and the
+# shard of a finished thread is folded into a total once, so thread churn doesn't pile shards up.
+# Gauges (queue depth, in-flight calls) are read from their owner only at scrape time.
+
+# --- 1. Import necessary libraries ---
+import os
+import sys
+import time
+import weakref
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 2. Configuration ---
+METRICS_PREFIX = "job_agent_"
+METRICS_PORT = int(os.environ.get("JOB_AGENT_METRICS_PORT", "0"))  # 0: no HTTP endpoint
+METRICS_FILE = os.environ.get("JOB_AGENT_METRICS_FILE", "")
+METRICS_INTERVAL_SECONDS = float(os.environ.get("JOB_AGENT_METRICS_INTERVAL", "15"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = []
+_registry_lock = threading.Lock()
+
+# --- 3. Metric Types ---
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _ShardedMetric:
+    """Values kept per thread in a dict {label values: value}; only creating a thread's shard locks."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> dict:
+        shard = {}
+        with self._lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        weakref.finalize(threading.current_thread(), self._retire, shard)
+        return shard
+
+    def _retire(self, shard: dict) -> None:
+        # The thread has ended, so nothing writes to this shard any more
+        with self._lock:
+            self._shards.remove(shard)
+            self._merge(self._retired, shard)
+
+    def _merge(self, total: dict, shard: dict) -> None:
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """{label values: value} summed over every thread."""
+        with self._lock:
+            total = {}
+            self._merge(total, self._retired)
+            for shard in self._shards:
+                # dict() copies in one step under the GIL, so a concurrent insert can't break the loop
+                self._merge(total, dict(shard))
+        return total
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total: dict, shard: dict) -> None:
+        for labels, value in shard.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def expose(self) -> list:
+        values = self.collect()
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+                for labels, value in sorted(values.items())]
+
+
+class Histogram(_ShardedMetric):
+    """Fixed buckets; each shard holds [count per bucket..., count above the last bound, sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.bounds) + 2)
+        counts[bisect_left(self.bounds, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, total: dict, shard: dict) -> None:
+        for labels, counts in shard.items():
+            merged = total.setdefault(labels, [0] * (len(self.bounds) + 2))
+            for position, value in enumerate(counts):
+                merged[position] += value
+
+    def expose(self) -> list:
+        lines = []
+        for labels, counts in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A value read from its owner when scraped: callback() returns a number or {label values: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback, labelnames: tuple = ()):
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def expose(self) -> list:
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+                for labels, value in sorted(values.items())]
+
+# --- 4. Registry ---
+def _register(metric):
+    with _registry_lock:
+        # Re-registering a name (a module reloaded by Streamlit, a second app instance) replaces the old one
+        _metrics[:] = [existing for existing in _metrics if existing.name != metric.name]
+        _metrics.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, buckets: tuple, labelnames: tuple = ()) -> Histogram:
+    return _register(Histogram(name, documentation, buckets, labelnames))
+
+
+def gauge(name: str, documentation: str, callback, labelnames: tuple = ()) -> Gauge:
+    return _register(Gauge(name, documentation, callback, labelnames))
+
+
+def exposition() -> str:
+    """Every registered metric in the Prometheus text format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        try:
+            samples = metric.expose()
+        except Exception:
+            # A failing gauge callback must not take the whole scrape down
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines += samples
+    return "\n".join(lines) + "\n"
+
+# --- 5. Exporters ---
+def dump(path: str = METRICS_FILE) -> None:
+    """Writes the exposition atomically, so a collector never reads a half-written file."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(exposition())
+    os.replace(temporary, path)
+
+
+def _dump_forever(path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            dump(path)
+        except OSError:
+            pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_exporters_started = False
+
+
+def start_exporters(port: int = METRICS_PORT, path: str = METRICS_FILE, interval: float = METRICS_INTERVAL_SECONDS) -> None:
+    """Starts the /metrics endpoint and/or the periodic file dump once per process (both are opt-in)."""
+    global _exporters_started
+    with _registry_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if path:
+        threading.Thread(target=_dump_forever, args=(path, interval), name="metrics-dump", daemon=True).start()
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            # E.g. a second process on the host with the same setting; the app itself carries on
+            print(f"Metrics endpoint not started on port {port}: {e}", file=sys.stderr)
+            return
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+
+if METRICS_PORT or METRICS_FILE:
+    start_exporters()
+
+# --- 6. Standalone Execution Block ---
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sample_counter = Counter("bench_events_total", "Benchmark events.", ("model", "outcome"))
+    sample_histogram = Histogram("bench_latency_seconds", "Benchmark latencies.", (0.5, 1, 2, 5, 10, 30), ("model",))
+    labels = ("gemini-2.5-flash", "ok")
+    for label, record in (("counter.inc", lambda: sample_counter.inc(1, labels)),
+                          ("histogram.observe", lambda: sample_histogram.observe(1.7, labels[:1]))):
+        started = time.perf_counter()
+        for _ in range(events):
+            record()
+        print(f"{label:<20}{(time.perf_counter() - started) / events * 1e9:8.0f} ns/event (incl. the lambda call)")
+    print(sample_counter.expose()[0])
+    print("\n".join(sample_histogram.expose()[-3:]))
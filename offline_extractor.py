@@ -0,0 +1,460 @@
+# offline_extractor.py (Rule-based extraction that works without the Gemini API)
+#
+# Usage: python offline_extractor.py golden/recruiter_messages.jsonl golden/recruiter_messages_holdout.jsonl [--with-model]
+#
+# Fills the same 22 keys as EXTRACTION_PROMPT using regexes, small gazetteers and
+# section heuristics. It is far less accurate than the model, so every field it can
+# only guess is flagged for refinement once the API is reachable again. The rules were written
+# against recruiter_messages.jsonl; recruiter_messages_holdout.jsonl was labelled without
+# looking at them, so only its scores say how the rules do on unseen messages.
+
+# --- 1. Import necessary libraries ---
+import re
+import sys
+import json
+import time
+import datetime
+from extraction import TRACKER_HEADERS, EXTRACTIONS, process_recruiter_text, combine_inputs, is_missing
+from fields import select_fields, normalize_record
+import dates
+from candidate_ranking import parse_keywords, _skill_pattern
+
+# --- 2. Gazetteers ---
+# Canonical skill -> display name; aliases ("k8s", "postgres") are resolved by candidate_ranking.normalize_skill
+SKILLS = {
+    "python": "Python", "java": "Java", "javascript": "JavaScript", "typescript": "TypeScript", "go": "Go",
+    "c++": "C++", "c#": "C#", ".net": ".NET", "scala": "Scala", "kotlin": "Kotlin", "rust": "Rust",
+    "ruby": "Ruby", "php": "PHP", "swift": "Swift", "r": "R", "sql": "SQL", "pl/sql": "PL/SQL",
+    "django": "Django", "flask": "Flask", "fastapi": "FastAPI", "spring boot": "Spring Boot", "spring": "Spring",
+    "react": "React", "angular": "Angular", "vue": "Vue", "node.js": "Node.js", "next.js": "Next.js",
+    "aws": "AWS", "azure": "Azure", "gcp": "GCP", "docker": "Docker", "kubernetes": "Kubernetes",
+    "terraform": "Terraform", "ansible": "Ansible", "jenkins": "Jenkins", "git": "Git", "linux": "Linux",
+    "ci/cd": "CI/CD", "microservices": "Microservices", "rest": "REST", "graphql": "GraphQL",
+    "kafka": "Kafka", "spark": "Spark", "hadoop": "Hadoop", "airflow": "Airflow", "snowflake": "Snowflake",
+    "databricks": "Databricks", "postgresql": "PostgreSQL", "mysql": "MySQL", "mongodb": "MongoDB",
+    "redis": "Redis", "elasticsearch": "Elasticsearch", "oracle": "Oracle", "sql server": "SQL Server",
+    "machine learning": "Machine Learning", "deep learning": "Deep Learning", "nlp": "NLP",
+    "pytorch": "PyTorch", "tensorflow": "TensorFlow", "pandas": "Pandas", "power bi": "Power BI",
+    "tableau": "Tableau", "excel": "Excel", "selenium": "Selenium", "salesforce": "Salesforce", "sap": "SAP",
+    "agile": "Agile", "scrum": "Scrum", "jira": "Jira",
+}
+
+COMPANIES = [
+    "TCS", "Tata Consultancy Services", "Infosys", "Wipro", "Accenture", "Cognizant", "HCL", "HCLTech",
+    "Tech Mahindra", "Capgemini", "IBM", "Deloitte", "EY", "KPMG", "PwC", "LTIMindtree", "Mphasis",
+    "Persistent Systems", "Hexaware", "Virtusa", "Oracle", "SAP", "Google", "Microsoft", "Amazon",
+    "Meta", "Apple", "Adobe", "Salesforce", "Flipkart", "Swiggy", "Zomato", "Paytm", "PhonePe", "Razorpay",
+    "Freshworks", "Zoho", "Walmart", "Target", "JPMorgan", "Goldman Sachs", "Morgan Stanley", "Barclays",
+    "HSBC", "Citi", "Wells Fargo", "American Express", "Visa", "Mastercard", "Uber", "Ola", "Myntra",
+]
+
+LOCATIONS = [
+    "Bangalore", "Bengaluru", "Hyderabad", "Pune", "Chennai", "Mumbai", "Navi Mumbai", "Delhi", "New Delhi",
+    "Gurgaon", "Gurugram", "Noida", "Kolkata", "Ahmedabad", "Kochi", "Coimbatore", "Trivandrum", "Indore",
+    "Jaipur", "Chandigarh", "Mysore", "London", "Dublin", "Berlin", "Amsterdam", "Singapore", "Dubai",
+    "Toronto", "New York", "San Francisco", "Seattle", "Austin", "Sydney",
+]
+
+# Free-mail domains never name the recruiting company
+FREE_MAIL_DOMAINS = {"gmail", "yahoo", "outlook", "hotmail", "live", "icloud", "rediffmail", "protonmail", "aol"}
+AGENCY_WORDS = re.compile(r"\b(consult\w*|staffing|recruit\w*|talent|hr\s+solutions|placements?|manpower|search)\b", re.IGNORECASE)
+
+# --- 3. Patterns ---
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s-]?)?(?:\(?\d{2,5}\)?[\s-]?)?\d{3,5}[\s-]?\d{4,5}(?![\w/])")
+SALARY_PATTERN = re.compile(
+    r"((?:₹|rs\.?|inr|\$|usd|£|€)\s*)?(\d+(?:[.,]\d+)?)(?:\s*(?:-|to|–)\s*(\d+(?:[.,]\d+)?))?"
+    r"\s*(lpa|lakhs?\s*(?:per\s+annum|p\.?a\.?)?|lacs?|l\b|cr|crores?|k\b|per\s+hour|/hr|/hour)",
+    re.IGNORECASE
+)
+SALARY_CONTEXT = re.compile(r"\b(ctc|salary|compensation|package|budget|pay|rate|expected|offer(?:ed)?)\b", re.IGNORECASE)
+LABELLED_FIELD = r"^\s*(?:{labels})\s*[:\-–]\s*(.+)$"
+ROLE_LABELS = re.compile(LABELLED_FIELD.format(labels=r"role|position|designation|job\s*title|title|opening"), re.IGNORECASE | re.MULTILINE)
+CLIENT_LABELS = re.compile(LABELLED_FIELD.format(labels=r"client|company|organi[sz]ation|employer"), re.IGNORECASE | re.MULTILINE)
+LOCATION_LABELS = re.compile(LABELLED_FIELD.format(labels=r"location|job\s*location|work\s*location|place"), re.IGNORECASE | re.MULTILINE)
+# Cue words are case-insensitive; names must be capitalized, which is what separates them from prose
+ROLE_PHRASES = re.compile(
+    r"((?:[A-Z][\w.+#/-]*\s+){0,4}(?i:developer|engineer|architect|analyst|scientist|manager|consultant|"
+    r"designer|administrator|tester|specialist|intern|lead))\b"
+)
+CLIENT_PHRASES = re.compile(r"(?i:\bfor\s+our\s+client|\bclient\s+is|\bon\s+behalf\s+of|\bhiring\s+for)\s*,?\s*([A-Z][\w&.-]*(?:\s+[A-Z][\w&.-]*){0,3})")
+INTRO_PHRASES = re.compile(
+    r"(?i:\b(?:this\s+is|i\s+am|i'm|my\s+name\s+is|spoke\s+(?:with|to)|call\s+(?:with|from)|talked\s+to|message\s+from))\s+"
+    r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)(?:(?:\s*,\s*|\s+(?i:from|at|with)\s+)([A-Z][\w&.-]*(?:\s+[A-Z][\w&.-]*){0,3}))?"
+)
+FROM_HEADER = re.compile(r"^From:\s*(.*?)\s*<([^>]+)>", re.MULTILINE)
+SENT_HEADER = re.compile(r"^Sent:\s*(.+)$", re.MULTILINE)
+SUBJECT_HEADER = re.compile(r"^Email Subject:\s*(.+)$", re.MULTILINE)
+SIGN_OFF = re.compile(r"^\s*(?:regards|best regards|thanks(?: and regards| & regards)?|warm regards|sincerely|cheers),?\s*\n+\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Words near a date that tell which field it belongs to, looked for within this many characters
+SENTENCE_WINDOW = 160
+INTERVIEW_CUES = re.compile(r"\b(interview|round|scheduled|slot|discussion|meet(?:ing)?|l1|l2)\b", re.IGNORECASE)
+FOLLOW_UP_CUES = re.compile(r"\b(follow[\s-]?up|get\s+back|revert|(?:reply|respond|confirm)\b[^.\n]{0,80}\bby|by\s+(?:eod|end))\b", re.IGNORECASE)
+
+# (pattern, status) in priority order; the first match wins
+STATUS_RULES = [
+    (re.compile(r"\b(offer\s+letter|pleased\s+to\s+offer|offer\s+(?:released|extended|rolled))\b", re.IGNORECASE), "Offer Received"),
+    (re.compile(r"\b(regret|not\s+(?:been\s+)?shortlisted|not\s+selected|rejected|decided\s+not\s+to\s+proceed|position\s+(?:is\s+)?closed)\b", re.IGNORECASE), "Rejected"),
+    (re.compile(r"\b(you\s+(?:have\s+been|are)\s+selected|cleared\s+all\s+rounds|congratulations)\b", re.IGNORECASE), "Selected"),
+    (re.compile(r"\b(second|2nd|round\s*2|l2)\b[^.\n]{0,80}\b(scheduled|confirmed|on)\b", re.IGNORECASE), "Round 2 Scheduled"),
+    (re.compile(r"\binterview\b[^.\n]{0,80}\b(scheduled|confirmed|slot|invite)\b|\b(scheduled|confirmed)\b[^.\n]{0,80}\binterview\b", re.IGNORECASE), "Interview Scheduled"),
+    (re.compile(r"\b(will\s+(?:share|send)\s+(?:the\s+)?(?:jd|job\s+description)|jd\s+to\s+follow|awaiting\s+(?:the\s+)?jd)\b", re.IGNORECASE), "Awaiting JD"),
+    (re.compile(r"\b(share|send)\s+(?:me\s+)?(?:your\s+)?(?:updated\s+)?(?:resume|cv|profile)\b", re.IGNORECASE), "Resume Requested"),
+]
+
+PREP_HINTS = {
+    "Offer Received": "Compare the offer against your expected CTC and prepare your negotiation points.",
+    "Rejected": "Ask the recruiter for feedback and note which extracted keywords to strengthen.",
+    "Selected": "Confirm the joining date and ask for the offer letter in writing.",
+    "Round 2 Scheduled": "Prepare system design and behavioural examples around the extracted keywords.",
+    "Interview Scheduled": "Focus on behavioral questions and a deep dive into the extracted keywords.",
+    "Awaiting JD": "Draft a polite follow-up email asking for the JD by tomorrow.",
+    "Resume Requested": "Tailor your resume to the extracted keywords and send it today.",
+}
+DEFAULT_STATUS = "Contacted"
+
+# Fields the rules find with high confidence (their value is copied verbatim from the text)
+EXACT_FIELDS = {"email_id", "phone_number"}
+
+# --- 4. Helpers ---
+def split_sections(text: str):
+    """Splits a combine_inputs() block into (applicant skills, job details)."""
+    match = re.search(r"--- APPLICANT SKILLS ---\n(.*?)\n--- JOB DETAILS ---\n(.*)", text, re.DOTALL)
+    if match:
+        return match.group(1).strip(), match.group(2)
+    return "", text
+
+
+def _first(pattern: re.Pattern, text: str, group: int = 1) -> str:
+    match = pattern.search(text)
+    return match.group(group).strip(" .,;") if match else ""
+
+
+def _sentence_around(text: str, first: int, last: int, window: int = SENTENCE_WINDOW) -> str:
+    """The sentence (or line) containing text[first:last], at most `window` characters either side.
+
+    Found by scanning outwards rather than by regex backtracking, and capped so text
+    without punctuation cannot make the per-date cue checks quadratic.
+    """
+    low, high = max(0, first - window), min(len(text), last + window)
+    start = max(text.rfind(".", low, first), text.rfind("\n", low, first), low - 1) + 1
+    ends = [position for position in (text.find(".", last, high), text.find("\n", last, high)) if position != -1]
+    return text[start:min(ends) if ends else high]
+
+
+def find_dates(text: str, reference: datetime.date) -> list:
+    """Returns (date phrase, surrounding sentence) for every date expression dates.py can resolve.
+
+    The phrase itself is stored and resolved later by normalize_record, as the model's answers
+    are, so both paths turn the same text into the same date.
+    """
+    found = []
+    for start, end in dates.find_expressions(text):
+        phrase = text[start:end].strip(" .,")
+        if dates.resolve_date(phrase, reference) is not None:
+            found.append((phrase, _sentence_around(text, start, end)))
+    return found
+
+
+def find_salary(text: str) -> str:
+    """Returns the salary phrase closest to a salary keyword, normalized (e.g. "30-35 LPA")."""
+    best, best_distance = "", None
+    for match in SALARY_PATTERN.finditer(text):
+        currency, low, high, unit = match.groups()
+        unit = unit.strip().lower()
+        if unit.startswith(("lakh", "lac", "lpa")) or unit == "l":
+            unit = "LPA"
+        elif unit.startswith("cr"):
+            unit = "Cr"
+        elif unit in ("k",):
+            unit = "K"
+        else:
+            unit = "per hour"
+        amount = f"{low}-{high}" if high else low
+        value = f"{(currency or '').strip()}{amount} {unit}".strip()
+        context = SALARY_CONTEXT.search(text, max(0, match.start() - 80), match.end() + 40)
+        distance = abs(context.start() - match.start()) if context else 10 ** 6
+        if best_distance is None or distance < best_distance:
+            best, best_distance = value, distance
+    return best
+
+
+def find_in_gazetteer(names: list, text: str) -> str:
+    """Returns the gazetteer entry mentioned earliest in the text."""
+    hits = []
+    for name in names:
+        match = re.search(rf"(?<![\w]){re.escape(name)}(?![\w])", text)
+        if match:
+            hits.append((match.start(), -len(name), name))
+    return min(hits)[2] if hits else ""
+
+
+def company_from_domain(email: str) -> str:
+    domain = email.split("@", 1)[1].split(".")[0] if "@" in email else ""
+    if not domain or domain.lower() in FREE_MAIL_DOMAINS:
+        return ""
+    return " ".join(part.capitalize() for part in re.split(r"[-_]", domain))
+
+
+def find_skills(text: str) -> list:
+    """Canonical skill names mentioned in the text, in order of first mention."""
+    hits = []
+    for skill in SKILLS:
+        match = _skill_pattern(skill).search(text)
+        if match:
+            hits.append((match.start(), skill))
+    return [skill for _, skill in sorted(hits)]
+
+
+def round_details(text: str, cue: str) -> str:
+    """Summarizes one interview round as "<Type> - <State>" from the sentence that mentions it."""
+    match = re.search(rf"\b(?:{cue})\b", text, re.IGNORECASE)
+    if not match:
+        return "Not specified"
+    sentence = _sentence_around(text, match.start(), match.end()).lower()
+    kind = next((label for word, label in (
+        ("technical", "Technical"), ("coding", "Coding"), ("managerial", "Managerial"), ("manager", "Managerial"),
+        ("hr", "HR"), ("client", "Client"), ("system design", "System Design"), ("assignment", "Assignment"),
+    ) if re.search(rf"\b{word}\b", sentence)), "Interview")
+    if re.search(r"\b(cleared|passed|qualified|selected)\b", sentence):
+        state = "Cleared"
+    elif re.search(r"\b(rejected|not\s+cleared|did\s+not\s+clear)\b", sentence):
+        state = "Rejected"
+    elif dates.find_expressions(sentence) or re.search(r"\b(scheduled|confirmed|slot)\b", sentence):
+        state = "Scheduled"
+    else:
+        state = "Mentioned"
+    return f"{kind} - {state}"
+
+# --- 5. The Extractor ---
+def extract_offline(text: str, reference: datetime.date = None) -> dict:
+    """Extracts all tracker keys from a combine_inputs() block using rules only (no network)."""
+    reference = reference or datetime.date.today()
+    applicant_skills, job_text = split_sections(text)
+    details = {key: "Not specified" for key in TRACKER_HEADERS}
+
+    # Contact details
+    sender_name, sender_email = "", ""
+    header = FROM_HEADER.search(job_text)
+    if header:
+        sender_name, sender_email = header.group(1).strip(' "'), header.group(2).strip()
+    emails = EMAIL_PATTERN.findall(job_text)
+    email = sender_email or (emails[0] if emails else "")
+    if email:
+        details["email_id"] = email
+    phone = PHONE_PATTERN.search(job_text)
+    if phone and len(re.sub(r"\D", "", phone.group(0))) >= 10:
+        details["phone_number"] = phone.group(0).strip()
+
+    intro = INTRO_PHRASES.search(job_text)
+    hr_name = sender_name or (intro.group(1) if intro else "") or _first(SIGN_OFF, job_text)
+    if hr_name:
+        details["hr_name"] = hr_name
+
+    # Companies: explicit labels first, then phrases, then the gazetteer
+    client = _first(CLIENT_LABELS, job_text) or _first(CLIENT_PHRASES, job_text) or find_in_gazetteer(COMPANIES, job_text)
+    recruiter = (intro.group(2).strip(" .,;") if intro and intro.group(2) else "") or company_from_domain(email)
+    if client and recruiter and client.lower() == recruiter.lower() and not AGENCY_WORDS.search(recruiter):
+        recruiter = ""  # A direct employer, not an agency
+    if client:
+        details["client_company"] = client
+    if recruiter:
+        details["recruiter_company"] = recruiter
+
+    role = _first(ROLE_LABELS, job_text) or _first(ROLE_PHRASES, job_text)
+    if not role:
+        role = re.split(r"\s+(?:-|–|\||@|at)\s+", _first(SUBJECT_HEADER, job_text))[0]
+        role = re.sub(r"^(?:(?:re|fwd?)\s*:\s*)+", "", role, flags=re.IGNORECASE)
+    if role:
+        details["role_position"] = role[:80]
+
+    # Location and work arrangement
+    location = _first(LOCATION_LABELS, job_text) or find_in_gazetteer(LOCATIONS, job_text)
+    arrangement = _first(re.compile(r"\b(remote|hybrid|work\s+from\s+home|wfh|on[\s-]?site)\b", re.IGNORECASE), job_text)
+    arrangement = {"work from home": "Remote", "wfh": "Remote"}.get(arrangement.lower(), arrangement.title())
+    if location and arrangement and arrangement.lower() not in location.lower():
+        details["location"] = f"{location} ({arrangement})"
+    elif location or arrangement:
+        details["location"] = location or arrangement
+
+    lowered = job_text.lower()
+    if re.search(r"\b(contract[\s-]to[\s-]hire|c2h|contract|contractual)\b", lowered):
+        details["job_type"] = "Contract"
+    elif re.search(r"\bintern(ship)?\b", lowered):
+        details["job_type"] = "Internship"
+    elif re.search(r"\bfreelanc", lowered):
+        details["job_type"] = "Freelance"
+    elif re.search(r"\b(permanent|full[\s-]time|fte|payroll)\b", lowered):
+        details["job_type"] = "Permanent"
+
+    if "linkedin" in lowered:
+        details["mode_of_contact"] = "LinkedIn"
+    elif "naukri" in lowered:
+        details["mode_of_contact"] = "Naukri"
+    elif header or SUBJECT_HEADER.search(job_text):
+        details["mode_of_contact"] = "Email"
+    elif re.search(r"\b(call(?:ed)?|spoke|phone|rang)\b", lowered):
+        details["mode_of_contact"] = "Call"
+    elif emails:
+        details["mode_of_contact"] = "Email"
+
+    if re.search(r"\b(virtual|online|video|zoom|teams|google\s+meet|webex|skype)\b", lowered):
+        details["interview_mode"] = "Online"
+    elif re.search(r"\b(in[\s-]person|face[\s-]to[\s-]face|f2f|walk[\s-]in|at\s+(?:our|the)\s+office)\b", lowered):
+        details["interview_mode"] = "Offline"
+
+    # Dates are assigned by the words around them
+    sent = SENT_HEADER.search(job_text)
+    contacted = sent.group(1).strip() if sent and dates.resolve_date(sent.group(1), reference) else None
+    for phrase, sentence in find_dates(job_text, reference):
+        if FOLLOW_UP_CUES.search(sentence) and is_missing(details["next_follow_up_date"]):
+            details["next_follow_up_date"] = phrase
+        elif INTERVIEW_CUES.search(sentence) and is_missing(details["interview_scheduled_date"]):
+            details["interview_scheduled_date"] = phrase
+        elif contacted is None and sentence.lstrip().lower().startswith(("sent", "date", "call summary")):
+            contacted = phrase
+    if contacted:
+        details["date_contacted"] = contacted
+
+    details["round_1_details"] = round_details(job_text, r"round\s*1|first\s+round|1st\s+round|l1|technical\s+round|initial\s+round")
+    details["round_2_details"] = round_details(job_text, r"round\s*2|second\s+round|2nd\s+round|l2|final\s+round")
+    salary = find_salary(job_text)
+    if salary:
+        details["ctc_offered_expected"] = salary
+
+    details["status"] = next((status for pattern, status in STATUS_RULES if pattern.search(job_text)), DEFAULT_STATUS)
+    if details["status"] == DEFAULT_STATUS and not is_missing(details["interview_scheduled_date"]):
+        details["status"] = "Interview Scheduled"
+
+    # Skills and fit, scored the same way as the candidate comparison
+    skills = find_skills(job_text)[:10]
+    if skills:
+        details["extracted_keywords"] = ", ".join(SKILLS[skill] for skill in skills)
+    if skills and applicant_skills.strip():
+        missing = [SKILLS[skill] for skill in skills if not _skill_pattern(skill).search(applicant_skills)]
+        details["match_score"] = f"{round(100 * (len(skills) - len(missing)) / len(skills))}%"
+        details["skill_gap_analysis"] = (
+            f"Missing experience in {', '.join(missing)}." if missing else "No gaps against the extracted keywords."
+        )
+    details["prep_hint"] = PREP_HINTS.get(
+        details["status"], "Research the company and prepare questions about the role and team."
+    )
+    # The same normalization as the model's answers: dates count from date_contacted, else the reference
+    return normalize_record(details, reference)
+
+
+def refinement_fields(details: dict) -> list:
+    """Keys an offline result should have re-extracted by the model when it is available."""
+    return [key for key in TRACKER_HEADERS if key in details and (key not in EXACT_FIELDS or is_missing(details[key]))]
+
+# --- 6. Automatic Fallback ---
+def extract_with_fallback(text: str, use_model: bool = True, keys=None):
+    """Extracts with the model, falling back to the offline rules when it is unavailable.
+
+    Returns (details, refine_keys, warning): refine_keys lists the fields that were only
+    guessed offline, and warning explains why the fallback was used ("" if it was not).
+    keys limits both paths to a subset of the tracker fields.
+    """
+    warning = ""
+    if use_model:
+        details = process_recruiter_text(text, keys)
+        if "error" not in details:
+            return details, [], ""
+        warning = f"The AI extraction failed, so an offline estimate is shown instead. ({details['error']})"
+    details = extract_offline(text)
+    EXTRACTIONS.inc(1, ("offline", "ok"))
+    if keys is not None:
+        details = {key: details[key] for key in select_fields(keys)}
+    return details, refinement_fields(details), warning
+
+# --- 7. Golden-Set Comparison ---
+def field_matches(key: str, expected, actual) -> bool:
+    """Lenient per-field comparison used to score extractions against labelled answers."""
+    expected_text, actual_text = str(expected or "").strip().lower(), str(actual or "").strip().lower()
+    if is_missing(expected_text) or is_missing(actual_text):
+        return is_missing(expected_text) == is_missing(actual_text)
+    if key == "extracted_keywords":
+        expected_skills, actual_skills = set(parse_keywords(expected_text)), set(parse_keywords(actual_text))
+        overlap = len(expected_skills & actual_skills) / len(expected_skills | actual_skills)
+        return overlap >= 0.5
+    if key == "match_score":
+        numbers = [re.search(r"\d+", value) for value in (expected_text, actual_text)]
+        return all(numbers) and abs(int(numbers[0].group()) - int(numbers[1].group())) <= 15
+    if key in ("date_contacted", "interview_scheduled_date", "next_follow_up_date"):
+        return dates.resolve_date(expected_text) == dates.resolve_date(actual_text)
+    squash = lambda value: re.sub(r"[^a-z0-9]+", " ", value).strip()
+    expected_text, actual_text = squash(expected_text), squash(actual_text)
+    return expected_text == actual_text or expected_text in actual_text or actual_text in expected_text
+
+
+def load_golden_set(path: str) -> list:
+    with open(path, encoding="utf-8") as golden_file:
+        return [json.loads(line) for line in golden_file if line.strip()]
+
+
+def golden_input(example: dict) -> str:
+    inputs = example["input"]
+    return combine_inputs(inputs.get("applicant_skills", ""), inputs.get("call_details", ""), inputs.get("recruiter_text", ""))
+
+
+def score_extractor(extractor, examples: list) -> dict:
+    """Runs an extractor over the golden set; returns per-field accuracy and latency."""
+    correct, total, latencies, failures = {}, {}, [], 0
+    for example in examples:
+        started = time.perf_counter()
+        result = extractor(golden_input(example), example)
+        latencies.append(time.perf_counter() - started)
+        if "error" in result:
+            failures += 1
+            result = {}
+        for key, expected in example["expected"].items():
+            total[key] = total.get(key, 0) + 1
+            correct[key] = correct.get(key, 0) + field_matches(key, expected, result.get(key))
+    latencies.sort()
+    return {
+        "field_accuracy": {key: correct[key] / total[key] for key in total},
+        "overall_accuracy": sum(correct.values()) / max(1, sum(total.values())),
+        "failures": failures,
+        "median_latency_ms": 1000 * latencies[len(latencies) // 2] if latencies else 0.0,
+        "max_latency_ms": 1000 * latencies[-1] if latencies else 0.0,
+    }
+
+
+def offline_for_example(text: str, example: dict) -> dict:
+    reference = example.get("reference_date")
+    return extract_offline(text, datetime.date.fromisoformat(reference) if reference else None)
+
+# --- 8. Standalone Execution Block ---
+if __name__ == "__main__":
+    golden_paths = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+    if not golden_paths:
+        print("Usage: python offline_extractor.py <golden.jsonl> [<more golden.jsonl> ...] [--with-model]")
+        sys.exit(1)
+    if "--with-model" in sys.argv:
+        import os
+        from dotenv import load_dotenv
+        import google.generativeai as genai
+
+        load_dotenv()
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+
+    for number, golden_path in enumerate(golden_paths):
+        examples = load_golden_set(golden_path)
+        reports = {"offline": score_extractor(offline_for_example, examples)}
+        if "--with-model" in sys.argv:
+            # Relative dates count from the example's reference date on both sides
+            reports["model"] = score_extractor(
+                lambda text, example: process_recruiter_text(text, received_at=example.get("reference_date")), examples
+            )
+
+        keys = sorted({key for example in examples for key in example["expected"]}, key=TRACKER_HEADERS.index)
+        names = list(reports)
+        print(("\n" if number else "") + f"{golden_path} ({len(examples)} examples)")
+        print(f"{'field':<26}" + "".join(f"{name:>12}" for name in names))
+        for key in keys:
+            print(f"{key:<26}" + "".join(f"{reports[name]['field_accuracy'].get(key, 0):>12.0%}" for name in names))
+        print(f"{'OVERALL':<26}" + "".join(f"{reports[name]['overall_accuracy']:>12.0%}" for name in names))
+        print(f"{'failures':<26}" + "".join(f"{reports[name]['failures']:>12}" for name in names))
+        print(f"{'median latency (ms)':<26}" + "".join(f"{reports[name]['median_latency_ms']:>12.1f}" for name in names))
+        print(f"{'max latency (ms)':<26}" + "".join(f"{reports[name]['max_latency_ms']:>12.1f}" for name in names))
@@ -0,0 +1,259 @@
+# prep_packs.py (Interview prep material per skill, generated once and shared by every job)
+#
+# Usage: python prep_packs.py <record_id>     prints the prep pack of a tracked job (generating missing skills)
+#        python prep_packs.py --stats         counts stored packs per version
+#
+# prep_hint is one sentence per job. Real prep material (topics, questions, an exercise) is
+# written per normalized skill from extracted_keywords instead, because the same skills repeat
+# across most jobs: a pack is generated once in the background, stored in the tracker database
+# under PACK_VERSION, and a job's prep pack is assembled from the packs of its skills. A job
+# sharing 8 of its 10 skills with earlier ones costs two model calls.
+
+# --- 1. Import necessary libraries ---
+import os
+import re
+import sys
+import json
+import time
+import datetime
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+import tracker
+from extraction import MODEL_ID, generate_json, is_missing
+from candidate_ranking import parse_keywords
+
+# --- 2. Configuration and Schema ---
+# Bump the leading number whenever PREP_PACK_PROMPT changes; packs of other versions are regenerated on use
+PACK_VERSION = f"1:{MODEL_ID}"
+MAX_SKILLS_PER_JOB = 10
+RETRY_FAILED_SECONDS = 300  # A skill whose generation failed is not retried before this
+
+tracker.register_schema("""
+CREATE TABLE IF NOT EXISTS prep_packs (
+    skill TEXT NOT NULL,
+    version TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (skill, version)
+);
+""")
+
+PREP_PACK_PROMPT = """
+You are an interview coach for software and IT roles. Write interview preparation material for the single skill below, independent of any particular company. Return a single valid JSON object (no markdown, no code fences) with exactly these keys:
+- "summary": one sentence on what interviewers usually probe for this skill.
+- "key_topics": a list of 5-7 short topics to revise.
+- "questions": a list of 5 objects, each {{"question": "...", "answer_points": "one sentence on what a strong answer covers"}}.
+- "hands_on": one small practical exercise to do before the interview (1-2 sentences).
+
+**Skill:** {skill}
+
+**JSON Output:**
+"""
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="prep-pack")
+# Packs are immutable per version, so whatever was read or generated here stays valid
+_packs = {}
+_in_flight = {}  # skill -> Future of this process's generation
+_failed = {}  # skill -> time of the last failed generation
+_state_lock = threading.RLock()  # A done callback can run inside request_packs itself
+
+# --- 3. Skills of a Job ---
+def job_skills(details: dict, limit: int = MAX_SKILLS_PER_JOB) -> list:
+    """Normalized skills of a record, those named in its skill gap analysis first."""
+    skills = parse_keywords(details.get("extracted_keywords", ""))
+    gaps = str(details.get("skill_gap_analysis", "") or "").lower()
+    if not is_missing(gaps):
+        skills.sort(key=lambda skill: re.search(rf"(?<!\w){re.escape(skill)}(?!\w)", gaps) is None)
+    return skills[:limit]
+
+
+def _clean_pack(skill: str, parsed: dict):
+    """The pack in a fixed shape, or None when the answer holds nothing usable."""
+    topics = [str(topic).strip() for topic in parsed.get("key_topics") or [] if str(topic).strip()]
+    questions = [
+        {"question": str(item.get("question", "")).strip(), "answer_points": str(item.get("answer_points", "")).strip()}
+        for item in parsed.get("questions") or [] if isinstance(item, dict) and str(item.get("question", "")).strip()
+    ]
+    if not topics and not questions:
+        return None
+    return {
+        "skill": skill,
+        "summary": str(parsed.get("summary", "") or "").strip(),
+        "key_topics": topics,
+        "questions": questions,
+        "hands_on": str(parsed.get("hands_on", "") or "").strip(),
+    }
+
+# --- 4. Storage ---
+def get_packs(skills, path: str = None) -> dict:
+    """{skill: pack} for the skills that already have a pack of the current version."""
+    skills = list(skills)
+    with _state_lock:
+        found = {skill: _packs[skill] for skill in skills if skill in _packs}
+    missing = [skill for skill in skills if skill not in found]
+    if missing:
+        # Another replica (or an earlier run) may have written it
+        with tracker.open_db(path) as connection:
+            rows = connection.execute(
+                f"SELECT skill, content FROM prep_packs WHERE version = ? AND skill IN ({', '.join('?' for _ in missing)})",
+                [PACK_VERSION] + missing
+            ).fetchall()
+        loaded = {row["skill"]: json.loads(row["content"]) for row in rows}
+        with _state_lock:
+            _packs.update(loaded)
+        found.update(loaded)
+    return found
+
+
+def _store_pack(pack: dict, path: str = None) -> None:
+    with tracker.open_db(path) as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO prep_packs (skill, version, content, created_at) VALUES (?, ?, ?, ?)",
+            (pack["skill"], PACK_VERSION, json.dumps(pack, ensure_ascii=False),
+             datetime.datetime.now().isoformat(timespec="seconds"))
+        )
+    with _state_lock:
+        _packs[pack["skill"]] = pack
+
+# --- 5. Generation ---
+def generate_pack(skill: str, path: str = None) -> dict:
+    """Generates and stores the pack of one skill; returns it, or {"error": ...}."""
+    # Replicas asking for the same skill at once share one model call through the response cache
+    parsed = generate_json(PREP_PACK_PROMPT.format(skill=skill))
+    if "error" in parsed:
+        return parsed
+    pack = _clean_pack(skill, parsed)
+    if pack is None:
+        return {"error": f"The AI returned no prep material for '{skill}'."}
+    _store_pack(pack, path)
+    return pack
+
+
+def _generated(skill: str, future) -> None:
+    with _state_lock:
+        _in_flight.pop(skill, None)
+        if future.cancelled() or future.exception() is not None or "error" in future.result():
+            _failed[skill] = time.monotonic()
+        else:
+            _failed.pop(skill, None)
+
+
+def request_packs(skills, path: str = None) -> list:
+    """Starts background generation for the skills without a pack; returns those still pending.
+
+    Skills already being generated are not requested twice, and a recent failure is not
+    retried before RETRY_FAILED_SECONDS, so reruns while waiting cost nothing.
+    """
+    missing = [skill for skill in skills if skill not in get_packs(skills, path)]
+    pending = []
+    now = time.monotonic()
+    with _state_lock:
+        for skill in missing:
+            if skill not in _in_flight:
+                if now - _failed.get(skill, -RETRY_FAILED_SECONDS) < RETRY_FAILED_SECONDS:
+                    continue
+                # The caller's context goes along, so the rate limiter queues these calls under its session
+                future = _executor.submit(contextvars.copy_context().run, generate_pack, skill, path)
+                _in_flight[skill] = future
+                future.add_done_callback(lambda done, skill=skill: _generated(skill, done))
+            pending.append(skill)
+    return pending
+
+
+def wait_for_packs(skills, timeout: float = None) -> None:
+    """Blocks until the background generation of these skills has finished (or timeout)."""
+    with _state_lock:
+        futures = [_in_flight[skill] for skill in skills if skill in _in_flight]
+    wait(futures, timeout=timeout)
+
+# --- 6. Assembly per Job ---
+def assemble(details: dict, path: str = None, generate: bool = True) -> dict:
+    """The job's prep pack from the shared skill packs.
+
+    Returns {"skills", "packs", "pending", "unavailable"}: packs holds the ready ones in skill
+    order, pending those being generated, unavailable those with no pack that are not being
+    generated (generate=False, e.g. offline, or a recent failure).
+    """
+    skills = job_skills(details)
+    pending = request_packs(skills, path) if generate else []
+    packs = get_packs(skills, path)
+    return {
+        "skills": skills,
+        "packs": {skill: packs[skill] for skill in skills if skill in packs},
+        "pending": [skill for skill in pending if skill not in packs],
+        "unavailable": [skill for skill in skills if skill not in packs and skill not in pending],
+    }
+
+
+def skill_title(skill: str) -> str:
+    # Normalized skills are lower case: "aws" -> "AWS", "go" -> "Go", "node.js" -> "Node.js"
+    return skill.upper() if len(skill) == 3 and skill.isalpha() else skill[:1].upper() + skill[1:]
+
+
+def format_skill_markdown(pack: dict) -> str:
+    """One skill's pack as Markdown: summary, topics, questions with answer points, exercise."""
+    lines = []
+    if pack["summary"]:
+        lines += [pack["summary"], ""]
+    if pack["key_topics"]:
+        lines += ["**Topics to revise:**"] + [f"- {topic}" for topic in pack["key_topics"]] + [""]
+    for number, item in enumerate(pack["questions"], start=1):
+        lines.append(f"{number}. {item['question']}")
+        if item["answer_points"]:
+            lines.append(f"   - *A strong answer covers:* {item['answer_points']}")
+    if pack["hands_on"]:
+        lines += ["", f"**Hands-on:** {pack['hands_on']}"]
+    return "\n".join(lines)
+
+
+def format_pack_markdown(details: dict, assembled: dict) -> str:
+    """The assembled prep pack as a Markdown document (job context first, then one section per skill)."""
+    title = " @ ".join(
+        str(details.get(key)) for key in ("role_position", "client_company") if not is_missing(details.get(key))
+    ) or "Job"
+    context = [
+        f"- **{label}:** {details[key]}"
+        for key, label in (("status", "Status"), ("skill_gap_analysis", "Skill gaps"), ("prep_hint", "Next step"))
+        if not is_missing(details.get(key))
+    ]
+    lines = [f"# Interview Prep: {title}"] + ([""] + context if context else [])
+    for skill, pack in assembled["packs"].items():
+        lines += ["", f"## {skill_title(skill)}", "", format_skill_markdown(pack)]
+    missing = assembled["pending"] + assembled["unavailable"]
+    if missing:
+        lines += ["", f"*Not ready yet: {', '.join(missing)}*"]
+    return "\n".join(lines) + "\n"
+
+
+def pack_stats(path: str = None) -> list:
+    with tracker.open_db(path) as connection:
+        rows = connection.execute(
+            "SELECT version, COUNT(*) AS packs FROM prep_packs GROUP BY version ORDER BY version"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+# --- 7. Standalone Execution Block ---
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "--stats":
+        for row in pack_stats():
+            print(f"{row['packs']:6d}  {row['version']}{'  (current)' if row['version'] == PACK_VERSION else ''}")
+    elif len(sys.argv) == 2 and sys.argv[1].isdigit():
+        record = tracker.get_record(int(sys.argv[1]))
+        if not record:
+            print(f"No tracked record #{sys.argv[1]}")
+            sys.exit(1)
+        from dotenv import load_dotenv
+        import google.generativeai as genai
+
+        load_dotenv()
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+        started = time.perf_counter()
+        skills = job_skills(record)
+        generated = request_packs(skills)
+        wait_for_packs(generated)
+        print(format_pack_markdown(record, assemble(record, generate=False)))
+        print(f"{len(skills)} skill(s), {len(generated)} generated in {time.perf_counter() - started:.1f}s")
+    else:
+        print("Usage: python prep_packs.py <record_id>  |  python prep_packs.py --stats")
+        sys.exit(1)
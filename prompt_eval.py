@@ -0,0 +1,357 @@
+# prompt_eval.py (Compare the repo's prompt versions on a labelled golden set)
+#
+# Usage: python prompt_eval.py golden/recruiter_messages.jsonl [--record] [--models gemini-2.5-flash,...]
+#        python prompt_eval.py golden/recruiter_messages.jsonl --models scripted
+#
+# Every prompt/model pair runs over every golden example in parallel. By default the
+# model is never called: responses are replayed from golden/recordings, keyed by a
+# hash of the model and the exact prompt, so editing a prompt shows up as "not
+# recorded" until --record fetches fresh responses from the live API.
+#
+# The "scripted" model needs neither: it answers every prompt deterministically with the
+# golden labels, written in that variant's output format and keys, with dates phrased
+# relative to the example's reference date. It checks the harness end to end (prompt
+# building, parsing, key maps, normalization, scoring); it says nothing about a model.
+
+# --- 1. Import necessary libraries ---
+import os
+import re
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import extraction
+from extraction import MODEL_ID, TRACKER_HEADERS, clean_model_output, call_model
+from fields import DATE_FIELDS, normalize_record
+from offline_extractor import load_golden_set, golden_input, field_matches, offline_for_example
+from rate_limiter import CHARS_PER_TOKEN
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDINGS_DIR = os.path.join(REPO_DIR, "golden", "recordings")
+SCRIPTED_MODEL = "scripted"
+
+# --- 2. Prompt Variants ---
+# Keys of the older 8-key prompts, mapped onto the tracker columns they correspond to
+EIGHT_KEY_MAP = {
+    "recruiter_name": "hr_name", "recruiter_company": "recruiter_company", "hiring_company": "client_company",
+    "job_title": "role_position", "required_skills": "extracted_keywords", "salary_range": "ctc_offered_expected",
+    "employment_type": "job_type", "interview_mode": "interview_mode",
+}
+# agent1.py asks for Markdown with bold labels instead of JSON keys
+MARKDOWN_LABEL_MAP = {
+    "recruiter name": "hr_name", "recruiter company": "recruiter_company", "hiring company": "client_company",
+    "job title": "role_position", "required skills": "extracted_keywords", "salary range": "ctc_offered_expected",
+    "employment type": "job_type", "interview mode": "interview_mode",
+}
+
+# name -> (source file, variable, how the input is attached, output format, key map)
+PROMPT_VARIANTS = {
+    "agent1-8key-markdown": ("agent1.py", "EXTRACTION_INSTRUCTION", "append", "markdown", MARKDOWN_LABEL_MAP),
+    "v2_3-8key-json": ("webapp_v2_3.py", "EXTRACTION_PROMPT", "format", "json", EIGHT_KEY_MAP),
+    "webapp-18key-json": ("webapp.py", "EXTRACTION_PROMPT", "format", "json", None),
+    "current-22key-json": ("extraction.py", "EXTRACTION_PROMPT", "format", "json", None),
+}
+
+
+def _find_constant(source: str, variable: str):
+    """Last module-level string assigned to `variable`, also looking inside code that was
+    disabled by wrapping it in a triple-quoted string (as webapp_v2_3.py does)."""
+    found = None
+    for node in ast.parse(source).body:
+        if (isinstance(node, ast.Assign) and any(getattr(target, "id", None) == variable for target in node.targets)
+                and isinstance(node.value, ast.Constant)):
+            found = node.value.value
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            try:
+                found = _find_constant(node.value.value, variable) or found
+            except SyntaxError:
+                continue
+    return found
+
+
+@lru_cache(maxsize=None)
+def load_prompt(filename: str, variable: str) -> str:
+    """Reads a module-level string constant without importing (and so running) the script."""
+    if filename == "extraction.py":
+        # The live prompt is generated from the field registry (fields.py) when extraction.py is imported
+        return getattr(extraction, variable)
+    with open(os.path.join(REPO_DIR, filename), encoding="utf-8") as source_file:
+        prompt = _find_constant(source_file.read(), variable)
+    if prompt is None:
+        raise ValueError(f"{variable} not found in {filename}")
+    return prompt
+
+
+def build_prompt(variant: str, text: str) -> str:
+    filename, variable, attach, _, _ = PROMPT_VARIANTS[variant]
+    template = load_prompt(filename, variable)
+    if attach == "format":
+        return template.format(text_input=text)
+    # Exactly how agent1.py attaches its input
+    return template + f"\n\n**Input Text:**\n---\n{text}\n---\n\n**Structured Output:**"
+
+
+def parse_output(variant: str, text: str):
+    """Returns (tracker-keyed fields, was the output valid JSON)."""
+    _, _, _, output_format, key_map = PROMPT_VARIANTS[variant]
+    if output_format == "markdown":
+        fields = {}
+        for label, value in re.findall(r"\*\*\s*([^*:]+?)\s*:?\s*\*\*\s*:?\s*(.+)", text):
+            key = MARKDOWN_LABEL_MAP.get(label.strip().lower())
+            if key:
+                fields[key] = value.strip()
+        return fields, False
+    try:
+        parsed = json.loads(clean_model_output(text))
+    except json.JSONDecodeError:
+        return {}, False
+    if not isinstance(parsed, dict):
+        return {}, False
+    if key_map:
+        parsed = {key_map[key]: value for key, value in parsed.items() if key in key_map}
+    # Lists (e.g. required_skills) are compared as the comma-separated text the tracker stores
+    return {key: ", ".join(map(str, value)) if isinstance(value, list) else value for key, value in parsed.items()}, True
+
+
+def variant_fields(variant: str) -> list:
+    """Tracker keys a prompt variant is able to produce."""
+    if variant == "offline-rules":
+        return list(TRACKER_HEADERS)
+    filename, variable, _, _, key_map = PROMPT_VARIANTS[variant]
+    if key_map:
+        return list(key_map.values())
+    template = load_prompt(filename, variable)
+    return [key for key in TRACKER_HEADERS if f'"{key}"' in template]
+
+# --- 3. Recorded Responses ---
+def recording_key(model_id: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_id}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class Recordings:
+    """Append-only JSONL store of model responses, one file per model."""
+
+    def __init__(self, directory: str = RECORDINGS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.loaded = {}
+
+    def _path(self, model_id: str) -> str:
+        safe_name = re.sub(r"[^\w.-]", "_", model_id)
+        return os.path.join(self.directory, f"{safe_name}.jsonl")
+
+    def _entries(self, model_id: str) -> dict:
+        if model_id not in self.loaded:
+            entries = {}
+            if os.path.exists(self._path(model_id)):
+                with open(self._path(model_id), encoding="utf-8") as recording_file:
+                    for line in recording_file:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries[entry["key"]] = entry
+            self.loaded[model_id] = entries
+        return self.loaded[model_id]
+
+    def get(self, model_id: str, prompt: str):
+        with self.lock:
+            return self._entries(model_id).get(recording_key(model_id, prompt))
+
+    def add(self, model_id: str, prompt: str, entry: dict) -> None:
+        entry = dict(entry, key=recording_key(model_id, prompt))
+        with self.lock:
+            self._entries(model_id)[entry["key"]] = entry
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(model_id), "a", encoding="utf-8") as recording_file:
+                recording_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def fetch_response(model_id: str, prompt: str) -> dict:
+    """Calls the live model once (through the shared rate limiter) and times it."""
+    import google.generativeai as genai
+    started = time.perf_counter()
+    response = call_model(genai.GenerativeModel(model_id), prompt)
+    latency = time.perf_counter() - started
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "text": response.text,
+        "latency_seconds": latency,
+        "input_tokens": getattr(usage, "prompt_token_count", 0) if usage else 0,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) if usage else 0,
+    }
+
+def _relative_phrase(value: str, reference) -> str:
+    # "tomorrow" / "next Monday" where a recruiter (and so a copying model) would write one
+    try:
+        day = datetime.date.fromisoformat(str(value)[:10])
+        reference = datetime.date.fromisoformat(reference)
+    except (TypeError, ValueError):
+        return value
+    days = (day - reference).days
+    if days in (0, 1):
+        return ("today", "tomorrow")[days]
+    if 1 < days <= 7:
+        return f"next {day.strftime('%A')}" if days == 7 else day.strftime("%A")
+    return day.strftime("%d %b %Y")
+
+
+def scripted_response(variant: str, example: dict) -> dict:
+    """A deterministic answer carrying the golden labels in the variant's output format."""
+    _, _, _, output_format, key_map = PROMPT_VARIANTS[variant]
+    answers = {}
+    for key in variant_fields(variant):
+        value = example["expected"].get(key, "Not specified")
+        if key in DATE_FIELDS and example.get("reference_date"):
+            value = _relative_phrase(value, example["reference_date"])
+        answers[key] = value
+    names = {value: key for key, value in (key_map or {}).items()}
+    if output_format == "markdown":
+        text = "\n".join(f"**{names[key].title()}:** {value}" for key, value in answers.items())
+    else:
+        text = json.dumps({names.get(key, key): value for key, value in answers.items()}, ensure_ascii=False)
+    return {"text": text, "latency_seconds": 0.0}
+
+# --- 4. Running One Case ---
+def run_case(variant: str, model_id: str, example: dict, recordings: Recordings, record: bool) -> dict:
+    """Scores one (prompt variant, model, golden example) combination."""
+    text = golden_input(example)
+    if variant == "offline-rules":
+        started = time.perf_counter()
+        fields = offline_for_example(text, example)
+        return {"status": "ok", "fields": fields, "json_valid": True, "latency_seconds": time.perf_counter() - started,
+                "input_tokens": 0, "output_tokens": 0}
+
+    prompt = build_prompt(variant, text)
+    entry = scripted_response(variant, example) if model_id == SCRIPTED_MODEL else recordings.get(model_id, prompt)
+    if entry is None and record:
+        try:
+            entry = fetch_response(model_id, prompt)
+        except Exception as e:
+            return {"status": f"error: {e}"}
+        recordings.add(model_id, prompt, dict(entry, variant=variant, example=example["id"]))
+    if entry is None:
+        return {"status": "not recorded"}
+    fields, json_valid = parse_output(variant, entry["text"])
+    # Resolved against the example's date, as the app resolves them against the message's
+    fields = normalize_record(fields, example.get("reference_date"))
+    return {
+        "status": "ok",
+        "fields": fields,
+        "json_valid": json_valid,
+        "latency_seconds": entry["latency_seconds"],
+        "input_tokens": entry.get("input_tokens") or len(prompt) // CHARS_PER_TOKEN,
+        "output_tokens": entry.get("output_tokens") or len(entry["text"]) // CHARS_PER_TOKEN,
+    }
+
+# --- 5. Aggregation ---
+def summarize(variant: str, cases: list, examples: list, input_price: float, output_price: float) -> dict:
+    """Per-field accuracy over the fields a variant covers, plus validity, token and latency figures."""
+    covered = variant_fields(variant)
+    correct, total = {}, {}
+    done = [(case, example) for case, example in zip(cases, examples) if case["status"] == "ok"]
+    for case, example in done:
+        for key, expected in example["expected"].items():
+            if key in covered:
+                total[key] = total.get(key, 0) + 1
+                correct[key] = correct.get(key, 0) + field_matches(key, expected, case["fields"].get(key))
+    latencies = sorted(case["latency_seconds"] for case, _ in done)
+    input_tokens = sum(case["input_tokens"] for case, _ in done)
+    output_tokens = sum(case["output_tokens"] for case, _ in done)
+    # Figures over no scored case are None (printed as n/a), not 0, so a variant without
+    # recordings doesn't read as one that failed every case
+    return {
+        "cases": len(cases),
+        "scored": len(done),
+        "missing": sum(case["status"] == "not recorded" for case in cases),
+        "errors": sum(case["status"].startswith("error") for case in cases),
+        "json_valid_rate": sum(case["json_valid"] for case, _ in done) / len(done)
+        if done and variant != "offline-rules" else None,
+        "field_accuracy": {key: correct[key] / total[key] for key in total},
+        "overall_accuracy": sum(correct.values()) / sum(total.values()) if total else None,
+        "mean_output_tokens": output_tokens / len(done) if done else None,
+        "p50_latency_s": latencies[len(latencies) // 2] if latencies else None,
+        "p95_latency_s": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+        # USD per 1,000 extractions at the given per-million-token prices
+        "cost_per_1k": 1000 * (input_tokens * input_price + output_tokens * output_price) / 1e6 / len(done) if done else None,
+    }
+
+
+def evaluate(examples: list, variants: list, models: list, recordings: Recordings, record: bool = False,
+             workers: int = 8, input_price: float = 0.30, output_price: float = 2.50) -> dict:
+    """Runs every variant x model x example in a thread pool; returns {(variant, model): summary}."""
+    combos = [("offline-rules", "-")] if "offline-rules" in variants else []
+    combos += [(variant, model_id) for variant in variants if variant != "offline-rules" for model_id in models]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            combo: [pool.submit(run_case, combo[0], combo[1], example, recordings, record) for example in examples]
+            for combo in combos
+        }
+        return {
+            combo: summarize(combo[0], [future.result() for future in combo_futures], examples, input_price, output_price)
+            for combo, combo_futures in futures.items()
+        }
+
+
+def print_report(report: dict) -> None:
+    summaries = list(report.values())
+    width = max(len(variant) for variant, _ in report) + 2
+    fields = [key for key in TRACKER_HEADERS if any(key in summary["field_accuracy"] for summary in summaries)]
+
+    def cell(value, fmt: str) -> str:
+        return f"{'n/a' if value is None else fmt.format(value):>{width}}"
+
+    print(f"{'':<26}" + "".join(f"{variant:>{width}}" for variant, _ in report))
+    print(f"{'':<26}" + "".join(f"{model_id:>{width}}" for _, model_id in report))
+    for key in fields:
+        print(f"{key:<26}" + "".join(
+            cell(summary["field_accuracy"][key], "{:.0%}") if key in summary["field_accuracy"] else f"{'—':>{width}}"
+            for summary in summaries
+        ))
+    print(f"{'scored / cases':<26}" + "".join(f"{summary['scored']}/{summary['cases']:<}".rjust(width) for summary in summaries))
+    for label, key, fmt in [
+        ("OVERALL accuracy", "overall_accuracy", "{:.0%}"), ("JSON valid", "json_valid_rate", "{:.0%}"),
+        ("mean output tokens", "mean_output_tokens", "{:.0f}"), ("p50 latency (s)", "p50_latency_s", "{:.2f}"),
+        ("p95 latency (s)", "p95_latency_s", "{:.2f}"), ("USD per 1k extractions", "cost_per_1k", "{:.3f}"),
+    ]:
+        print(f"{label:<26}" + "".join(cell(summary[key], fmt) for summary in summaries))
+    missing = sum(summary["missing"] for summary in summaries)
+    if missing:
+        print(f"\n{missing} case(s) have no recorded response; run with --record (needs GOOGLE_API_KEY) to fetch them.")
+
+# --- 6. Standalone Execution Block ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare prompt versions on a labelled golden set.")
+    parser.add_argument("golden", help="Golden set JSONL (see golden/recruiter_messages.jsonl).")
+    parser.add_argument("--variants", default=",".join(["offline-rules"] + list(PROMPT_VARIANTS)),
+                        help="Comma-separated prompt variants to compare.")
+    parser.add_argument("--models", default=MODEL_ID,
+                        help=f"Comma-separated model ids; '{SCRIPTED_MODEL}' answers with the golden labels (harness check).")
+    parser.add_argument("--record", action="store_true", help="Call the live API for responses not yet recorded.")
+    parser.add_argument("--recordings", default=RECORDINGS_DIR, help="Directory of recorded responses.")
+    parser.add_argument("--workers", type=int, default=8, help="Cases run in parallel.")
+    parser.add_argument("--input-price", type=float, default=0.30, help="USD per million input tokens.")
+    parser.add_argument("--output-price", type=float, default=2.50, help="USD per million output tokens.")
+    args = parser.parse_args()
+
+    variants = args.variants.split(",")
+    unknown = [variant for variant in variants if variant != "offline-rules" and variant not in PROMPT_VARIANTS]
+    if unknown:
+        print(f"Unknown variant(s): {', '.join(unknown)}. Known: offline-rules, {', '.join(PROMPT_VARIANTS)}")
+        sys.exit(1)
+    if args.record:
+        from dotenv import load_dotenv
+        import google.generativeai as genai
+
+        load_dotenv()
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+
+    report = evaluate(
+        load_golden_set(args.golden), variants, args.models.split(","), Recordings(args.recordings),
+        record=args.record, workers=args.workers, input_price=args.input_price, output_price=args.output_price
+    )
+    print_report(report)
@@ -0,0 +1,202 @@
+# rate_limiter.py (RPM/TPM limiter in front of every Gemini call, shared by all replicas when state is)
+
+# --- 1. Import necessary libraries ---
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from shared_state import shared_backend, state_key
+import metrics
+
+# --- 2. Configuration ---
+# Defaults match the free tier of gemini-2.5-flash; raise them for paid quotas
+REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_RPM", "10"))
+TOKENS_PER_MINUTE = int(os.environ.get("GEMINI_TPM", "250000"))
+MAX_WAIT_SECONDS = float(os.environ.get("GEMINI_MAX_WAIT", "120"))
+CANCEL_POLL_SECONDS = 0.25  # How often a cancellable wait checks whether its caller gave up
+# Bucket levels live under this key when replicas share a state backend (one API quota for all of them)
+SHARED_BUCKETS_KEY = state_key("rate_limit", "buckets")
+EXPECTED_OUTPUT_TOKENS = 600  # A full 22-key JSON answer is roughly this size
+CHARS_PER_TOKEN = 4
+
+# The session a model call belongs to; set once per script run by the web app
+current_session = contextvars.ContextVar("current_session", default="default")
+
+QUOTA_WAIT = metrics.histogram(
+    "ratelimit_wait_seconds", "Time model calls waited in the limiter for RPM/TPM quota.",
+    (0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+QUOTA_THROTTLED = metrics.counter("ratelimit_throttled_total", "Quota errors (HTTP 429) returned by the model API.")
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request could not get quota within the allowed wait."""
+
+
+def estimate_tokens(prompt: str, expected_output: int = EXPECTED_OUTPUT_TOKENS) -> int:
+    """Cheap pre-send estimate of the tokens a request will consume (input + output)."""
+    return len(prompt) // CHARS_PER_TOKEN + expected_output
+
+# --- 3. Token Bucket ---
+class TokenBucket:
+    """Holds up to `capacity` units and refills continuously at `capacity` per minute."""
+
+    def __init__(self, capacity: int):
+        self.capacity = float(capacity)
+        self.rate = capacity / 60.0
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill(now)
+        # A request larger than the bucket can never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        # Balance may go negative when a large request or an underestimate is charged
+        self.tokens -= amount
+
+# --- 4. Fair Limiter ---
+class RateLimiter:
+    """Grants model calls within both the RPM and TPM budget.
+
+    Waiting requests are queued per session and sessions are served round-robin,
+    so one user submitting a batch cannot starve everybody else. With a shared backend
+    the bucket levels are read and charged atomically in it, so every replica draws on
+    the same quota; the fair queue stays per replica.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 backend=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.backend = backend
+        self.condition = threading.Condition()
+        self.queues = OrderedDict()  # session id -> deque of waiting tickets, in round-robin order
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _with_buckets(self, action):
+        """Runs action(now) against the buckets: in process, or as one atomic update of the shared levels."""
+        if self.backend is None:
+            return action(time.monotonic())
+
+        def apply(raw):
+            # Wall-clock time, since the levels are refilled by whichever replica touches them next
+            now = time.time()
+            levels = json.loads(raw) if raw is not None else {}
+            buckets = {"requests": self.requests, "tokens": self.tokens}
+            for name, bucket in buckets.items():
+                bucket.tokens, bucket.updated = levels.get(name, (bucket.capacity, now))
+            result = action(now)
+            levels = {name: [bucket.tokens, bucket.updated] for name, bucket in buckets.items()}
+            return json.dumps(levels).encode(), result
+        return self.backend.update(SHARED_BUCKETS_KEY, apply)
+
+    def _grant(self, estimated_tokens: int) -> float:
+        """Charges the request if both budgets allow it now; otherwise returns the seconds to wait."""
+        def grant(now):
+            delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+            if delay == 0:
+                self.requests.consume(1)
+                self.tokens.consume(estimated_tokens)
+            return delay
+        return self._with_buckets(grant)
+
+    def _is_next(self, session_id: str, ticket: object) -> bool:
+        first_session = next(iter(self.queues))
+        return first_session == session_id and self.queues[session_id][0] is ticket
+
+    def acquire(self, estimated_tokens: int, session_id: str = None, max_wait: float = MAX_WAIT_SECONDS,
+                cancelled: threading.Event = None) -> float:
+        """Blocks until the request may be sent; returns the seconds spent waiting.
+
+        Setting `cancelled` (the caller stopped waiting) leaves the queue without being charged.
+        """
+        session_id = session_id or current_session.get()
+        ticket = object()
+        started = time.monotonic()
+        with self.condition:
+            self.queues.setdefault(session_id, deque()).append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if cancelled is not None and cancelled.is_set():
+                        raise RateLimitTimeout("Gave up waiting for API quota: the request was cancelled.")
+                    if self._is_next(session_id, ticket):
+                        delay = self._grant(estimated_tokens)
+                        if delay == 0:
+                            break
+                    else:
+                        delay = None
+                    if now - started >= max_wait:
+                        raise RateLimitTimeout(f"No API quota available after waiting {max_wait:.0f}s.")
+                    remaining = max_wait - (now - started)
+                    if cancelled is not None:
+                        remaining = min(remaining, CANCEL_POLL_SECONDS)
+                    self.condition.wait(remaining if delay is None else min(delay, remaining))
+            finally:
+                queue = self.queues[session_id]
+                queue.remove(ticket)
+                # Served (or abandoned) sessions move to the back of the round-robin order
+                del self.queues[session_id]
+                if queue:
+                    self.queues[session_id] = queue
+                self.condition.notify_all()
+
+            waited = time.monotonic() - started
+            self.granted += 1
+            self.total_wait += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+        QUOTA_WAIT.observe(waited)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charges (or refunds) the difference between the estimate and the real token count."""
+        with self.condition:
+            self._with_buckets(lambda now: self.tokens.consume(actual_tokens - estimated_tokens))
+            self.condition.notify_all()
+
+    def refund(self, estimated_tokens: int) -> None:
+        """Returns the quota of a granted request that was never sent."""
+        def give_back(now):
+            self.requests.consume(-1)
+            self.tokens.consume(-estimated_tokens)
+        with self.condition:
+            self._with_buckets(give_back)
+            self.condition.notify_all()
+
+    def penalize(self, seconds: float) -> None:
+        """Empties the request bucket after a 429 so nobody retries for `seconds`."""
+        QUOTA_THROTTLED.inc()
+        def empty(now):
+            self.requests.tokens = min(self.requests.tokens, -seconds * self.requests.rate)
+        with self.condition:
+            self._with_buckets(empty)
+            self.condition.notify_all()
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                "queue_depth": sum(len(queue) for queue in self.queues.values()),
+                "waiting_sessions": len(self.queues),
+                "granted": self.granted,
+                "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0.0,
+                "max_wait_seconds": self.max_wait_seen,
+            }
+
+# --- 5. Process-Wide Instance ---
+limiter = RateLimiter(backend=shared_backend())
+metrics.gauge("ratelimit_queue_depth", "Model calls waiting in this replica's limiter queue.",
+              lambda: limiter.stats()["queue_depth"])
+metrics.gauge("ratelimit_waiting_sessions", "Sessions with at least one model call waiting for quota.",
+              lambda: limiter.stats()["waiting_sessions"])
@@ -0,0 +1,218 @@
+# run_profile.py (Opt-in sampling profiler for one full Streamlit script run)
+#
+# Usage: JOB_AGENT_PROFILE=1 streamlit run webapp1.py        every full rerun is profiled
+#        JOB_AGENT_PROFILE=query streamlit run webapp1.py    only runs of a page opened with ?profile=1
+#        python run_profile.py <stacks.folded> [top_n]       re-renders a saved profile
+#
+# A background thread samples the script thread's call stack every few milliseconds, so the
+# whole run is seen (CSS block, prompt setup, DataFrame building, model waits) without slowing
+# each call down like a deterministic profiler would. Each profiled run is saved to its own
+# directory: flamegraph.svg, the folded stacks (for speedscope or flamegraph.pl) and top.txt.
+# With profiling off, the app pays one dictionary lookup per rerun.
+
+# --- 1. Import necessary libraries ---
+import os
+import sys
+import html
+import time
+import zlib
+import datetime
+import threading
+from collections import Counter
+from doc_ingest import CACHE_DIR
+
+# --- 2. Configuration ---
+MODE = os.environ.get("JOB_AGENT_PROFILE", "").strip().lower()  # "", "1" (every run) or "query" (?profile=1)
+PROFILE_DIR = os.environ.get("JOB_AGENT_PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+INTERVAL_SECONDS = float(os.environ.get("JOB_AGENT_PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_SECONDS = 300  # A run interrupted without finish() stops sampling on its own after this
+TOP_N = 30
+
+FLAME_WIDTH = 1200
+FLAME_ROW_HEIGHT = 16
+FLAME_MIN_WIDTH = 0.5  # Frames narrower than this many pixels are left out of the SVG
+
+# The profiler running in each script thread; a run cut short by a rerun is replaced by the next one
+_active = {}
+_active_lock = threading.Lock()
+
+
+def requested(query_flag) -> bool:
+    """Whether this run should be profiled, given the page's ?profile= value."""
+    return MODE in ("1", "true", "all") or (MODE == "query" and query_flag == "1")
+
+# --- 3. The Sampler ---
+class RunProfiler:
+    """Samples one thread's stack from a daemon thread, counting folded stacks."""
+
+    def __init__(self, root_file: str, thread_id: int = None, interval: float = INTERVAL_SECONDS):
+        self.root_file = os.path.abspath(root_file)
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = self.elapsed = None
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._run, name="run-profiler", daemon=True)
+
+    def start(self) -> "RunProfiler":
+        self.started = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.sampler.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _stack(self, frame) -> str:
+        # Outermost first, cut above the script itself so Streamlit's runner frames don't repeat in every stack
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            if code.co_filename == self.root_file and code.co_name == "<module>":
+                break
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self) -> None:
+        deadline = self.started + MAX_SECONDS
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or time.perf_counter() > deadline:
+                break
+            self.stacks[self._stack(frame)] += 1
+            self.samples += 1
+            del frame
+
+
+def begin(root_file: str, query_flag=None):
+    """Starts profiling the calling script run if requested(); returns the profiler or None."""
+    if not MODE or not requested(query_flag):
+        return None
+    profiler = RunProfiler(root_file)
+    with _active_lock:
+        previous = _active.pop(profiler.thread_id, None)
+        _active[profiler.thread_id] = profiler
+    if previous is not None:
+        previous.stop()
+    return profiler.start()
+
+
+def finish(profiler: RunProfiler, label: str = "") -> str:
+    """Stops the profiler and saves its run; returns the directory the files were written to."""
+    profiler.stop()
+    with _active_lock:
+        if _active.get(profiler.thread_id) is profiler:
+            del _active[profiler.thread_id]
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    directory = os.path.join(PROFILE_DIR, "-".join(part for part in (stamp, label[:8]) if part))
+    save(profiler.stacks, directory, profiler.interval, profiler.elapsed)
+    return directory
+
+# --- 4. Reports ---
+def top_functions(stacks: Counter, interval: float, n: int = TOP_N) -> list:
+    """[{function, self_ms, total_ms, total_pct}] for the n functions with the most self time.
+
+    Self time counts samples where the function was running; total time counts samples where it
+    was anywhere on the stack (once per sample, so recursion is not double counted).
+    """
+    self_samples, total_samples = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_samples[frames[-1]] += count
+        for name in set(frames):
+            total_samples[name] += count
+    samples = sum(stacks.values()) or 1
+    return [
+        {"function": name, "self_ms": round(count * interval * 1000, 1),
+         "total_ms": round(total_samples[name] * interval * 1000, 1),
+         "total_pct": round(100 * total_samples[name] / samples, 1)}
+        for name, count in self_samples.most_common(n)
+    ]
+
+
+def format_top(rows: list, elapsed: float = None) -> str:
+    header = f"{'self ms':>10}{'total ms':>10}{'total %':>9}  function"
+    lines = [f"Wall time {elapsed * 1000:.0f} ms" if elapsed is not None else "", header]
+    lines += [f"{row['self_ms']:>10.1f}{row['total_ms']:>10.1f}{row['total_pct']:>9.1f}  {row['function']}" for row in rows]
+    return "\n".join(lines).lstrip("\n") + "\n"
+
+
+def flame_graph_svg(stacks: Counter, title: str = "Script run") -> str:
+    """A self-contained flame graph (root at the bottom, width = share of samples); hover shows details."""
+    root = {"count": 0, "children": {}}
+    depth = 0
+    for stack, count in stacks.items():
+        root["count"] += count
+        node, frames = root, stack.split(";")
+        depth = max(depth, len(frames))
+        for name in frames:
+            node = node["children"].setdefault(name, {"count": 0, "children": {}})
+            node["count"] += count
+    total = root["count"] or 1
+    height = (depth + 2) * FLAME_ROW_HEIGHT
+    scale = FLAME_WIDTH / total
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="12">{html.escape(title)} ({total} samples)</text>',
+    ]
+
+    def draw(children: dict, x: float, level: int) -> None:
+        y = height - (level + 1) * FLAME_ROW_HEIGHT
+        for name, node in sorted(children.items()):
+            width = node["count"] * scale
+            if width >= FLAME_MIN_WIDTH:
+                # Stable warm colours per function, so the same frame looks the same across profiles
+                shade = zlib.crc32(name.encode()) % 100
+                label = html.escape(name)
+                parts.append(
+                    f'<g><title>{label}: {node["count"]} samples ({100 * node["count"] / total:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAME_ROW_HEIGHT - 1}" '
+                    f'fill="rgb(230,{100 + shade},{40 + shade // 2})"/>'
+                )
+                characters = int(width / 7)
+                if characters >= 3:
+                    text = name if len(name) <= characters else name[:characters - 2] + ".."
+                    parts.append(f'<text x="{x + 2:.1f}" y="{y + FLAME_ROW_HEIGHT - 4}">{html.escape(text)}</text>')
+                parts.append("</g>")
+                draw(node["children"], x, level + 1)
+            x += width
+
+    draw(root["children"], 0.0, 0)
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def save(stacks: Counter, directory: str, interval: float, elapsed: float = None) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "stacks.folded"), "w", encoding="utf-8") as folded:
+        folded.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    with open(os.path.join(directory, "flamegraph.svg"), "w", encoding="utf-8") as svg:
+        svg.write(flame_graph_svg(stacks, os.path.basename(directory)))
+    with open(os.path.join(directory, "top.txt"), "w", encoding="utf-8") as top:
+        top.write(format_top(top_functions(stacks, interval), elapsed))
+
+
+def load_folded(path: str) -> Counter:
+    stacks = Counter()
+    with open(path, encoding="utf-8") as folded:
+        for line in folded:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+# --- 5. Standalone Execution Block ---
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python run_profile.py <stacks.folded> [top_n]")
+        sys.exit(1)
+    folded_path = sys.argv[1]
+    stacks = load_folded(folded_path)
+    print(format_top(top_functions(stacks, INTERVAL_SECONDS, int(sys.argv[2]) if len(sys.argv) > 2 else TOP_N)), end="")
+    svg_path = os.path.join(os.path.dirname(os.path.abspath(folded_path)), "flamegraph.svg")
+    with open(svg_path, "w", encoding="utf-8") as svg:
+        svg.write(flame_graph_svg(stacks, os.path.basename(os.path.dirname(os.path.abspath(folded_path)))))
+    print(f"Flame graph written to {svg_path}")
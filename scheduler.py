@@ -0,0 +1,221 @@
+# scheduler.py (Follow-up and interview reminders with a due-date index)
+
+# --- 1. Import necessary libraries ---
+import datetime
+import tracker
+import dates
+from fields import DATE_FIELDS
+
+# --- 2. Schema ---
+# The (done, due_date) index turns every "due" question into a B-tree range scan:
+# O(log n) to find the window, then only the matching rows are read.
+tracker.register_schema("""
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (record_id, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders (done, due_date);
+CREATE TABLE IF NOT EXISTS reminder_sources (
+    record_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    source_date TEXT NOT NULL,
+    PRIMARY KEY (record_id, kind)
+);
+""")
+# reminder_sources keeps the date each reminder was last scheduled from, so a snoozed or
+# completed reminder is only reset when its tracker date really changes, not on every edit
+
+# Tracker columns that produce a reminder, and the label shown for them
+REMINDER_FIELDS = {
+    "next_follow_up_date": "Follow-up",
+    "interview_scheduled_date": "Interview",
+}
+
+# --- 3. Date Normalization ---
+def normalize_date(value: str, reference: datetime.date = None):
+    """Turns an extracted date expression ("1st Dec", "next Tuesday 3pm") into a datetime.date, or None."""
+    return dates.resolve_date(value, reference)
+
+
+def _normalize_batch(batch: list, path: str = None) -> int:
+    contacted = dates.normalize_column(
+        [record["date_contacted"] for record in batch], [record["created_at"] for record in batch]
+    )
+    # The other dates count from the contact date when it resolved, else from when the record was saved
+    references = [value if dates.CANONICAL.fullmatch(str(value)) else record["created_at"]
+                  for value, record in zip(contacted, batch)]
+    columns = {"date_contacted": contacted}
+    for key in sorted(DATE_FIELDS - {"date_contacted"}):
+        columns[key] = dates.normalize_column([record[key] for record in batch], references)
+
+    updates = {}
+    for position, record in enumerate(batch):
+        changed = {key: column[position] for key, column in columns.items() if column[position] != record[key]}
+        if changed:
+            updates[record["id"]] = changed
+    if updates:
+        tracker.update_records(updates, path)
+        by_id = {record["id"]: record for record in batch}
+        schedule_records({record_id: dict(by_id[record_id], **changed) for record_id, changed in updates.items()}, path)
+    return len(updates)
+
+
+def normalize_tracker_dates(path: str = None, batch_size: int = 1000) -> int:
+    """Rewrites every tracker date in the stored form and re-indexes the reminders of changed records.
+
+    Relative dates count from when each record was created. Columns are resolved a batch at a
+    time with dates.normalize_column, so values already stored correctly cost one regex match.
+    Returns the number of records changed.
+    """
+    changed, batch = 0, []
+    for record in tracker.iter_records(path, batch_size):
+        batch.append(record)
+        if len(batch) == batch_size:
+            changed += _normalize_batch(batch, path)
+            batch = []
+    if batch:
+        changed += _normalize_batch(batch, path)
+    return changed
+
+# --- 4. Scheduling ---
+def _schedule(connection, record_id: int, details: dict) -> int:
+    reference = normalize_date(details.get("date_contacted")) or datetime.date.today()
+    scheduled = 0
+    for field, kind in REMINDER_FIELDS.items():
+        due_date = normalize_date(details.get(field), reference)
+        if due_date is None:
+            connection.execute("DELETE FROM reminders WHERE record_id = ? AND kind = ?", (record_id, kind))
+            connection.execute("DELETE FROM reminder_sources WHERE record_id = ? AND kind = ?", (record_id, kind))
+            continue
+        scheduled += 1
+        current = connection.execute(
+            "SELECT r.due_date, s.source_date FROM reminders r LEFT JOIN reminder_sources s "
+            "ON s.record_id = r.record_id AND s.kind = r.kind WHERE r.record_id = ? AND r.kind = ?",
+            (record_id, kind)
+        ).fetchone()
+        # Reminders from before reminder_sources existed were scheduled from their due date
+        if current is not None and (current["source_date"] or current["due_date"]) == due_date.isoformat():
+            continue
+        connection.execute(
+            "INSERT INTO reminders (record_id, kind, due_date, done) VALUES (?, ?, ?, 0) "
+            "ON CONFLICT (record_id, kind) DO UPDATE SET due_date = excluded.due_date, done = 0",
+            (record_id, kind, due_date.isoformat())
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO reminder_sources (record_id, kind, source_date) VALUES (?, ?, ?)",
+            (record_id, kind, due_date.isoformat())
+        )
+    return scheduled
+
+
+def schedule_from_record(record_id: int, details: dict, path: str = None) -> int:
+    """Indexes the follow-up / interview dates of a record; returns how many were scheduled.
+
+    A reminder is reopened and moved only when its date in the record changed, so edits to
+    other fields keep it completed or snoozed.
+    """
+    with tracker.open_db(path) as connection:
+        return _schedule(connection, record_id, details)
+
+
+def schedule_records(records: dict, path: str = None) -> int:
+    """schedule_from_record for {record_id: details} in a single transaction."""
+    with tracker.open_db(path) as connection:
+        return sum(_schedule(connection, record_id, details) for record_id, details in records.items())
+
+
+def snooze(reminder_id: int, days: int = 1, path: str = None) -> None:
+    """Pushes a reminder back by the given number of days from today (or from its due date if later)."""
+    with tracker.open_db(path) as connection:
+        row = connection.execute("SELECT due_date FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+        if row is None:
+            return
+        base = max(datetime.date.fromisoformat(row["due_date"]), datetime.date.today())
+        connection.execute(
+            "UPDATE reminders SET due_date = ? WHERE id = ?",
+            ((base + datetime.timedelta(days=days)).isoformat(), reminder_id)
+        )
+
+
+def complete(reminder_id: int, path: str = None) -> None:
+    with tracker.open_db(path) as connection:
+        connection.execute("UPDATE reminders SET done = 1 WHERE id = ?", (reminder_id,))
+
+# --- 5. Due-Date Queries ---
+def _due_between(start: str, end: str, path: str = None, limit: int = 50) -> list:
+    with tracker.open_db(path) as connection:
+        rows = connection.execute(
+            "SELECT r.id, r.record_id, r.kind, r.due_date, "
+            "rec.role_position, rec.client_company, rec.hr_name, rec.status "
+            "FROM reminders r JOIN records rec ON rec.id = r.record_id "
+            "WHERE r.done = 0 AND r.due_date >= ? AND r.due_date < ? "
+            "ORDER BY r.due_date LIMIT ?",
+            (start, end, limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def overdue(today: datetime.date = None, path: str = None, limit: int = 50) -> list:
+    today = today or datetime.date.today()
+    return _due_between("0000-00-00", today.isoformat(), path, limit)
+
+
+def due_today(today: datetime.date = None, path: str = None, limit: int = 50) -> list:
+    today = today or datetime.date.today()
+    return _due_between(today.isoformat(), (today + datetime.timedelta(days=1)).isoformat(), path, limit)
+
+
+def due_next_days(days: int = 7, today: datetime.date = None, path: str = None, limit: int = 50) -> list:
+    """Reminders due after today and within the next `days` days."""
+    today = today or datetime.date.today()
+    start = today + datetime.timedelta(days=1)
+    return _due_between(start.isoformat(), (start + datetime.timedelta(days=days)).isoformat(), path, limit)
+
+# --- 6. Standalone Execution Block ---
+def check_rescheduling() -> None:
+    """Asserts that edits which leave a reminder's date alone keep it completed or snoozed."""
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "check.db")
+        details = {"date_contacted": "2025-11-03", "next_follow_up_date": "2025-11-07",
+                   "interview_scheduled_date": "2025-11-10", "status": "Contacted"}
+        record_id = tracker.add_record(details, path)
+        schedule_from_record(record_id, details, path)
+        with tracker.open_db(path) as connection:
+            ids = {row["kind"]: row["id"] for row in connection.execute("SELECT id, kind FROM reminders")}
+
+        def reminder(kind: str) -> dict:
+            with tracker.open_db(path) as connection:
+                return dict(connection.execute("SELECT due_date, done FROM reminders WHERE id = ?", (ids[kind],)).fetchone())
+
+        # complete -> unrelated edit -> still complete
+        complete(ids["Follow-up"], path)
+        # snooze -> unrelated edit -> still snoozed
+        snooze(ids["Interview"], 3, path)
+        snoozed = reminder("Interview")["due_date"]
+        details["status"] = "Interview Scheduled"
+        schedule_from_record(record_id, details, path)
+        assert reminder("Follow-up")["done"] == 1, "a completed reminder was reopened by an unrelated edit"
+        assert reminder("Interview")["due_date"] == snoozed, "a snoozed reminder lost its snooze on an unrelated edit"
+
+        # A changed source date reopens and moves the reminder
+        details["next_follow_up_date"] = "2025-11-12"
+        schedule_from_record(record_id, details, path)
+        assert reminder("Follow-up") == {"due_date": "2025-11-12", "done": 0}, "a changed follow-up date was not rescheduled"
+    print("Rescheduling checks passed.")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["--check"]:
+        check_rescheduling()
+    else:
+        print("Usage: python scheduler.py --check")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+# shared_state.py (Cache and coordination state shared by every replica of the app)
+#
+# The backend is chosen with JOB_AGENT_STATE_URL:
+#   memory://                  (default) this process only: a single replica, as before
+#   sqlite:///path/state.db    a file shared by every process on the host or on a shared volume (tests, small setups)
+#   redis://host:6379/0        Redis or any Redis-compatible server (needs the 'redis' package)
+#
+# All three offer the same few atomic operations, and every key is built by state_key(), so
+# replicas agree on names whichever backend they use. Values are bytes; callers encode JSON.
+
+# --- 1. Import necessary libraries ---
+import os
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# --- 2. Configuration ---
+STATE_URL = os.environ.get("JOB_AGENT_STATE_URL", "memory://")
+KEY_PREFIX = os.environ.get("JOB_AGENT_STATE_PREFIX", "job_agent")
+MEMORY_MAX_KEYS = int(os.environ.get("JOB_AGENT_STATE_MEMORY_KEYS", "1024"))
+SQLITE_BUSY_TIMEOUT = 30
+SQLITE_PURGE_CHANCE = 0.01  # Share of writes that also sweep expired keys out of the file
+# Identifies this process in claims, so a stuck claim can be traced to its replica
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def state_key(*parts) -> str:
+    """'job_agent:response:<hash>' style keys, identical on every replica."""
+    return ":".join([KEY_PREFIX, *(str(part) for part in parts)])
+
+# --- 3. Backends ---
+class MemoryBackend:
+    """In-process store; the least recently used keys are dropped beyond max_keys."""
+
+    shared = False
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self.data = OrderedDict()  # key -> (value, expiry time or None)
+        self.lock = threading.Lock()
+
+    def _get(self, key: str):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return entry[0]
+
+    def _set(self, key: str, value: bytes, ttl: float = None) -> None:
+        self.data[key] = (value, time.time() + ttl if ttl else None)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_keys:
+            self.data.popitem(last=False)
+
+    def get(self, key: str):
+        with self.lock:
+            return self._get(key)
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        with self.lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        """Sets key only if it does not exist; True if this call set it."""
+        with self.lock:
+            if self._get(key) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self.lock:
+            value = int(self._get(key) or 0) + amount
+            self._set(key, str(value).encode())
+            return value
+
+    def update(self, key: str, apply, ttl: float = None):
+        """Atomically replaces the value with apply(old) -> (new value, result) and returns result."""
+        with self.lock:
+            value, result = apply(self._get(key))
+            self._set(key, value, ttl)
+            return result
+
+
+class SQLiteBackend:
+    """One key/value table in a SQLite file; BEGIN IMMEDIATE makes each operation atomic across processes."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._transaction() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    @contextmanager
+    def _transaction(self):
+        connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _get(connection, key: str):
+        row = connection.execute("SELECT value, expires FROM state WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return bytes(row[0])
+
+    @staticmethod
+    def _set(connection, key: str, value: bytes, ttl: float = None) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO state (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+        if random.random() < SQLITE_PURGE_CHANCE:
+            connection.execute("DELETE FROM state WHERE expires <= ?", (time.time(),))
+
+    def get(self, key: str):
+        connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT)
+        try:
+            return self._get(connection, key)
+        finally:
+            connection.close()
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        with self._transaction() as connection:
+            self._set(connection, key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        with self._transaction() as connection:
+            if self._get(connection, key) is not None:
+                return False
+            self._set(connection, key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._transaction() as connection:
+            value = int(self._get(connection, key) or 0) + amount
+            self._set(connection, key, str(value).encode())
+            return value
+
+    def update(self, key: str, apply, ttl: float = None):
+        with self._transaction() as connection:
+            value, result = apply(self._get(connection, key))
+            self._set(connection, key, value, ttl)
+            return result
+
+
+class RedisBackend:
+    """Redis (or a compatible server); update() is an optimistic WATCH/MULTI transaction."""
+
+    shared = True
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("A redis:// state URL requires the 'redis' package.")
+        self.client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _ttl_ms(ttl: float = None):
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        self.client.set(key, value, px=self._ttl_ms(ttl))
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        return bool(self.client.set(key, value, px=self._ttl_ms(ttl), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self.client.incrby(key, amount)
+
+    def update(self, key: str, apply, ttl: float = None):
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    value, result = apply(pipe.get(key))
+                    pipe.multi()
+                    pipe.set(key, value, px=self._ttl_ms(ttl))
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    # Another replica changed the key in between; apply again to the new value
+                    continue
+
+# --- 4. Process-Wide Backend ---
+def open_backend(url: str):
+    """Creates the backend for a state URL (see the top of this file)."""
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "sqlite":
+        return SQLiteBackend(parsed.netloc + parsed.path if parsed.netloc else parsed.path)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported JOB_AGENT_STATE_URL scheme: {url!r}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The backend every module of this process uses, opened on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = open_backend(STATE_URL)
+        return _backend
+
+
+def shared_backend():
+    """The backend when it is shared with other replicas, else None (single-process state stays local)."""
+    backend = get_backend()
+    return backend if backend.shared else None
@@ -0,0 +1,251 @@
+# similarity.py (Offline similarity search over previously seen job descriptions)
+
+# --- 1. Import necessary libraries ---
+import os
+import re
+import zlib
+import hashlib
+import threading
+import numpy as np
+import tracker
+from doc_ingest import CACHE_DIR
+
+# --- 2. Configuration ---
+VECTOR_DIM = 256        # Hashing-vectorizer width; 100k JDs fit in ~100 MB of float32
+LSH_TABLES = 12         # Independent hash tables; more tables = higher recall
+LSH_BITS = 8            # Hyperplanes per table; 256 buckets per table
+MIN_CANDIDATES = 50     # Below this many LSH candidates, also probe neighbouring buckets
+EXACT_SCAN_LIMIT = 5000  # Small indexes are scanned exactly; LSH only pays off beyond this
+SAVE_EVERY = 25         # Persist the matrix after this many incremental additions
+
+tracker.register_schema("""
+CREATE TABLE IF NOT EXISTS jd_texts (
+    record_id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+""")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def index_path(db_path: str = None) -> str:
+    """The saved matrix of one tracker database (each database gets its own file)."""
+    digest = hashlib.sha1(os.path.abspath(db_path or tracker.TRACKER_DB).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"jd_index-{digest}.npz")
+
+# --- 3. Hashing Vectorizer ---
+def vectorize(text: str) -> np.ndarray:
+    """Maps text to a unit-length vector using hashed unigrams and bigrams.
+
+    crc32 is used instead of hash() so vectors are identical across processes
+    and restarts, which lets the saved matrix be reused.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % VECTOR_DIM, signs)
+    # Sublinear term frequency, so a keyword repeated ten times does not dominate
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# --- 4. The Index ---
+class JDIndex:
+    """Incremental nearest-neighbour index over stored JD texts.
+
+    Vectors live in a growable float32 matrix. Random-hyperplane LSH narrows each
+    query to a few percent of the stored JDs, which are then ranked exactly by cosine.
+    """
+
+    def __init__(self, path: str = None, db_path: str = None):
+        self.path = path or index_path(db_path)
+        self.db_path = db_path or tracker.TRACKER_DB
+        self.lock = threading.Lock()
+        self.hyperplanes = np.random.default_rng(42).standard_normal((LSH_TABLES, VECTOR_DIM, LSH_BITS)).astype(np.float32)
+        self.bit_weights = (1 << np.arange(LSH_BITS)).astype(np.int64)
+        self.unsaved = 0
+        self.awaiting = set()  # Changed records of other replicas whose JD text wasn't stored yet
+        self._reset()
+        # Read before the JD texts, so texts other replicas store during the load are caught up on later
+        self.version = tracker.feed_version(self.db_path)
+        self._load()
+
+    def _reset(self) -> None:
+        self.vectors = np.zeros((1024, VECTOR_DIM), dtype=np.float32)
+        self.record_ids = np.zeros(1024, dtype=np.int64)
+        self.rows = {}  # record id -> row
+        self.size = 0
+        self.buckets = [dict() for _ in range(LSH_TABLES)]
+
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns an (n, LSH_TABLES) array of bucket codes."""
+        projections = np.einsum("nd,tdb->ntb", vectors, self.hyperplanes)
+        return ((projections > 0).astype(np.int64) * self.bit_weights).sum(axis=2)
+
+    def _append(self, record_ids: np.ndarray, vectors: np.ndarray) -> None:
+        needed = self.size + len(record_ids)
+        if needed > len(self.record_ids):
+            capacity = max(needed, 2 * len(self.record_ids))
+            self.vectors = np.resize(self.vectors, (capacity, VECTOR_DIM))
+            self.record_ids = np.resize(self.record_ids, capacity)
+        self.vectors[self.size:needed] = vectors
+        self.record_ids[self.size:needed] = record_ids
+        for offset, codes in enumerate(self._codes(vectors)):
+            self.rows[int(record_ids[offset])] = self.size + offset
+            for table, code in enumerate(codes):
+                self.buckets[table].setdefault(int(code), []).append(self.size + offset)
+        self.size = needed
+
+    def _replace(self, row: int, vector: np.ndarray) -> None:
+        """Re-vectorizes a record whose JD text was stored again, keeping its row."""
+        for table, code in enumerate(self._codes(self.vectors[row][None, :])[0]):
+            self.buckets[table][int(code)].remove(row)
+        self.vectors[row] = vector
+        for table, code in enumerate(self._codes(vector[None, :])[0]):
+            self.buckets[table].setdefault(int(code), []).append(row)
+
+    def _index_rows(self, rows) -> None:
+        new_rows = [row for row in rows if row["record_id"] not in self.rows]
+        for row in rows:
+            if row["record_id"] in self.rows:
+                self._replace(self.rows[row["record_id"]], vectorize(row["text"]))
+        if new_rows:
+            self._append(
+                np.array([row["record_id"] for row in new_rows], dtype=np.int64),
+                np.stack([vectorize(row["text"]) for row in new_rows])
+            )
+
+    def _load(self) -> None:
+        """Loads the saved matrix if it still matches the tracker, then indexes any JD missing from it."""
+        try:
+            saved = np.load(self.path)
+            if saved["vectors"].shape[1] == VECTOR_DIM:
+                self._append(saved["record_ids"], saved["vectors"])
+        except (OSError, KeyError, ValueError):
+            pass
+        with tracker.open_db(self.db_path) as connection:
+            stored_ids = {row[0] for row in connection.execute("SELECT record_id FROM jd_texts")}
+            # A matrix with duplicates or with ids the tracker doesn't have (another database, a reset
+            # tracker) would return unrelated records, so it is thrown away and rebuilt
+            if len(self.rows) != self.size or not stored_ids.issuperset(self.rows):
+                self._reset()
+            missing = sorted(stored_ids.difference(self.rows))
+            rows = []
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows += connection.execute(
+                    f"SELECT record_id, text FROM jd_texts WHERE record_id IN ({', '.join('?' for _ in chunk)}) "
+                    "ORDER BY record_id", chunk
+                ).fetchall()
+        if rows:
+            self._index_rows(rows)
+        if rows or not os.path.exists(self.path):
+            self.save()
+
+    def catch_up(self) -> bool:
+        """Indexes JD texts other replicas stored since the last check; False if a rebuild is needed."""
+        version, record_ids = tracker.changes_since(self.version, self.db_path)
+        if version == self.version:
+            return True
+        if record_ids is None or len(record_ids) > tracker.CHANGE_FEED_MAX_IDS:
+            return False
+        # A replica stores the JD text just after the record, so records that had no text at the
+        # last check are looked up again (records without any JD text drop out after the feed limit)
+        wanted = sorted(set(record_ids) | self.awaiting)[-tracker.CHANGE_FEED_MAX_IDS:]
+        with tracker.open_db(self.db_path) as connection:
+            rows = connection.execute(
+                f"SELECT record_id, text FROM jd_texts WHERE record_id IN ({', '.join('?' for _ in wanted)})", wanted
+            ).fetchall() if wanted else []
+        with self.lock:
+            self._index_rows(rows)
+            self.awaiting = set(wanted).difference(row["record_id"] for row in rows)
+            self.version = version
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Replicas sharing the tracker share this file too; each writes whole files, never a partial one
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, vectors=self.vectors[:self.size], record_ids=self.record_ids[:self.size])
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def add(self, record_id: int, text: str) -> None:
+        """Stores the JD text in the tracker and adds it to the index."""
+        with tracker.open_db(self.db_path) as connection:
+            connection.execute("INSERT OR REPLACE INTO jd_texts (record_id, text) VALUES (?, ?)", (record_id, text))
+        vector = vectorize(text)
+        with self.lock:
+            if record_id in self.rows:
+                self._replace(self.rows[record_id], vector)
+            else:
+                self._append(np.array([record_id], dtype=np.int64), vector[None, :])
+            self.unsaved += 1
+            if self.unsaved >= SAVE_EVERY:
+                self.save()
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        """Row numbers sharing a bucket with the query in any table (multi-probe when sparse)."""
+        codes = [int(code) for code in self._codes(vector[None, :])[0]]
+        found = []
+        for table, code in enumerate(codes):
+            found.extend(self.buckets[table].get(code, ()))
+        if len(found) < MIN_CANDIDATES:
+            # Probe buckets one hyperplane away, which recovers near misses at a small cost
+            for table, code in enumerate(codes):
+                for bit in range(LSH_BITS):
+                    found.extend(self.buckets[table].get(code ^ (1 << bit), ()))
+        return np.unique(np.array(found, dtype=np.int64))
+
+    def query(self, text: str, k: int = 5, exclude_record_id: int = None) -> list:
+        """Returns up to k (record_id, cosine similarity) pairs, most similar first."""
+        vector = vectorize(text)
+        with self.lock:
+            if not self.size or not vector.any():
+                return []
+            if self.size <= EXACT_SCAN_LIMIT:
+                rows = np.arange(self.size)
+            else:
+                rows = self._candidates(vector)
+            scores = self.vectors[rows] @ vector
+            record_ids = self.record_ids[rows]
+
+        if exclude_record_id is not None:
+            scores = np.where(record_ids == exclude_record_id, -np.inf, scores)
+        top = min(k, len(rows))
+        if not top:
+            return []
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(int(record_ids[i]), float(scores[i])) for i in best if np.isfinite(scores[i])]
+
+# --- 5. Process-Wide Instance ---
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> JDIndex:
+    """Returns the index shared by every session in this process, loading it on first use.
+
+    JD texts stored by other replicas are picked up from the tracker's change feed here,
+    as in skill_index; the saved matrix is rebuilt when the feed no longer reaches back.
+    """
+    global _index
+    with _index_lock:
+        if _index is None or _index.db_path != tracker.TRACKER_DB or not _index.catch_up():
+            _index = JDIndex()
+        return _index
+
+
+def find_similar_jobs(text: str, k: int = 5, exclude_record_id: int = None) -> list:
+    """Returns the k most similar tracked jobs with their outcome fields and a similarity score."""
+    matches = get_index().query(text, k, exclude_record_id)
+    records = tracker.get_records(record_id for record_id, _ in matches)
+    return [
+        dict(records[record_id], similarity=round(score, 3))
+        for record_id, score in matches if record_id in records
+    ]
@@ -0,0 +1,314 @@
+# skill_index.py (Inverted index from normalized skill to the tracked roles that ask for it)
+#
+# Usage: python skill_index.py top [k] [since YYYY-MM-DD]
+#        python skill_index.py query "kubernetes AND (terraform OR pulumi) AND NOT java" [since]
+#
+# extracted_keywords is stored as one comma-separated string per record. Here every record is
+# split once into normalized skills (aliases resolved, as in candidate ranking), and each skill
+# keeps a posting list of record ids. Boolean skill queries are set operations over sorted
+# arrays, and top-k demand counts are one bincount, so neither touches the tracker.
+
+# --- 1. Import necessary libraries ---
+import re
+import sys
+import datetime
+import threading
+from functools import lru_cache
+import numpy as np
+import tracker
+import dates
+from candidate_ranking import parse_keywords, normalize_skill
+
+# --- 2. Record Parsing ---
+# Operators of the query language; anything between them is a skill name ("machine learning", "c++")
+QUERY_TOKEN = re.compile(r"\s*(\(|\)|,|&|\||\bAND\b|\bOR\b|\bNOT\b)\s*", re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def record_skills(extracted_keywords: str) -> tuple:
+    """Normalized skills of one extracted_keywords value (keyword strings repeat a lot across records)."""
+    return tuple(parse_keywords(extracted_keywords))
+
+
+@lru_cache(maxsize=4096)
+def contact_day(date_contacted: str, created_at: str) -> int:
+    """Day ordinal a record counts under in time windows: its contact date, else when it was saved."""
+    day = dates.resolve_date(date_contacted, created_at[:10] or None)
+    if day is None and created_at:
+        day = datetime.date.fromisoformat(created_at[:10])
+    return day.toordinal() if day else 0
+
+
+def _as_ordinal(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    day = dates.resolve_date(value)
+    if day is None:
+        raise ValueError(f"Not a date: {value!r}")
+    return day.toordinal()
+
+# --- 3. The Index ---
+class SkillIndex:
+    """Skill -> posting list of record ids, plus each record's contact day for time windows.
+
+    Posting lists are Python sets while records are added or re-extracted, and are frozen
+    into sorted int64 arrays the first time a query needs them; only the skills touched
+    since the last query are re-sorted. A flat (record, skill) pair list, rebuilt lazily
+    from those arrays, turns windowed top-k counts into a single np.bincount.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or tracker.TRACKER_DB
+        self.lock = threading.Lock()
+        self.skill_ids = {}
+        self.skill_names = []
+        self.postings = []
+        self.arrays = {}
+        self.skills_by_record = {}
+        self.days = np.zeros(1024, dtype=np.int32)
+        self.flat = None
+        self.universe = None
+        # Read before the records, so changes made during the load are replayed rather than missed
+        self.version = tracker.feed_version(self.db_path)
+        self._load()
+
+    def _skill_id(self, skill: str) -> int:
+        if skill not in self.skill_ids:
+            self.skill_ids[skill] = len(self.skill_names)
+            self.skill_names.append(skill)
+            self.postings.append(set())
+        return self.skill_ids[skill]
+
+    def _set(self, record_id: int, skills: tuple, day: int) -> None:
+        old = self.skills_by_record.get(record_id, ())
+        new = tuple(self._skill_id(skill) for skill in skills)
+        for skill_id in set(old) - set(new):
+            self.postings[skill_id].discard(record_id)
+            self.arrays.pop(skill_id, None)
+        for skill_id in set(new) - set(old):
+            self.postings[skill_id].add(record_id)
+            self.arrays.pop(skill_id, None)
+        if record_id >= len(self.days):
+            days = np.zeros(max(record_id + 1, 2 * len(self.days)), dtype=np.int32)
+            days[:len(self.days)] = self.days
+            self.days = days
+        if record_id not in self.skills_by_record:
+            self.universe = None
+        self.skills_by_record[record_id] = new
+        self.days[record_id] = day
+        self.flat = None
+
+    def _load(self) -> None:
+        self.days[:] = 0
+        with tracker.open_db(self.db_path) as connection:
+            cursor = connection.execute(
+                "SELECT id, created_at, date_contacted, extracted_keywords FROM records ORDER BY id"
+            )
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                for row in rows:
+                    self._set(row["id"], record_skills(row["extracted_keywords"]),
+                              contact_day(row["date_contacted"], row["created_at"]))
+
+    def update(self, record_id: int, fields: dict) -> None:
+        """Re-indexes one record after an add or update (fields may hold only the changed columns)."""
+        if "extracted_keywords" not in fields and "date_contacted" not in fields:
+            return
+        with self.lock:
+            skills = self.skills_by_record.get(record_id)
+            if "extracted_keywords" in fields or skills is None:
+                skills = record_skills(str(fields.get("extracted_keywords", "") or ""))
+            else:
+                skills = tuple(self.skill_names[skill_id] for skill_id in skills)
+            day = int(self.days[record_id]) if record_id < len(self.days) else 0
+            if "date_contacted" in fields or not day:
+                day = contact_day(str(fields.get("date_contacted", "") or ""), str(fields.get("created_at", "") or ""))
+            self._set(record_id, skills, day)
+
+    def catch_up(self) -> bool:
+        """Re-indexes records other replicas changed since the last check; False if a rebuild is needed."""
+        version, record_ids = tracker.changes_since(self.version, self.db_path)
+        if record_ids is None or len(record_ids) > tracker.CHANGE_FEED_MAX_IDS:
+            return False
+        for record_id, record in tracker.get_records(record_ids, self.db_path).items():
+            self.update(record_id, record)
+        self.version = version
+        return True
+
+    # --- Posting lists ---
+    def _array(self, skill_id: int) -> np.ndarray:
+        array = self.arrays.get(skill_id)
+        if array is None:
+            array = np.fromiter(self.postings[skill_id], dtype=np.int64, count=len(self.postings[skill_id]))
+            array.sort()
+            self.arrays[skill_id] = array
+        return array
+
+    def _posting(self, skill: str) -> np.ndarray:
+        skill_id = self.skill_ids.get(normalize_skill(skill))
+        return self._array(skill_id) if skill_id is not None else np.zeros(0, dtype=np.int64)
+
+    def _universe(self) -> np.ndarray:
+        if self.universe is None:
+            self.universe = np.array(sorted(self.skills_by_record), dtype=np.int64)
+        return self.universe
+
+    def _flat_pairs(self):
+        if self.flat is None:
+            arrays = [self._array(skill_id) for skill_id in range(len(self.skill_names))]
+            lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+            records = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+            self.flat = (records, np.repeat(np.arange(len(arrays)), lengths))
+        return self.flat
+
+    def _window(self, record_ids: np.ndarray, since, until) -> np.ndarray:
+        if since is None and until is None:
+            return record_ids
+        record_days = self.days[record_ids]
+        keep = np.ones(len(record_ids), dtype=bool)
+        if since is not None:
+            keep &= record_days >= _as_ordinal(since)
+        if until is not None:
+            keep &= record_days < _as_ordinal(until)
+        return record_ids[keep]
+
+    # --- Boolean queries ---
+    def _parse(self, query: str) -> np.ndarray:
+        tokens = [token for token in QUERY_TOKEN.split(query) if token and token.strip()]
+        position = 0
+
+        def peek():
+            return tokens[position].upper() if position < len(tokens) else None
+
+        def expression():
+            nonlocal position
+            result = term()
+            while peek() in ("OR", "|"):
+                position += 1
+                result = np.union1d(result, term())
+            return result
+
+        def term():
+            nonlocal position
+            result = factor()
+            while peek() not in (None, "OR", "|", ")"):
+                if peek() in ("AND", "&", ","):
+                    position += 1
+                result = np.intersect1d(result, factor(), assume_unique=True)
+            return result
+
+        def factor():
+            nonlocal position
+            token = peek()
+            if token is None:
+                raise ValueError("The skill query ends too early.")
+            position += 1
+            if token == "NOT":
+                return np.setdiff1d(self._universe(), factor(), assume_unique=True)
+            if token == "(":
+                result = expression()
+                if peek() != ")":
+                    raise ValueError("A '(' in the skill query is never closed.")
+                position += 1
+                return result
+            if token in ("AND", "OR", ")", ",", "&", "|"):
+                raise ValueError(f"Unexpected '{tokens[position - 1]}' in the skill query.")
+            return self._posting(tokens[position - 1])
+
+        result = expression()
+        if position != len(tokens):
+            raise ValueError(f"Unexpected '{tokens[position]}' in the skill query.")
+        return result
+
+    def query(self, query: str, since=None, until=None) -> np.ndarray:
+        """Record ids (ascending) matching e.g. "kubernetes AND (terraform OR pulumi) AND NOT java".
+
+        AND also reads as "," or "&", OR as "|"; skill names are normalized like extracted
+        keywords, so "k8s" finds Kubernetes roles. since/until bound the contact date.
+        """
+        with self.lock:
+            return self._window(self._parse(query), since, until)
+
+    # --- Demand counts ---
+    def top_skills(self, k: int = 10, since=None, until=None, query: str = None) -> list:
+        """The k most requested skills as [(skill, roles)], optionally within a date window
+        and among the roles matching a skill query ("what else do Kubernetes roles ask for")."""
+        with self.lock:
+            if since is None and until is None and query is None:
+                counts = np.array([len(posting) for posting in self.postings], dtype=np.int64)
+            else:
+                records, skill_ids = self._flat_pairs()
+                selected = np.zeros(len(self.days), dtype=bool)
+                candidates = self._parse(query) if query else self._universe()
+                selected[self._window(candidates, since, until)] = True
+                counts = np.bincount(skill_ids[selected[records]], minlength=len(self.skill_names))
+            top = min(k, int(np.count_nonzero(counts)))
+            if not top:
+                return []
+            best = np.argpartition(-counts, top - 1)[:top]
+            best = best[np.lexsort((best, -counts[best]))]
+            return [(self.skill_names[i], int(counts[i])) for i in best]
+
+# --- 4. Process-Wide Instance ---
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SkillIndex:
+    """Returns the index shared by every session in this process, building it on first use.
+
+    Writes from this process arrive through the tracker listener; writes from other replicas
+    are picked up from the tracker's change feed here, before the index is used.
+    """
+    global _index
+    with _index_lock:
+        if _index is None or not _index.catch_up():
+            _index = SkillIndex()
+        return _index
+
+
+def _on_record_change(path: str, record_id: int, fields: dict) -> None:
+    # Before first use there is nothing to maintain: the first build reads the current tracker
+    if _index is not None and _index.db_path == path:
+        _index.update(record_id, fields)
+
+
+tracker.register_listener(_on_record_change)
+
+
+def find_roles(query: str, since=None, until=None, limit: int = 50) -> list:
+    """The newest tracked roles matching a skill query, as tracker records."""
+    record_ids = get_index().query(query, since, until)[::-1][:limit]
+    records = tracker.get_records(int(record_id) for record_id in record_ids)
+    return [records[int(record_id)] for record_id in record_ids if int(record_id) in records]
+
+
+def period_start(period: str, today: datetime.date = None):
+    """Start date of "30d", "quarter" or "year" windows counted back from today (None for all time)."""
+    today = today or datetime.date.today()
+    if period == "30d":
+        return today - datetime.timedelta(days=30)
+    if period == "quarter":
+        return datetime.date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+    if period == "year":
+        return datetime.date(today.year, 1, 1)
+    return None
+
+# --- 5. Standalone Execution Block ---
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "top":
+        k = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for skill, roles in get_index().top_skills(k, since=sys.argv[3] if len(sys.argv) > 3 else None):
+            print(f"{roles:6d}  {skill}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "query":
+        roles = find_roles(sys.argv[2], since=sys.argv[3] if len(sys.argv) > 3 else None)
+        for record in roles:
+            print(f"#{record['id']}  {record['role_position']} @ {record['client_company']}  ({record['status']})")
+        print(f"{len(get_index().query(sys.argv[2]))} matching role(s)")
+    else:
+        print('Usage: python skill_index.py top [k] [since]  |  python skill_index.py query "<skill query>" [since]')
+        sys.exit(1)
@@ -0,0 +1,179 @@
+# speculation.py (Speculative extraction of the job description while the form is still being filled)
+#
+# Users usually paste the JD first and then write the call summary and their skills. Once the
+# JD box has stayed unchanged for DEBOUNCE_SECONDS, the fields that depend on the JD alone are
+# extracted in the background. On submit, reconcile() reuses that result and asks the model only
+# for what the other sections add: the call summary's changes (a small delta call) and the
+# skill-dependent fields (a two-key call). Both run concurrently, and neither is needed when
+# those sections are empty, so the submit usually waits for a short answer or for nothing.
+
+# --- 1. Import necessary libraries ---
+import os
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from extraction import (
+    combine_inputs, process_recruiter_text, extract_delta, merge_results, extraction_prompt, response_cache_key,
+    cached_response
+)
+from fields import FIELD_KEYS, select_fields, normalize_record
+
+# --- 2. Configuration ---
+# Fields that can only be filled with the applicant's skills; everything else comes from the JD
+SKILL_FIELDS = ("match_score", "skill_gap_analysis")
+JD_FIELDS = [key for key in FIELD_KEYS if key not in SKILL_FIELDS]
+DEBOUNCE_SECONDS = float(os.environ.get("JOB_AGENT_SPECULATE_DEBOUNCE", "1.5"))
+# How long a submit waits for a speculative call still in flight (it started earlier than a fresh call would)
+RECONCILE_TIMEOUT_SECONDS = 120
+# One pending speculation per session; the oldest sessions are forgotten beyond this
+MAX_SESSIONS = 256
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculate")
+_pending = OrderedDict()
+_pending_lock = threading.Lock()
+
+
+class Speculation:
+    """One JD text waiting out its debounce (timer) or being extracted (future)."""
+
+    def __init__(self, text: str, keys: tuple):
+        self.text = text
+        self.keys = keys
+        self.timer = None
+        self.future = None
+
+    def cancel(self) -> None:
+        # A call already sent to the model finishes and lands in the response cache; nothing else is lost
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.future is not None:
+            self.future.cancel()
+
+
+def jd_input(recruiter_text: str) -> str:
+    """The model input for the JD alone, in the same layout as a full submission."""
+    return combine_inputs("", "", recruiter_text)
+
+
+def jd_keys(keys: tuple) -> list:
+    return [key for key in keys if key in JD_FIELDS]
+
+
+def _from_response_cache(text: str, keys: tuple):
+    """A finished Speculation from the shared response cache, e.g. when another replica speculated
+    on this JD before the load balancer sent the submit here; None if it is not cached."""
+    cached = cached_response(response_cache_key(extraction_prompt(jd_keys(keys)).format(text_input=jd_input(text))))
+    if cached is None:
+        return None
+    speculation = Speculation(text, keys)
+    speculation.future = Future()
+    speculation.future.set_result(normalize_record(cached))
+    return speculation
+
+# --- 3. Scheduling ---
+def speculate(session_id: str, recruiter_text: str, keys=None) -> None:
+    """Schedules the JD-only extraction for recruiter_text after the debounce.
+
+    Calling it again with the same text is a no-op; a different text replaces the pending
+    speculation, so a JD edited within the debounce never reaches the model.
+    """
+    text = recruiter_text.strip()
+    keys = tuple(select_fields(keys))
+    if not text:
+        discard(session_id)
+        return
+    with _pending_lock:
+        current = _pending.get(session_id)
+        if current is not None and current.text == text and current.keys == keys:
+            return
+        if current is not None:
+            current.cancel()
+        speculation = Speculation(text, keys)
+        _pending[session_id] = speculation
+        _pending.move_to_end(session_id)
+        while len(_pending) > MAX_SESSIONS:
+            _pending.popitem(last=False)[1].cancel()
+        # The timer thread carries the session's context, so the rate limiter queues this call fairly
+        speculation.timer = threading.Timer(
+            DEBOUNCE_SECONDS, contextvars.copy_context().run, args=(_start, session_id, speculation)
+        )
+        speculation.timer.daemon = True
+        speculation.timer.start()
+
+
+def _start(session_id: str, speculation: Speculation) -> None:
+    with _pending_lock:
+        if _pending.get(session_id) is not speculation:
+            return
+        speculation.future = _executor.submit(
+            contextvars.copy_context().run, process_recruiter_text, jd_input(speculation.text),
+            jd_keys(speculation.keys)
+        )
+
+
+def discard(session_id: str) -> None:
+    with _pending_lock:
+        speculation = _pending.pop(session_id, None)
+    if speculation is not None:
+        speculation.cancel()
+
+
+def status(session_id: str) -> str:
+    """'idle', 'waiting' (debouncing), 'running' or 'ready' for the session's pending speculation."""
+    with _pending_lock:
+        speculation = _pending.get(session_id)
+    if speculation is None:
+        return "idle"
+    if speculation.future is None:
+        return "waiting"
+    return "ready" if speculation.future.done() else "running"
+
+# --- 4. Reconciliation at Submit ---
+def reconcile(session_id: str, applicant_skills: str, call_details: str, recruiter_text: str, keys=None):
+    """The final extraction built on the session's speculative JD result, or None to extract normally.
+
+    None means there was nothing usable: no speculation here and no JD-only answer in the shared
+    response cache, a speculation still debouncing, or a model error on any of the calls.
+    """
+    # The entry stays in place: a resubmission reuses it, and later reruns don't speculate on this JD again
+    text, keys = recruiter_text.strip(), tuple(select_fields(keys))
+    with _pending_lock:
+        speculation = _pending.get(session_id)
+    if speculation is None or speculation.text != text or speculation.keys != keys:
+        speculation = _from_response_cache(text, keys)
+        if speculation is None:
+            return None
+    if speculation.future is None:
+        # Still debouncing: the submit extracts everything now, so the timer's call would be wasted
+        speculation.cancel()
+        return None
+    wanted = list(speculation.keys)
+    skill_keys = [key for key in SKILL_FIELDS if key in wanted]
+
+    # The remaining calls go out together, so the submit waits for the slower one only. The call
+    # summary is compared with the JD fields when they are already back, else it reports all it states
+    context = contextvars.copy_context()
+    known = speculation.future.result() if speculation.future.done() else {}
+    if "error" in known:
+        return None
+    delta = _executor.submit(context.copy().run, extract_delta, known, call_details) if call_details.strip() else None
+    scores = None
+    if skill_keys and applicant_skills.strip():
+        scores = _executor.submit(
+            context.copy().run, process_recruiter_text,
+            combine_inputs(applicant_skills, call_details, recruiter_text), skill_keys
+        )
+
+    try:
+        details = speculation.future.result(timeout=RECONCILE_TIMEOUT_SECONDS)
+        delta_updates = delta.result(timeout=RECONCILE_TIMEOUT_SECONDS) if delta is not None else {}
+        score_updates = scores.result(timeout=RECONCILE_TIMEOUT_SECONDS) if scores is not None else {}
+    except FutureTimeoutError:
+        return None
+    if any("error" in result for result in (details, delta_updates, score_updates)):
+        return None
+    details = merge_results(details, delta_updates, [key for key in wanted if key not in SKILL_FIELDS])
+    details = merge_results(details, score_updates, skill_keys)
+    # Without skills the full prompt has nothing to score against either
+    return {key: details.get(key, "Not specified") for key in wanted}
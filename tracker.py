@@ -0,0 +1,191 @@
+# tracker.py (Persistent job tracker shared by every session of the app)
+
+# --- 1. Import necessary libraries ---
+import os
+import json
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+from extraction import TRACKER_HEADERS
+from shared_state import shared_backend, state_key
+
+# --- 2. Configuration ---
+TRACKER_DB = os.environ.get("JOB_AGENT_TRACKER_DB", "job_tracker.db")
+
+RECORDS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    {", ".join(f"{key} TEXT NOT NULL DEFAULT ''" for key in TRACKER_HEADERS)}
+)
+"""
+
+# Other modules (scheduler, indexes...) add their tables here; they are created with the records table
+_schemas = [RECORDS_SCHEMA]
+_initialized_paths = set()
+_init_lock = threading.Lock()
+# In-memory indexes subscribe here to stay current without rescanning the tracker
+_listeners = []
+# With a shared state backend, writes are also logged to a change feed so the indexes of other
+# replicas can catch up; a replica further behind than the feed reaches rebuilds instead
+CHANGE_FEED_LENGTH = 256
+CHANGE_FEED_MAX_IDS = 1000  # Larger batches are logged as "anything may have changed"
+
+
+def register_schema(sql: str) -> None:
+    """Adds DDL to run (idempotently) whenever a tracker database is first opened."""
+    _schemas.append(sql)
+    _initialized_paths.clear()
+
+
+def register_listener(callback) -> None:
+    """Calls callback(path, record_id, fields) after each committed add or update in this process."""
+    _listeners.append(callback)
+
+
+def _notify(path: str, changes: dict) -> None:
+    for callback in _listeners:
+        for record_id, fields in changes.items():
+            callback(path or TRACKER_DB, record_id, fields)
+    _publish(path, list(changes))
+
+# --- 3. Change Feed (for other replicas) ---
+def _feed_key(path: str) -> str:
+    return state_key("tracker", path or TRACKER_DB, "changes")
+
+
+def _publish(path: str, record_ids: list) -> None:
+    backend = shared_backend()
+    if backend is None:
+        return
+    logged_ids = sorted(record_ids) if len(record_ids) <= CHANGE_FEED_MAX_IDS else None
+
+    def append(raw):
+        feed = json.loads(raw) if raw is not None else {"version": 0, "changes": []}
+        feed["version"] += 1
+        feed["changes"] = (feed["changes"] + [[feed["version"], logged_ids]])[-CHANGE_FEED_LENGTH:]
+        return json.dumps(feed).encode(), None
+    backend.update(_feed_key(path), append)
+
+
+def _read_feed(path: str) -> dict:
+    backend = shared_backend()
+    raw = backend.get(_feed_key(path)) if backend is not None else None
+    return json.loads(raw) if raw is not None else {"version": 0, "changes": []}
+
+
+def feed_version(path: str = None) -> int:
+    """The tracker's current change feed position (always 0 without a shared backend)."""
+    return _read_feed(path)["version"]
+
+
+def changes_since(version: int, path: str = None):
+    """(current version, ids of records any replica changed after version).
+
+    The ids are None when the feed no longer reaches back to version, or a change was too
+    large to list; the caller should then reload everything.
+    """
+    feed = _read_feed(path)
+    if feed["version"] == version:
+        return version, []
+    newer = [entry for entry in feed["changes"] if entry[0] > version]
+    if feed["version"] < version or not newer or newer[0][0] != version + 1:
+        return feed["version"], None
+    record_ids = set()
+    for _, logged_ids in newer:
+        if logged_ids is None:
+            return feed["version"], None
+        record_ids.update(logged_ids)
+    return feed["version"], sorted(record_ids)
+
+# --- 4. Connection Handling ---
+@contextmanager
+def open_db(path: str = None):
+    """Opens the tracker database in a transaction; commits on success, rolls back on error."""
+    path = path or TRACKER_DB
+    connection = sqlite3.connect(path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    try:
+        if path not in _initialized_paths:
+            with _init_lock:
+                # WAL lets the reminders panel read while another session is writing
+                connection.execute("PRAGMA journal_mode=WAL")
+                for sql in _schemas:
+                    connection.executescript(sql)
+                _initialized_paths.add(path)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+# --- 5. Record Operations ---
+def add_record(details: dict, path: str = None) -> int:
+    """Stores an extracted record and returns its id."""
+    return add_records([details], path)[0]
+
+
+def add_records(records: list, path: str = None) -> list:
+    """Stores many records in a single transaction; returns their ids in order."""
+    columns = ["created_at"] + TRACKER_HEADERS
+    created_at = datetime.datetime.now().isoformat(timespec="seconds")
+    rows = [[created_at] + [str(details.get(key, "") or "") for key in TRACKER_HEADERS] for details in records]
+    sql = f"INSERT INTO records ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    with open_db(path) as connection:
+        record_ids = [connection.execute(sql, values).lastrowid for values in rows]
+    _notify(path, {record_id: dict(zip(columns, values)) for record_id, values in zip(record_ids, rows)})
+    return record_ids
+
+
+def get_record(record_id: int, path: str = None) -> dict:
+    with open_db(path) as connection:
+        row = connection.execute("SELECT * FROM records WHERE id = ?", (record_id,)).fetchone()
+    return dict(row) if row else {}
+
+
+def get_records(record_ids, path: str = None) -> dict:
+    """Returns {id: record} for the given ids in a single query."""
+    record_ids = list(record_ids)
+    if not record_ids:
+        return {}
+    with open_db(path) as connection:
+        rows = connection.execute(
+            f"SELECT * FROM records WHERE id IN ({', '.join('?' for _ in record_ids)})", record_ids
+        ).fetchall()
+    return {row["id"]: dict(row) for row in rows}
+
+
+def _update(connection, record_id: int, fields: dict) -> None:
+    fields = {key: str(value or "") for key, value in fields.items() if key in TRACKER_HEADERS}
+    if fields:
+        connection.execute(
+            f"UPDATE records SET {', '.join(f'{key} = ?' for key in fields)} WHERE id = ?",
+            list(fields.values()) + [record_id]
+        )
+
+
+def update_record(record_id: int, fields: dict, path: str = None) -> None:
+    """Updates the given tracker columns of a record in place."""
+    with open_db(path) as connection:
+        _update(connection, record_id, fields)
+    _notify(path, {record_id: fields})
+
+
+def update_records(updates: dict, path: str = None) -> None:
+    """Applies {record_id: {column: value}} in a single transaction."""
+    with open_db(path) as connection:
+        for record_id, fields in updates.items():
+            _update(connection, record_id, fields)
+    _notify(path, updates)
+
+
+def iter_records(path: str = None, batch_size: int = 1000):
+    """Yields every record in id order, fetching in batches to keep memory flat."""
+    with open_db(path) as connection:
+        cursor = connection.execute("SELECT * FROM records ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
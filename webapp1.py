@@ -1,120 +1,47 @@
 import os
-import json
-import csv
-import io
-import pandas as pd
+import uuid
 import datetime
+import pandas as pd
 from dotenv import load_dotenv
 import google.generativeai as genai
 import streamlit as st
+from extraction import (
+    TRACKER_HEADERS, combine_inputs, create_ics_file, build_tracker_csv, result_id,
+    parse_interview_start, assess_fields, find_gaps, fill_gaps, merge_follow_up_note, extraction_prompt
+)
+from mail_ingest import iter_messages, iter_extractions, iter_threaded_extractions
+from doc_ingest import SUPPORTED_TYPES, content_hash, iter_document_pages
+import tracker
+import scheduler
+import similarity
+import skill_index
+import candidate_ranking
+import prep_packs
+import conversations
+import speculation
+from offline_extractor import extract_with_fallback
+import xlsx_export
+import csv_import
+import memory_budget
+import run_profile
+from rate_limiter import limiter, current_session
 
 # --- 1. Configuration and Setup ---
+# Opt-in (JOB_AGENT_PROFILE): samples this whole script run and saves a flame graph at the end of it
+run_profiler = run_profile.begin(__file__, st.query_params.get("profile"))
 load_dotenv()
 try:
     genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+    API_AVAILABLE = True
 except KeyError:
-    st.error("CRITICAL ERROR: GOOGLE_API_KEY not found. Please ensure your .env file is correctly set up.")
-    st.stop()
-
-# --- 2. The AI Prompt (FINAL MODIFIED) ---
-EXTRACTION_PROMPT = """
-You are an expert data extraction assistant for job seekers. Your task is to analyze the provided texts: 1) Job Details (JD, email, call notes) and 2) Applicant Skills (Resume/Summary).
-
-**CRITICAL INSTRUCTION:** You MUST return the output as a single, valid JSON object. Do not add any explanatory text, markdown formatting, or code fences like ```
-
-**JSON Keys to use:**
-- "date_contacted": Date HR contacted you or you applied.
-- "hr_name": Name of the HR/recruiter.
-- "phone_number": HR’s phone number.
-- "email_id": HR’s email address.
-- "role_position": Job title for the opportunity.
-- "recruiter_company": The staffing/recruitment agency name (if applicable).
-- "client_company": The company the job is actually for.
-- "location": Job location (e.g., city, remote, hybrid).
-- "job_type": Permanent, Contract, Internship, or Freelance.
-- "mode_of_contact": How you were contacted (e.g., Call, Email, LinkedIn, Naukri).
-- "interview_mode": Online, Offline, or Hybrid.
-- "interview_scheduled_date": Date of the interview (if scheduled).
-- "round_1_details": Details for the first interview round (e.g., "Technical - Scheduled").
-- "round_2_details": Details for the second interview round.
-- "ctc_offered_expected": Salary discussed or expected range.
-- "status": Current status (e.g., "Awaiting JD", "Interview Scheduled", "Selected", "Rejected").
-- "next_follow_up_date": When you plan to follow up.
-- "review_notes": Your personal comments or notes.
-- "extracted_keywords": A comma-separated list of the 5-10 most critical hard skills and technologies required for the role (e.g., Python, AWS, Kubernetes, React, SQL).
-- "match_score": A percentage score (e.g., "85%") representing the fit between the job's required skills and the applicant's skills provided in the input.
-- "skill_gap_analysis": A brief, one-sentence summary of the main skill gaps (e.g., "Missing experience in Terraform and advanced SQL queries.").
-- "prep_hint": A one-sentence, proactive hint based on the extracted status (e.g., if 'Awaiting JD', output: 'Draft a polite follow-up email asking for the JD by tomorrow.'; if 'Interview Scheduled', output: 'Focus on behavioral questions and a deep dive into the extracted keywords.').
-
-**Input Text (Job Details & Applicant Skills):**
-***
-{text_input}
-***
-
-**JSON Output:**
-"""
-
-# --- 3. The Core Logic Function (Unchanged) ---
-def process_recruiter_text(text_to_process: str) -> dict:
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    prompt_with_input = EXTRACTION_PROMPT.format(text_input=text_to_process)
-    try:
-        response = model.generate_content(prompt_with_input)
-        # Clean response: remove surrounding code fences that AI sometimes adds despite instructions
-        clean_response = response.text.strip()
-        if clean_response.startswith('```json'):
-            clean_response = clean_response[7:].strip()
-        if clean_response.endswith('```'):
-            clean_response = clean_response[:-3].strip()
-                                                    
-        parsed_json = json.loads(clean_response)
-        return parsed_json
-    except json.JSONDecodeError:
-        return {"error": f"The AI returned an invalid JSON format. Raw output: {clean_response}"}
-    except Exception as e:
-        return {"error": f"An error occurred: {e}"}
-
-# --- 4. iCalendar File Generation Function (Unchanged) ---
-def create_ics_file(details: dict) -> str:
-    date_str = details.get("interview_scheduled_date", "Not specified")
-    role = details.get("role_position", "Job Interview")
-    client = details.get("client_company", "Client Company")
-    recruiter = details.get("hr_name", "Recruiter")
-    mode = details.get("interview_mode", "Mode Not Specified")
-    try:
-        # Assuming date_str is in YYYY-MM-DD format as per prompt instruction
-        start_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(hour=10, minute=0, second=0)
-        end_date = start_date + datetime.timedelta(hours=1)
-        dt_format = "%Y%m%dT%H%M%S"
-        dt_start = start_date.strftime(dt_format)
-        dt_end = end_date.strftime(dt_format)
-        dt_stamp = datetime.datetime.now().strftime(dt_format)
-    except ValueError:
-        return ""
-
-    summary = f"Interview: {role} @ {client}"
-    description = (
-        f"Role: {role}\n"
-        f"Company: {client}\n"
-        f"Recruiter: {recruiter}\n"
-        f"Round 1 Details: {details.get('round_1_details', 'N/A')}\n"
-        f"Mode: {mode}\n"
-        f"HR Contact: {details.get('email_id', 'N/A')} / {details.get('phone_number', 'N/A')}"
-    )
+    # Without a key the app still works, using the offline rule-based extractor
+    st.warning("GOOGLE_API_KEY not found, so extraction runs offline with reduced accuracy. Add it to your .env file to enable the AI.")
+    API_AVAILABLE = False
+
+# Tag this script run's model calls with the session, so the shared rate limiter can queue fairly
+current_session.set(st.session_state.setdefault('session_id', uuid.uuid4().hex))
 
-    ics_content = f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//AI Job Agent//EN
-BEGIN:VEVENT
-UID:{dt_stamp}-{hash(summary)}
-DTSTAMP:{dt_stamp}
-DTSTART:{dt_start}
-DTEND:{dt_end}
-SUMMARY:{summary}
-DESCRIPTION:{description}
-END:VEVENT
-END:VCALENDAR"""
-    return ics_content.replace('\n', '\r\n')
+# --- 2-4. Prompt, Core Logic and iCalendar Generation (moved to extraction.py) ---
 
 # --- 5. Building the Streamlit Web Interface (Modified for Centering and Layout) ---
 
@@ -153,15 +80,130 @@ st.markdown(
 # Help Section
 with st.expander("❓ How This Works & Expected Fields", expanded=False):
     st.markdown("""
-        The AI analyzes the Job Details and your skills to pull 22 key data points, including a **Match Score** and **Proactive Prep Hint**.
+        The AI analyzes the Job Details and your skills to pull up to 22 key data points, including a **Match Score** and **Proactive Prep Hint**. Pick fewer fields in the sidebar for faster, cheaper extractions.
 
         **New Fields:** `match_score`, `skill_gap_analysis`, and `prep_hint`.
 
         **Tip:** For best results, put your resume/skills in the first section, and the full Job Description in the third section.
     """)
 
-# Form with Expanders for Each Section
-with st.form(key='data_extraction_form'):
+# API Quota Status (shared by every open session of this server)
+with st.sidebar:
+    offline_mode = st.toggle(
+        "📴 Offline extraction (no API calls)",
+        value=not API_AVAILABLE,
+        disabled=not API_AVAILABLE,
+        key='offline_mode',
+        help="Extract with local rules only. Guessed fields are flagged so they can be refined with the AI later."
+    )
+    selected_fields = st.multiselect(
+        "🧾 Fields to extract",
+        options=TRACKER_HEADERS,
+        default=TRACKER_HEADERS,
+        key='extract_fields',
+        help="Only the selected fields are requested from the AI, so the prompt and the answer shrink with the selection."
+    ) or TRACKER_HEADERS
+    speculate_enabled = st.toggle(
+        "⚡ Start extracting the JD while I type",
+        value=False,
+        disabled=offline_mode,
+        key='speculative_extraction',
+        help="Once the job description stops changing, its fields are extracted in the background, so the submit only waits for what the call summary and your skills add. Each settled JD costs one model call, even if you never submit it."
+    ) and not offline_mode
+    if len(selected_fields) < len(TRACKER_HEADERS):
+        prompt_share = len(extraction_prompt(selected_fields)) / len(extraction_prompt())
+        st.caption(f"{len(selected_fields)} of {len(TRACKER_HEADERS)} fields · prompt at {prompt_share:.0%} of full size")
+    st.caption("**Job Tracker**")
+    if xlsx_export.xlsxwriter is not None:
+        # Built only when clicked, streaming rows from the tracker with constant memory
+        st.download_button(
+            label="📊 Download Full Tracker (.xlsx)",
+            data=xlsx_export.export_tracker_bytes,
+            file_name="job_tracker.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore"
+        )
+    else:
+        st.caption("Install `xlsxwriter` to export the tracker to Excel.")
+    quota = limiter.stats()
+    st.caption("**API Quota**")
+    st.caption(
+        f"Queued requests: {quota['queue_depth']} · "
+        f"Avg wait: {quota['avg_wait_seconds']:.1f}s · Max wait: {quota['max_wait_seconds']:.1f}s"
+    )
+
+# Reminders Panel (index lookups only; the tracker itself is never scanned)
+@st.fragment
+def render_reminders_panel():
+    reminder_groups = [
+        ("⏰ Overdue", scheduler.overdue()),
+        ("📌 Due Today", scheduler.due_today()),
+        ("🗓️ Next 7 Days", scheduler.due_next_days(7)),
+    ]
+    pending = sum(len(reminders) for _, reminders in reminder_groups)
+    with st.expander(f"🔔 Reminders ({pending})", expanded=pending > 0):
+        if not pending:
+            st.caption("No follow-ups or interviews due in the next 7 days.")
+        for group_label, reminders in reminder_groups:
+            if not reminders:
+                continue
+            st.markdown(f"**{group_label}**")
+            for reminder in reminders:
+                text_col, snooze_col, done_col = st.columns([6, 1, 1])
+                text_col.write(
+                    f"{reminder['due_date']} · {reminder['kind']}: {reminder['role_position'] or 'Role'} "
+                    f"@ {reminder['client_company'] or 'Company'} ({reminder['hr_name'] or 'Recruiter'})"
+                )
+                # Callbacks run before the fragment reruns, so the list below is already up to date
+                snooze_col.button(
+                    "Snooze", key=f"snooze_{reminder['id']}", help="Remind me tomorrow",
+                    on_click=scheduler.snooze, args=(reminder['id'],), kwargs={"days": 1}
+                )
+                done_col.button(
+                    "Done", key=f"done_{reminder['id']}",
+                    on_click=scheduler.complete, args=(reminder['id'],)
+                )
+
+
+render_reminders_panel()
+
+# Document Upload Section (fills the text boxes below before the form is drawn)
+with st.expander("📎 Upload Resume / Job Description (PDF or DOCX)", expanded=False):
+    resume_col, jd_col = st.columns(2)
+    with resume_col:
+        resume_file = st.file_uploader("Resume", type=SUPPORTED_TYPES, key='resume_file')
+    with jd_col:
+        jd_file = st.file_uploader("Job Description", type=SUPPORTED_TYPES, key='jd_file')
+
+    for uploaded_file, target_key in ((resume_file, 'applicant_skills'), (jd_file, 'recruiter_text')):
+        if uploaded_file is None:
+            continue
+        file_bytes = uploaded_file.getvalue()
+        digest = content_hash(file_bytes)
+        # Reruns with the same upload reuse the text already placed in the box
+        if st.session_state.get(f"{target_key}_doc_hash") == digest:
+            continue
+        page_status = st.empty()
+        page_texts = []
+        try:
+            for page_number, page_text in enumerate(iter_document_pages(file_bytes, uploaded_file.name), start=1):
+                page_texts.append(page_text)
+                page_status.info(f"{uploaded_file.name}: extracted page {page_number}...")
+                # Keep the text box current so early pages are usable even if this run is interrupted
+                st.session_state[target_key] = "\n\n".join(text for text in page_texts if text)
+        except RuntimeError as e:
+            page_status.error(f"Could not read {uploaded_file.name}: {e}")
+            continue
+        except ValueError as e:
+            # Corrupt or mislabelled uploads; the message already names the file
+            page_status.error(str(e))
+            continue
+        st.session_state[f"{target_key}_doc_hash"] = digest
+        page_status.success(f"{uploaded_file.name}: {len(page_texts)} page(s) loaded into the text box below.")
+
+# Input Sections with Expanders (a bordered container, not a form, so the JD box reaches the
+# server as soon as it loses focus and can be extracted speculatively before the submit)
+with st.container(border=True):
     
     # 2. Recruiter Call Summary (Expanded by default for immediate input)
     st.subheader("📞 1. Recruiter Call Summary")
@@ -195,79 +237,488 @@ with st.form(key='data_extraction_form'):
             label_visibility="collapsed" # Hide redundant label
         )
 
+    # 4. Existing conversation (a reply only updates the fields it changes)
+    open_threads = {thread["id"]: thread for thread in conversations.list_threads()}
+    thread_choice = st.selectbox(
+        "🧵 Part of an existing conversation?",
+        options=[None] + list(open_threads),
+        format_func=lambda thread_id: "New opportunity" if thread_id is None else (
+            f"{open_threads[thread_id]['role_position']} @ {open_threads[thread_id]['client_company']} "
+            f"({open_threads[thread_id]['status']}, {open_threads[thread_id]['messages']} message(s))"
+        ),
+        key='thread_choice',
+        help="Pick the opportunity this message belongs to; only the fields it changes are extracted and the saved record is updated in place."
+    )
+
     st.markdown("---") # Separator before the submit button
 
-    submitted = st.form_submit_button("✨ Extract, Score, and Prepare Files")
+    submitted = st.button("✨ Extract, Score, and Prepare Files")
+
+# Speculative JD extraction: debounced in the background, reconciled on submit
+if speculate_enabled and thread_choice is None:
+    speculation.speculate(st.session_state['session_id'], recruiter_text, selected_fields)
+else:
+    speculation.discard(st.session_state['session_id'])
 
-# --- 6. Processing Logic (Unchanged) ---
+# --- 6. Processing Logic ---
 if submitted:
     # Combining inputs for the AI prompt
-    combined_text = (
-        f"--- APPLICANT SKILLS ---\n{applicant_skills}\n\n"
-        f"--- JOB DETAILS ---\n"
-        f"Call Summary: {call_details}\n\nDetailed Info:\n{recruiter_text}"
+    with memory_budget.stage("input"):
+        combined_text = combine_inputs(applicant_skills, call_details, recruiter_text)
+
+    if thread_choice is not None and offline_mode:
+        st.error("Updating a conversation needs the AI. Turn off offline extraction in the sidebar to continue.")
+    elif thread_choice is not None and (call_details.strip() or recruiter_text.strip()):
+        # Delta extraction: the model sees the compact current record plus this message only
+        with st.spinner("🧵 Updating the conversation with the new message..."):
+            with memory_budget.stage("model_response"):
+                thread_update = conversations.add_message(thread_choice, f"{call_details}\n\n{recruiter_text}".strip())
+
+        if "error" in thread_update:
+            st.error(thread_update["error"])
+        else:
+            if thread_update["changed"]:
+                st.success(f"Updated {', '.join(thread_update['changed'])}.")
+            else:
+                st.info("The new message did not change any tracked field.")
+            st.session_state['extraction_result'] = {
+                "id": result_id(thread_update["details"]),
+                "record_id": thread_update["record_id"],
+                "data": thread_update["details"],
+                "source_text": combined_text,
+                "similar_jobs": [],
+            }
+            st.session_state['download_payloads'] = {}
+    elif call_details.strip() or recruiter_text.strip() or applicant_skills.strip():
+        with st.spinner("🧠 The AI is analyzing and scoring the fit..."):
+            with memory_budget.stage("model_response"):
+                # The speculative JD result, topped up with what the call summary and skills add
+                speculated = speculation.reconcile(
+                    st.session_state['session_id'], applicant_skills, call_details, recruiter_text, selected_fields
+                ) if speculate_enabled else None
+                if speculated is not None:
+                    structured_data_dict, refine_fields, fallback_warning = speculated, [], ""
+                else:
+                    # Falls back to the offline extractor when the API is off, missing or failing
+                    structured_data_dict, refine_fields, fallback_warning = extract_with_fallback(
+                        combined_text, use_model=not offline_mode, keys=selected_fields
+                    )
+        if fallback_warning:
+            st.warning(fallback_warning)
+
+        if "error" in structured_data_dict:
+            st.error(structured_data_dict["error"])
+        else:
+            # Save to the shared tracker and index its follow-up / interview dates
+            record_id = tracker.add_record(structured_data_dict)
+            scheduler.schedule_from_record(record_id, structured_data_dict)
+            jd_text = f"{call_details}\n\n{recruiter_text}".strip()
+            # Look up earlier similar roles before this one is indexed, then index it for next time
+            similar_jobs = similarity.find_similar_jobs(jd_text, k=5) if jd_text else []
+            if jd_text:
+                similarity.get_index().add(record_id, jd_text)
+            # Later replies about this opportunity update this record instead of creating new rows
+            conversations.start_thread(record_id, structured_data_dict, jd_text or combined_text)
+            # Prep material for skills no earlier job had is written in the background while the user reviews
+            if API_AVAILABLE and not offline_mode:
+                prep_packs.request_packs(prep_packs.job_skills(structured_data_dict))
+
+            # Persist the result so download clicks and other reruns never call the model again
+            st.session_state['extraction_result'] = {
+                "id": result_id(structured_data_dict),
+                "record_id": record_id,
+                "data": structured_data_dict,
+                "source_text": combined_text,
+                "similar_jobs": similar_jobs,
+                "refine_fields": refine_fields,
+            }
+            st.session_state['download_payloads'] = {}
+    else:
+        st.warning("Please provide some information in at least one of the input sections.")
+
+# --- 7. Results Panel (reruns on its own, independently of the form) ---
+FIELD_STATUS_ICONS = {"ok": "✅", "missing": "⚠️ missing", "invalid": "❌ check format", "offline": "🔎 offline guess"}
+
+
+def update_extraction_result(updated_details: dict):
+    """Replaces the session result after a targeted re-extraction and syncs the tracker."""
+    result = st.session_state['extraction_result']
+    result["data"] = updated_details
+    result["id"] = result_id(updated_details)
+    tracker.update_record(result["record_id"], updated_details)
+    scheduler.schedule_from_record(result["record_id"], updated_details)
+    st.session_state['download_payloads'] = {}
+
+
+def memoized_payload(kind: str, result: dict, builder):
+    """Returns a download builder that runs at most once per result and payload type."""
+    # Streamlit calls the builder outside the script thread, so it must not touch st.session_state;
+    # the payload store and the record are bound here instead
+    payloads = st.session_state.setdefault('download_payloads', {})
+    cache_key = (result["id"], kind)
+    details = result["data"]
+
+    def build():
+        if cache_key not in payloads:
+            with memory_budget.stage(f"{kind}_buffer"):
+                payloads[cache_key] = builder(details)
+        return payloads[cache_key]
+    return build
+
+
+def save_candidate_profile():
+    name = st.session_state.get('profile_name', "").strip()
+    skills_text = st.session_state.get('profile_skills', "").strip()
+    if name and skills_text:
+        candidate_ranking.save_profile(name, skills_text)
+        st.session_state['profile_name'] = ""
+        st.session_state['profile_skills'] = ""
+
+
+def render_candidate_ranking(result: dict):
+    profiles = candidate_ranking.list_profiles()
+    name_col, skills_col = st.columns([1, 3])
+    name_col.text_input("Candidate Name", key='profile_name')
+    skills_col.text_area("Candidate Skills", key='profile_skills', height=68)
+    st.button("💾 Save Profile", on_click=save_candidate_profile)
+
+    if not profiles:
+        st.caption("Save at least one candidate profile to rank it against this job.")
+        return
+    use_model = st.checkbox("Refine scores with one AI call for all candidates", key='rank_with_ai')
+    if st.button(f"🏆 Rank {len(profiles)} Candidate(s)"):
+        if use_model:
+            with st.spinner("Scoring all candidates in a single request..."):
+                ranking = candidate_ranking.rank_profiles_with_model(result["data"], profiles)
+        else:
+            ranking = candidate_ranking.rank_profiles_locally(result["data"], profiles)
+        if isinstance(ranking, dict):
+            st.error(ranking["error"])
+        else:
+            result["candidate_ranking"] = ranking
+    if result.get("candidate_ranking"):
+        st.dataframe(
+            pd.DataFrame(memory_budget.load_value(result["candidate_ranking"])).drop(columns="_score"),
+            use_container_width=True, hide_index=True
+        )
+
+
+def render_prep_pack(result: dict):
+    details = result["data"]
+    assembled = prep_packs.assemble(details, generate=API_AVAILABLE and not st.session_state.get('offline_mode'))
+    if not assembled["skills"]:
+        st.caption("No extracted keywords to prepare for.")
+        return
+    ready = list(assembled["packs"])
+    if ready:
+        for tab, skill in zip(st.tabs([prep_packs.skill_title(skill) for skill in ready]), ready):
+            tab.markdown(prep_packs.format_skill_markdown(assembled["packs"][skill]))
+    if assembled["pending"]:
+        st.caption(f"Writing prep material for {', '.join(assembled['pending'])} (new skills only)...")
+        st.button("🔄 Check Again", key='prep_pack_refresh')
+    if assembled["unavailable"]:
+        st.caption(f"No prep material yet for {', '.join(assembled['unavailable'])}; it needs the AI.")
+    if ready:
+        st.download_button(
+            label="📚 Download Prep Pack (.md)",
+            data=prep_packs.format_pack_markdown(details, assembled),
+            file_name=f"prep_{details.get('client_company', 'job')}.md",
+            mime="text/markdown",
+            on_click="ignore"
+        )
+
+
+def apply_memory_budget():
+    """Keeps this session under its memory budget by dropping rebuildable data, then spilling to disk."""
+    actions = memory_budget.enforce_budget(
+        st.session_state,
+        evictable=['download_payloads'],
+        spillable=[
+            ('extraction_result', 'source_text'),
+            ('extraction_result', 'similar_jobs'),
+            ('extraction_result', 'candidate_ranking'),
+        ]
     )
+    if actions and memory_budget.PROFILING:
+        st.caption("Memory budget: " + "; ".join(actions))
+
+
+@st.fragment
+def render_results_panel():
+    result = st.session_state.get('extraction_result')
+    if result is None:
+        return
+
+    # Actions are handled before anything is drawn, so the table below already shows their outcome
+    if st.session_state.get('fill_gaps_button'):
+        # Targeted re-extraction: only the missing/invalid keys are sent back to the model
+        with st.spinner("Asking the AI for the missing fields only..."):
+            filled = fill_gaps(memory_budget.load_value(result["source_text"]), result["data"])
+        if "error" in filled:
+            st.error(filled["error"])
+        else:
+            update_extraction_result(filled)
+    if st.session_state.get('refine_button'):
+        # Offline guesses are re-extracted by the model, keeping the values it could confirm
+        with st.spinner("Refining the offline estimate with the AI..."):
+            refined = fill_gaps(memory_budget.load_value(result["source_text"]), result["data"], result["refine_fields"])
+        if "error" in refined:
+            st.error(refined["error"])
+        else:
+            update_extraction_result(refined)
+            result["refine_fields"] = []
+    if st.session_state.get('merge_note_button') and st.session_state.get('follow_up_note', "").strip():
+        with st.spinner("Updating only the fields this note changes..."):
+            merged = merge_follow_up_note(result["data"], st.session_state['follow_up_note'])
+        if "error" in merged:
+            st.error(merged["error"])
+        else:
+            update_extraction_result(merged)
+    structured_data_dict = result["data"]
+
+    st.success("Extraction and scoring complete! Review results and download your files below.")
+    st.subheader("✅ Extracted Information Review")
+
+    # Display Results in a DataFrame, with a validity check per field
+    with memory_budget.stage("dataframe"):
+        df_display = pd.DataFrame([structured_data_dict]).T
+        df_display.columns = ["Extracted Value"]
+    field_statuses = assess_fields(structured_data_dict, structured_data_dict.keys())
+    for key in result.get("refine_fields", []):
+        if field_statuses.get(key) == "ok":
+            field_statuses[key] = "offline"
+    df_display["Check"] = [FIELD_STATUS_ICONS.get(field_statuses.get(key), "") for key in df_display.index]
+    st.dataframe(df_display, use_container_width=True)
+
+    if result.get("refine_fields") and API_AVAILABLE and not st.session_state.get('offline_mode'):
+        st.button(
+            f"🤖 Refine Offline Estimate with AI ({len(result['refine_fields'])} field(s))",
+            key='refine_button', help=", ".join(result["refine_fields"])
+        )
+    gaps = find_gaps(structured_data_dict, structured_data_dict.keys())
+    if gaps and API_AVAILABLE and not st.session_state.get('offline_mode'):
+        st.button(f"🩹 Fill Gaps ({len(gaps)} field(s))", key='fill_gaps_button', help=", ".join(gaps))
+
+    with st.expander("➕ Add a Follow-up Note", expanded=False):
+        st.text_area(
+            "Follow-up Note Input:",
+            placeholder="e.g., Recruiter called back: round 1 cleared, round 2 on 2025-12-04, follow up on Friday.",
+            key='follow_up_note',
+            label_visibility="collapsed"
+        )
+        st.button("🔄 Merge Note into Record", key='merge_note_button')
+
+    # Similar roles seen before, with what happened to them
+    if result.get("similar_jobs"):
+        st.markdown("**🔁 Similar Roles You've Seen Before**")
+        similar_columns = [
+            "similarity", "role_position", "client_company", "status", "ctc_offered_expected",
+            "round_1_details", "round_2_details", "date_contacted"
+        ]
+        st.dataframe(
+            pd.DataFrame(memory_budget.load_value(result["similar_jobs"]), columns=similar_columns),
+            use_container_width=True, hide_index=True
+        )
 
-    if call_details.strip() or recruiter_text.strip() or applicant_skills.strip():
-        with st.spinner("🧠 The AI is analyzing and scoring the fit..."):
-            structured_data_dict = process_recruiter_text(combined_text)
+    # Multi-candidate mode: the JD above is reused, only the ranking runs per candidate
+    with st.expander("👥 Compare Stored Candidate Profiles", expanded=False):
+        render_candidate_ranking(result)
 
-            if "error" in structured_data_dict:
-                st.error(structured_data_dict["error"])
-            else:
-                st.success("Extraction and scoring complete! Review results and download your files below.")
-                st.subheader("✅ Extracted Information Review")
-
-                # Display Results in a DataFrame
-                df_display = pd.DataFrame([structured_data_dict]).T
-                df_display.columns = ["Extracted Value"]
-                st.dataframe(df_display, use_container_width=True)
-
-                st.divider()
-
-                # iCalendar Download Button
-                if structured_data_dict.get("interview_scheduled_date") not in ["Not specified", None, ""]:
-                    ics_data = create_ics_file(structured_data_dict)
-                    if ics_data:
-                        st.download_button(
-                            label="📅 Download Calendar Event (.ics)",
-                            data=ics_data,
-                            file_name=f"interview_{structured_data_dict.get('client_company', 'details')}.ics",
-                            mime="text/calendar"
-                        )
-
-                # CSV Download Button
-                output = io.StringIO()
-                headers = list(structured_data_dict.keys()) # Use extracted keys dynamically
-                
-                # Check if all required headers are present, if not, use the full list as fallback
-                required_headers = [
-                    "date_contacted", "hr_name", "phone_number", "email_id", "role_position",
-                    "recruiter_company", "client_company", "location", "job_type", "mode_of_contact",
-                    "interview_mode", "interview_scheduled_date", "round_1_details", "round_2_details",
-                    "ctc_offered_expected", "status", "next_follow_up_date", "review_notes",
-                    "extracted_keywords", "match_score", "skill_gap_analysis", "prep_hint"
-                ]
-                # Ensure the CSV writer uses the full header list to avoid missing columns
-                final_headers = required_headers
-
-                writer = csv.DictWriter(output, fieldnames=final_headers, extrasaction='ignore')
-                writer.writeheader()
-                
-                # Ensure all missing keys in the dictionary are filled with "" to prevent DictWriter errors
-                row_to_write = {key: structured_data_dict.get(key, "") for key in final_headers}
-                writer.writerow(row_to_write)
-                
-                csv_data = output.getvalue()
+    # Assembled from per-skill packs shared across jobs, so only skills never seen before cost a call
+    with st.expander("📚 Interview Prep Pack", expanded=False):
+        render_prep_pack(result)
 
-                st.download_button(
-                    label="📄 Download Job Tracker (.csv)",
-                    data=csv_data,
-                    file_name="job_details.csv",
-                    mime="text/csv"
-                )
-    else:
-        st.warning("Please provide some information in at least one of the input sections.")
+    st.divider()
+
+    # iCalendar Download Button (payload is built only when the button is clicked)
+    if parse_interview_start(structured_data_dict) is not None:
+        st.download_button(
+            label="📅 Download Calendar Event (.ics)",
+            data=memoized_payload("ics", result, create_ics_file),
+            file_name=f"interview_{structured_data_dict.get('client_company', 'details')}.ics",
+            mime="text/calendar",
+            on_click="ignore"
+        )
+
+    # CSV Download Button
+    st.download_button(
+        label="📄 Download Job Tracker (.csv)",
+        data=memoized_payload("csv", result, lambda details: build_tracker_csv([details], details)),
+        file_name="job_details.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
+
+
+    apply_memory_budget()
+
+
+render_results_panel()
+
+# --- 8. Bulk Import from Email Exports ---
+st.divider()
+st.subheader("📬 Bulk Import from Email (.eml / .mbox)")
+with st.expander("Upload a single recruiter email or a whole mailbox export:", expanded=False):
+    mail_file = st.file_uploader(
+        "Email File Input:",
+        type=["eml", "mbox"],
+        key='mail_file',
+        label_visibility="collapsed"
+    )
+    st.caption("For very large mailboxes, run `python mail_ingest.py export.mbox job_details.csv` instead of uploading.")
+
+    group_threads = st.checkbox(
+        "Group replies into conversations (update the saved record instead of adding a row)",
+        value=True,
+        key='mail_group_threads'
+    )
+    pack_messages = st.checkbox(
+        "Pack short messages into shared model calls (faster for many short emails)",
+        value=True,
+        key='mail_pack_messages',
+        disabled=group_threads,
+        help="Only applies when replies are not grouped: each conversation update needs its own call."
+    )
+
+    if mail_file is not None and st.button("📨 Extract from Emails"):
+        extracted_rows = []
+        progress = st.empty()
+        messages = iter_messages(mail_file, mail_file.name)
+        skills = st.session_state.get('applicant_skills', "")
+        # Messages are parsed and extracted one at a time; the mailbox is never split into a list up front
+        if group_threads:
+            rows_by_record = {}
+            for count, (message, result) in enumerate(iter_threaded_extractions(messages, skills), start=1):
+                if "error" in result:
+                    st.warning(f"Message {count} ({message['subject'] or 'no subject'}): {result['error']}")
+                else:
+                    rows_by_record[result["record_id"]] = {key: result["details"].get(key, "") for key in TRACKER_HEADERS}
+                progress.info(f"Processed {count} message(s) into {len(rows_by_record)} conversation(s).")
+            extracted_rows = list(rows_by_record.values())
+        else:
+            for count, (message, result) in enumerate(iter_extractions(messages, skills, pack=pack_messages), start=1):
+                if "error" in result:
+                    st.warning(f"Message {count} ({message['subject'] or 'no subject'}): {result['error']}")
+                else:
+                    extracted_rows.append({key: result.get(key, "") for key in TRACKER_HEADERS})
+                progress.info(f"Processed {count} message(s), {len(extracted_rows)} extracted.")
+
+        if extracted_rows:
+            st.dataframe(pd.DataFrame(extracted_rows, columns=TRACKER_HEADERS), use_container_width=True)
+            st.download_button(
+                label="📄 Download Email Tracker (.csv)",
+                data=build_tracker_csv(extracted_rows),
+                file_name="job_details_from_email.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+
+# --- 9. Import Legacy job_details CSVs (no model calls) ---
+st.divider()
+st.subheader("📥 Import Legacy job_details CSVs")
+with st.expander("Merge old job_details.csv downloads (or ZIPs of them) into the tracker:", expanded=False):
+    legacy_files = st.file_uploader(
+        "Legacy CSV Input:",
+        type=["csv", "zip"],
+        accept_multiple_files=True,
+        key='legacy_files',
+        label_visibility="collapsed"
+    )
+    st.caption(
+        "Rows of the same company, role and recruiter are merged; where they disagree the later contact "
+        "date wins (the tracker wins ties) and each conflict is listed below."
+    )
+    # Uploads carry no file dates, so relative dates ("next Monday") need a day to count from
+    legacy_reference = st.date_input(
+        "Relative dates count from:", value=datetime.date.today(), key='legacy_reference_date',
+        help="Use the day the CSVs were downloaded. Files inside a ZIP use their own stored date instead."
+    )
+    legacy_dry_run = st.checkbox("Dry run (report only, write nothing)", value=False, key='legacy_dry_run')
+
+    if legacy_files and st.button("📥 Import CSVs"):
+        with st.spinner("Merging legacy rows..."):
+            report = csv_import.import_files(
+                ((legacy_file.name, legacy_file.getvalue(), legacy_reference) for legacy_file in legacy_files),
+                dry_run=legacy_dry_run
+            )
+        columns = st.columns(4)
+        columns[0].metric("Rows read", report["rows"], f"{report['skipped_rows']} skipped", delta_color="off")
+        columns[1].metric("Duplicates merged", report["duplicates_merged"])
+        columns[2].metric("Added", report["added"])
+        columns[3].metric("Updated", report["updated"], f"{report['unchanged']} unchanged", delta_color="off")
+        if report["conflicts"]:
+            st.caption(f"{len(report['conflicts'])} conflicting value(s):")
+            st.dataframe(pd.DataFrame(report["conflicts"]).head(1000), hide_index=True, use_container_width=True)
+            st.download_button(
+                label="📄 Download Conflicts (.csv)",
+                data=csv_import.write_conflicts_csv(report["conflicts"]),
+                file_name="import_conflicts.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+
+# --- 10. Skill Demand (served from the in-memory skill index, never a tracker scan) ---
+DEMAND_PERIODS = {"All time": None, "Last 30 days": "30d", "This quarter": "quarter", "This year": "year"}
+
+
+@st.fragment
+def render_skill_demand_panel():
+    with st.expander("📈 Skill Demand Across Tracked Roles", expanded=False):
+        period = st.radio("Period:", list(DEMAND_PERIODS), horizontal=True, key='demand_period')
+        since = skill_index.period_start(DEMAND_PERIODS[period])
+        skill_query = st.text_input(
+            "Skill query:",
+            key='demand_query',
+            placeholder="kubernetes AND (terraform OR pulumi) AND NOT java",
+            help="Combine skills with AND (or a comma), OR and NOT; parentheses group."
+        ).strip()
+        try:
+            top = skill_index.get_index().top_skills(15, since=since, query=skill_query or None)
+            roles = skill_index.find_roles(skill_query, since=since, limit=20) if skill_query else []
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if not top:
+            st.caption("No tracked roles with extracted keywords in this period.")
+            return
+        label = f"Top skills among roles matching '{skill_query}'" if skill_query else "Top requested skills"
+        st.caption(f"{label} ({period.lower()}):")
+        st.bar_chart(pd.DataFrame(top, columns=["skill", "roles"]).set_index("skill"), horizontal=True)
+        if skill_query:
+            matched = len(skill_index.get_index().query(skill_query, since=since))
+            st.caption(f"{matched} matching role(s); newest {len(roles)} shown.")
+            st.dataframe(
+                pd.DataFrame(roles, columns=["id", "date_contacted", "role_position", "client_company", "status", "extracted_keywords"]),
+                hide_index=True, use_container_width=True
+            )
+
+
+st.divider()
+render_skill_demand_panel()
+
+# --- 11. Memory Profile (only with JOB_AGENT_MEMPROFILE=1) ---
+if memory_budget.PROFILING:
+    with st.sidebar:
+        st.caption("**Memory (this session)**")
+        footprint = memory_budget.session_footprint(st.session_state)
+        st.caption(f"Total: {sum(footprint.values()) / 1024:.0f} KB of {memory_budget.SESSION_BUDGET_BYTES / 1024 / 1024:.0f} MB budget")
+        st.dataframe(
+            pd.DataFrame(sorted(footprint.items(), key=lambda item: item[1], reverse=True), columns=["key", "bytes"]),
+            hide_index=True
+        )
+        st.caption("**Memory by stage (process-wide)**")
+        st.dataframe(pd.DataFrame(memory_budget.stage_report()), hide_index=True)
+
+# --- 12. Rerun Profile (only with JOB_AGENT_PROFILE; rendered after the profiler stops) ---
+if run_profiler is not None:
+    profile_dir = run_profile.finish(run_profiler, st.session_state.get('session_id', ""))
+    with st.sidebar:
+        st.caption(f"**Profile of this run** ({run_profiler.elapsed * 1000:.0f} ms, {run_profiler.samples} samples)")
+        st.caption(f"Flame graph and top functions saved to `{profile_dir}`")
+        st.dataframe(
+            pd.DataFrame(run_profile.top_functions(run_profiler.stacks, run_profiler.interval, 10)),
+            hide_index=True
+        )
 
 
 
@@ -0,0 +1,156 @@
+# xlsx_export.py (Streaming Excel export of the whole job tracker)
+#
+# Usage: python xlsx_export.py job_tracker.xlsx
+#
+# Rows are read from the tracker in batches and written with xlsxwriter's
+# constant_memory mode, which flushes each row to disk as soon as the next one
+# starts. Memory use stays flat whether the tracker holds 100 or 100,000 records.
+
+# --- 1. Import necessary libraries ---
+import os
+import re
+import sys
+import datetime
+import tempfile
+from functools import lru_cache
+import tracker
+from fields import FIELDS
+from scheduler import normalize_date
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# --- 2. Layout ---
+COLUMNS = ["id", "created_at"] + [field.key for field in FIELDS]
+# Cell type per column, from the field registry: dates and percentages get typed cells
+COLUMN_TYPES = ["id", "created_at"] + [field.type for field in FIELDS]
+COLUMN_WIDTHS = {
+    "id": 7, "created_at": 18, "date_contacted": 13, "interview_scheduled_date": 13, "next_follow_up_date": 13,
+    "match_score": 10, "status": 20, "extracted_keywords": 40, "skill_gap_analysis": 45, "prep_hint": 45,
+    "review_notes": 35, "round_1_details": 25, "round_2_details": 25,
+}
+DEFAULT_WIDTH = 18
+# Excel's last row; conditional formats cover whole columns because the row count is not known up front
+LAST_ROW = 1048575
+
+# (substring of status, cell colours) — first match wins, as in Excel's rule order
+STATUS_COLOURS = [
+    ("Rejected", {"bg_color": "#F8CBAD", "font_color": "#9C0006"}),
+    ("Offer", {"bg_color": "#C6EFCE", "font_color": "#006100"}),
+    ("Selected", {"bg_color": "#C6EFCE", "font_color": "#006100"}),
+    ("Interview", {"bg_color": "#FFEB9C", "font_color": "#9C5700"}),
+    ("Round", {"bg_color": "#FFEB9C", "font_color": "#9C5700"}),
+    ("Awaiting", {"bg_color": "#DDEBF7", "font_color": "#1F4E78"}),
+]
+
+# --- 3. Value Conversion ---
+def parse_score(value):
+    """'85%' -> 0.85 (shown with a percent format), or None if there is no number."""
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return min(100.0, float(match.group())) / 100 if match else None
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str):
+    """normalize_date, memoized: tracker dates repeat heavily across rows."""
+    return normalize_date(value)
+
+
+def write_record(worksheet, row: int, record: dict, formats: dict) -> None:
+    """Writes one tracker record with typed date, number and text cells."""
+    for column, (key, column_type) in enumerate(zip(COLUMNS, COLUMN_TYPES)):
+        value = record.get(key, "")
+        if column_type == "id":
+            worksheet.write_number(row, column, int(value))
+        elif column_type == "created_at":
+            try:
+                worksheet.write_datetime(row, column, datetime.datetime.fromisoformat(value), formats["datetime"])
+            except (TypeError, ValueError):
+                worksheet.write_string(row, column, str(value or ""))
+        elif column_type == "date":
+            parsed = parse_date(str(value or ""))
+            if parsed is not None:
+                worksheet.write_datetime(row, column, datetime.datetime.combine(parsed, datetime.time()), formats["date"])
+            else:
+                worksheet.write_string(row, column, str(value or ""))
+        elif column_type == "percent":
+            score = parse_score(value)
+            if score is not None:
+                worksheet.write_number(row, column, score, formats["percent"])
+            else:
+                worksheet.write_string(row, column, str(value or ""))
+        else:
+            # write_string, not write(), so values like "=..." or "0123" are never reinterpreted
+            worksheet.write_string(row, column, str(value or ""))
+
+# --- 4. The Export ---
+def write_tracker_xlsx(path: str, records=None) -> int:
+    """Writes records (default: the whole tracker, streamed) to an .xlsx file; returns the row count."""
+    if xlsxwriter is None:
+        raise RuntimeError("XLSX export requires the 'xlsxwriter' package.")
+    records = tracker.iter_records() if records is None else records
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+    try:
+        worksheet = workbook.add_worksheet("Job Tracker")
+        formats = {
+            "header": workbook.add_format({"bold": True, "bg_color": "#1F4E78", "font_color": "#FFFFFF", "border": 1}),
+            "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+            "datetime": workbook.add_format({"num_format": "yyyy-mm-dd hh:mm"}),
+            "percent": workbook.add_format({"num_format": "0%"}),
+        }
+
+        # Everything that does not depend on the data goes first; rows then stream in order
+        for column, key in enumerate(COLUMNS):
+            worksheet.set_column(column, column, COLUMN_WIDTHS.get(key, DEFAULT_WIDTH))
+            worksheet.write_string(0, column, key, formats["header"])
+        worksheet.freeze_panes(1, 0)
+
+        status_column = COLUMNS.index("status")
+        for text, colours in STATUS_COLOURS:
+            worksheet.conditional_format(1, status_column, LAST_ROW, status_column, {
+                "type": "text", "criteria": "containing", "value": text, "format": workbook.add_format(colours)
+            })
+        score_column = COLUMNS.index("match_score")
+        worksheet.conditional_format(1, score_column, LAST_ROW, score_column, {
+            "type": "3_color_scale", "min_type": "num", "min_value": 0, "mid_type": "num", "mid_value": 0.5,
+            "max_type": "num", "max_value": 1, "min_color": "#F8696B", "mid_color": "#FFEB84", "max_color": "#63BE7B",
+        })
+
+        rows = 0
+        for rows, record in enumerate(records, start=1):
+            write_record(worksheet, rows, record, formats)
+        worksheet.autofilter(0, 0, max(rows, 1), len(COLUMNS) - 1)
+    finally:
+        workbook.close()
+    return rows
+
+
+def export_tracker_file() -> str:
+    """Exports the tracker to a temporary .xlsx file and returns its path (the caller deletes it)."""
+    handle, path = tempfile.mkstemp(prefix="job_tracker_", suffix=".xlsx")
+    os.close(handle)
+    try:
+        write_tracker_xlsx(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def export_tracker_bytes() -> bytes:
+    """The finished workbook as bytes, for download buttons that need the whole payload."""
+    path = export_tracker_file()
+    try:
+        with open(path, "rb") as workbook_file:
+            return workbook_file.read()
+    finally:
+        os.remove(path)
+
+# --- 5. Standalone Execution Block ---
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python xlsx_export.py <output.xlsx>")
+        sys.exit(1)
+    print(f"Wrote {write_tracker_xlsx(sys.argv[1])} record(s) to {sys.argv[1]}")